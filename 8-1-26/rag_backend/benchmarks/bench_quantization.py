@@ -0,0 +1,72 @@
+"""
+Recall vs memory for the quantized search tier.
+
+Compares int8 and binary codes (with exact float re-scoring of the
+shortlist) against brute-force float32 search on synthetic clustered
+embeddings.
+
+    python benchmarks/bench_quantization.py --n 20000 --dim 768
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.quantization import QuantizedIndex, squared_l2
+
+
+def make_corpus(n, dim, clusters, seed):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    labels = rng.integers(0, clusters, size=n)
+    vectors = centers[labels] + 0.5 * rng.normal(size=(n, dim))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--clusters", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    vectors = make_corpus(args.n + args.queries, args.dim, args.clusters, args.seed)
+    corpus, queries = vectors[:args.n], vectors[args.n:]
+    ids = list(range(args.n))
+
+    def fetch(wanted):
+        return wanted, corpus[wanted]
+
+    truth = [set(np.argsort(squared_l2(corpus, q))[:args.k]) for q in queries]
+
+    print(f"{args.n} vectors x {args.dim} dims, {args.queries} queries, recall@{args.k}")
+    print(f"{'tier':<10}{'rescore':>8}{'bytes/vec':>11}{'ratio':>8}{'recall':>9}{'ms/query':>10}")
+    print(f"{'float32':<10}{'-':>8}{args.dim * 4:>11}{'1x':>8}{1.0:>9.3f}{'-':>10}")
+
+    for mode in ("int8", "binary"):
+        for factor in (1, 4, 16):
+            index = QuantizedIndex(mode, rescore_factor=factor).build(ids, corpus)
+            started = time.perf_counter()
+            hits = 0
+            for query, expected in zip(queries, truth):
+                found = {doc_id for doc_id, _ in index.search(query, args.k, fetch)}
+                hits += len(found & expected)
+            elapsed_ms = (time.perf_counter() - started) * 1000 / len(queries)
+
+            per_vector = index.codes.nbytes / len(index)
+            print(
+                f"{mode:<10}{factor:>8}{per_vector:>11.0f}{args.dim * 4 / per_vector:>7.0f}x"
+                f"{hits / (args.k * len(queries)):>9.3f}{elapsed_ms:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
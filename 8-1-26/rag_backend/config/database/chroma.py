@@ -1,11 +1,11 @@
 import chromadb
 from chromadb.config import Settings
-from config.settings import CHROMA_PATH, COLLECTION_NAME
+from config.settings import get_settings
 from database.embeddings import generate_embedding
 
-client = chromadb.Client(Settings(persist_directory=CHROMA_PATH))
+client = chromadb.Client(Settings(persist_directory=get_settings().chroma_path))
 
 collection = client.get_or_create_collection(
-    name=COLLECTION_NAME,
+    name=get_settings().collection_name,
     embedding_function=generate_embedding
 )
@@ -1,9 +1,157 @@
 import os
+from functools import lru_cache
+from typing import Literal, Optional
 
-CHROMA_PATH = "./chroma_db"
-COLLECTION_NAME = "knowledge_base"
+from pydantic import model_validator
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
-EMBEDDING_MODEL = "nomic-embed-text"
-LLM_MODEL = "tinyllama"
 
-DOCS_PATH = "docs.txt"
+class Settings(BaseSettings):
+    """Deployment settings, read from RAG_* environment variables or a .env file.
+
+    For example RAG_INGEST_BATCH_SIZE=256 or RAG_RERANK_SCORER=bm25.
+    """
+
+    model_config = SettingsConfigDict(env_prefix="RAG_", env_file=".env", extra="ignore")
+
+    # "embedded" opens chroma_path in-process; "http" shares one Chroma server
+    # (`chroma run --path ./chroma_db --port 8001`) across all API workers
+    chroma_mode: Literal["embedded", "http"] = "embedded"
+    chroma_path: str = "./chroma_db"
+    chroma_host: str = "localhost"
+    chroma_port: int = 8001
+    chroma_ssl: bool = False
+    chroma_timeout_seconds: float = 30
+    chroma_connect_timeout_seconds: float = 5
+    chroma_max_connections: int = 100
+    chroma_max_keepalive_connections: int = 20
+    chroma_keepalive_seconds: float = 40
+    chroma_retries: int = 3
+    chroma_retry_backoff_seconds: float = 0.1
+
+    # Hash-partition each collection by ID over shard_count Chroma collections
+    # (knowledge_base__s0, __s1, ...). With shard_urls ("host:port" per shard),
+    # shard i lives on its own Chroma server instead.
+    shard_count: int = 1
+    shard_urls: list[str] = []
+    shard_workers: int = 16
+
+    collection_name: str = "knowledge_base"
+    # Points collection_name at the live versioned collection (e.g. knowledge_base__v7);
+    # defaults to aliases.json inside chroma_path
+    alias_path: Optional[str] = None
+    keep_versions: int = 2
+    reindex_batch_size: int = 500
+
+    # Open collection handles kept per worker, and how long an unused one lives
+    collection_cache_size: int = 64
+    collection_idle_seconds: float = 600
+    # How often in-memory vector counts are checked against Chroma (0: never)
+    counter_reconcile_seconds: float = 60
+    max_vectors_per_tenant: int = 100_000
+
+    # "ollama" (embedding_model) or "hashing" (hashed n-gram vectors in NumPy,
+    # no model needed); collection_embedding_backends overrides it per
+    # collection name, and versions of a collection follow their base name
+    embedding_backend: Literal["ollama", "hashing"] = "ollama"
+    collection_embedding_backends: dict[str, Literal["ollama", "hashing"]] = {}
+    embedding_model: str = "nomic-embed-text"
+    hashing_dim: int = 512
+    # Concurrent single-text embeds are coalesced into one batched call
+    embedding_batch_size: int = 32
+    embedding_batch_wait_ms: float = 5
+    llm_model: str = "tinyllama"
+    # Keeps the model (and its cached prompt prefix) loaded between answers
+    llm_keep_alive: str = "30m"
+    # Chat sessions carry Ollama's returned context tokens between turns
+    chat_session_cache_size: int = 1024
+    chat_session_ttl_seconds: float = 1800
+    chat_session_max_tokens: int = 4096
+    # Generation scheduling: concurrent generations per model (llm_model_slots
+    # overrides llm_slots per model name), FIFO queue bound and wait deadline,
+    # and the per-answer token/time limits
+    llm_slots: int = 1
+    llm_model_slots: dict[str, int] = {}
+    llm_max_queued: int = 64
+    llm_queue_timeout_seconds: float = 30
+    llm_timeout_seconds: float = 120
+    llm_max_tokens: int = 512
+
+    docs_path: str = "docs.txt"
+    ingest_batch_size: int = 64
+    # Committed ingest progress, so an interrupted /vectors/create resumes;
+    # defaults to checkpoints/ inside chroma_path
+    checkpoint_dir: Optional[str] = None
+
+    # Background watcher that keeps the index in sync with a docs file or
+    # directory (watch_path, default docs_path) by polling mtime and hash
+    watch_enabled: bool = False
+    watch_path: Optional[str] = None
+    watch_pattern: str = "*.txt"
+    watch_interval_seconds: float = 2
+    watch_debounce_seconds: float = 1
+
+    # Near-duplicate chunk detection (MinHash/LSH) at ingest
+    dedup_enabled: bool = True
+    dedup_threshold: float = 0.8
+    dedup_num_perm: int = 128
+    dedup_bands: int = 32
+
+    # Hot-query caches: search results (invalidated on writes) and query embeddings
+    result_cache_size: int = 1024
+    result_cache_ttl_seconds: float = 300
+    embedding_cache_size: int = 4096
+
+    # Optional rerank stage
+    rerank_scorer: Optional[Literal["lexical", "bm25", "ollama"]] = None
+    # Candidates fetched from the index and rescored per query
+    rerank_candidates: int = 20
+    # Hard deadline for rescoring; past it the index order is returned
+    rerank_budget_ms: float = 150
+    rerank_workers: int = 4
+
+    # Responses larger than this are gzip-compressed for clients that accept it
+    gzip_min_size: int = 1024
+
+    # Optional embedding reduction ("truncate" is Matryoshka-style)
+    reduction: Optional[Literal["pca", "truncate"]] = None
+    reduced_dim: int = 256
+    # Chunks embedded to fit the PCA projection of a new collection
+    pca_fit_samples: int = 2048
+
+    # Optional quantized tier for search: in-memory codes held in addition
+    # to Chroma's float vectors, scanned exhaustively and re-scored exactly
+    quantization: Optional[Literal["int8", "binary"]] = None
+    # Candidates per requested result that are re-scored with float vectors
+    quantized_rescore_factor: int = 4
+    # Rebuild a worker's codes after this long to pick up other workers'
+    # writes (0 keeps them until the counts drift)
+    quantized_index_ttl_seconds: float = 300
+
+    export_batch_size: int = 1000
+    import_batch_size: int = 5000
+
+    @model_validator(mode="after")
+    def default_paths(self):
+        if self.alias_path is None:
+            self.alias_path = os.path.join(self.chroma_path, "aliases.json")
+        if self.checkpoint_dir is None:
+            self.checkpoint_dir = os.path.join(self.chroma_path, "checkpoints")
+        return self
+
+    @model_validator(mode="after")
+    def shard_urls_match_count(self):
+        # One URL per shard or none at all: fewer would fail on the first
+        # write to a missing shard, and a single shard never reads them (a
+        # single server is chroma_mode="http").
+        if self.shard_urls and (self.shard_count == 1 or len(self.shard_urls) != self.shard_count):
+            raise ValueError(
+                f"shard_urls lists {len(self.shard_urls)} servers but shard_count is {self.shard_count}; "
+                "give one URL per shard (with shard_count > 1) or none"
+            )
+        return self
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    return Settings()
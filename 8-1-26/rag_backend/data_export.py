@@ -1,38 +1,227 @@
-import pandas as pd
+import argparse
+import hashlib
 import json
-from database.chroma import collection  # your existing Chroma init
+import os
+import struct
+import time
 
-def export_vectors():
-    print("Fetching all vectors from Chroma...")
+from config.settings import get_settings
+from database.chroma import get_collection  # your existing Chroma init
+from services.reduction import get_projection
 
-    data = collection.get(include=["documents", "metadatas"])
+EXPORT_FORMATS = ("ndjson", "parquet")
 
-    ids = data["ids"]
-    documents = data["documents"]
-    metadatas = data["metadatas"]
 
-    rows = []
+def iter_batches(collection, batch_size=None, include_embeddings=False):
+    batch_size = batch_size or get_settings().export_batch_size
+    include = ["documents", "metadatas"]
+    if include_embeddings:
+        include.append("embeddings")
 
-    for i in range(len(ids)):
-        rows.append({
-            "id": ids[i],
-            "chunk_text": documents[i],
-            "metadata": metadatas[i]
-        })
+    offset = 0
+    while True:
+        data = collection.get(limit=batch_size, offset=offset, include=include)
+        if not data["ids"]:
+            return
+        yield data
+        offset += len(data["ids"])
 
-    df = pd.DataFrame(rows)
 
-    # Save to Excel
-    df.to_excel("chroma_vectors.xlsx", index=False)
+def update_checksum(hasher, row_id, text, metadata, embedding=None):
+    # Canonical per-row encoding shared with data_import.py, so a snapshot can
+    # be verified regardless of whether it was read back from NDJSON or Parquet.
+    hasher.update(row_id.encode("utf-8"))
+    hasher.update(b"\0")
+    hasher.update((text or "").encode("utf-8"))
+    hasher.update(b"\0")
+    hasher.update(json.dumps(metadata, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    hasher.update(b"\0")
+    if embedding is not None:
+        hasher.update(struct.pack(f"<{len(embedding)}f", *embedding))
+    hasher.update(b"\n")
 
-    # Save to JSON
-    with open("chroma_vectors.json", "w", encoding="utf-8") as f:
-        json.dump(rows, f, indent=2, ensure_ascii=False)
+
+def manifest_path(output_prefix):
+    return f"{output_prefix}.manifest.json"
+
+
+def projection_file(output_prefix):
+    return f"{output_prefix}.projection.npz"
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def export_projection(collection_name, output_prefix):
+    # Reduced embeddings are useless without the projection that maps
+    # queries into their space, so it travels with the snapshot.
+    projection = get_projection(collection_name)
+    if projection is None:
+        return None
+    path = projection_file(output_prefix)
+    projection.save(path)
+    return {
+        "file": os.path.basename(path),
+        "method": projection.method,
+        "dim": projection.dim,
+        "sha256": file_sha256(path)
+    }
+
+
+def batch_rows(data):
+    embeddings = data.get("embeddings")
+
+    for i in range(len(data["ids"])):
+        row = {
+            "id": data["ids"][i],
+            "chunk_text": data["documents"][i],
+            "metadata": data["metadatas"][i]
+        }
+        if embeddings is not None:
+            row["embedding"] = [float(x) for x in embeddings[i]]
+        yield row
+
+
+class NDJSONWriter:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "w", encoding="utf-8")
+
+    def write(self, data):
+        for row in batch_rows(data):
+            self.file.write(json.dumps(row, ensure_ascii=False))
+            self.file.write("\n")
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    def __init__(self, path, include_embeddings=False):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise RuntimeError("Parquet export requires pyarrow: pip install pyarrow") from exc
+
+        fields = [
+            pa.field("id", pa.string()),
+            pa.field("chunk_text", pa.string()),
+            # Metadata keys vary per chunk, so it is stored as a JSON string.
+            pa.field("metadata", pa.string())
+        ]
+        if include_embeddings:
+            fields.append(pa.field("embedding", pa.list_(pa.float32())))
+
+        self.pa = pa
+        self.path = path
+        self.schema = pa.schema(fields)
+        self.include_embeddings = include_embeddings
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, data):
+        columns = {
+            "id": data["ids"],
+            "chunk_text": data["documents"],
+            "metadata": [json.dumps(m, ensure_ascii=False) for m in data["metadatas"]]
+        }
+        if self.include_embeddings:
+            columns["embedding"] = [list(e) for e in data["embeddings"]]
+
+        self.writer.write_table(self.pa.Table.from_pydict(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def export_vectors(
+    collection=None,
+    output_prefix="chroma_vectors",
+    formats=EXPORT_FORMATS,
+    include_embeddings=False,
+    batch_size=None
+):
+    if collection is None:
+        collection = get_collection()
+
+    writers = []
+    for fmt in formats:
+        if fmt == "ndjson":
+            writers.append(NDJSONWriter(f"{output_prefix}.ndjson"))
+        elif fmt == "parquet":
+            writers.append(ParquetWriter(f"{output_prefix}.parquet", include_embeddings))
+        else:
+            raise ValueError(f"Unsupported export format: {fmt}")
+
+    print("Streaming vectors from Chroma...")
+
+    rows = 0
+    checksum = hashlib.sha256()
+    started = time.perf_counter()
+    try:
+        for data in iter_batches(collection, batch_size, include_embeddings):
+            for writer in writers:
+                writer.write(data)
+
+            for row in batch_rows(data):
+                update_checksum(checksum, row["id"], row["chunk_text"], row["metadata"], row.get("embedding"))
+
+            rows += len(data["ids"])
+            elapsed = time.perf_counter() - started
+            print(f"  {rows} rows exported ({rows / elapsed:.0f} rows/s)")
+    finally:
+        for writer in writers:
+            writer.close()
+
+    elapsed = time.perf_counter() - started
+    rows_per_second = rows / elapsed if elapsed > 0 else 0.0
+
+    projection = export_projection(collection.name, output_prefix) if include_embeddings else None
+
+    with open(manifest_path(output_prefix), "w", encoding="utf-8") as f:
+        json.dump({
+            "collection": collection.name,
+            "rows": rows,
+            "include_embeddings": include_embeddings,
+            "sha256": checksum.hexdigest(),
+            "projection": projection
+        }, f, indent=2)
 
     print("✅ Export completed!")
+    print(f"{rows} rows in {elapsed:.2f}s ({rows_per_second:.0f} rows/s)")
     print("Files created:")
-    print(" - chroma_vectors.xlsx")
-    print(" - chroma_vectors.json")
+    for writer in writers:
+        print(f" - {writer.path}")
+    if projection is not None:
+        print(f" - {projection_file(output_prefix)}")
+    print(f" - {manifest_path(output_prefix)}")
+
+    return {
+        "rows": rows,
+        "seconds": elapsed,
+        "rows_per_second": rows_per_second,
+        "sha256": checksum.hexdigest(),
+        "files": [writer.path for writer in writers]
+    }
+
 
 if __name__ == "__main__":
-    export_vectors()
+    parser = argparse.ArgumentParser(description="Export the Chroma collection")
+    parser.add_argument("--output", default="chroma_vectors", help="output file prefix")
+    parser.add_argument("--format", action="append", choices=EXPORT_FORMATS, dest="formats",
+                        help="output format (repeatable, default: all)")
+    parser.add_argument("--embeddings", action="store_true", help="include float32 embeddings")
+    parser.add_argument("--batch-size", type=int, default=get_settings().export_batch_size)
+    args = parser.parse_args()
+
+    export_vectors(
+        output_prefix=args.output,
+        formats=args.formats or EXPORT_FORMATS,
+        include_embeddings=args.embeddings,
+        batch_size=args.batch_size
+    )
@@ -0,0 +1,203 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+
+from config.settings import get_settings
+from data_export import file_sha256, manifest_path, projection_file, update_checksum
+from database.chroma import create_collection_handle, get_collection
+from services.reduction import Projection, drop_projection, get_projection, save_projection
+
+
+class SnapshotVerificationError(Exception):
+    pass
+
+
+def read_ndjson(path, batch_size):
+    batch = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            batch.append(json.loads(line))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def read_parquet(path, batch_size):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise RuntimeError("Parquet import requires pyarrow: pip install pyarrow") from exc
+
+    for record_batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+        rows = record_batch.to_pylist()
+        for row in rows:
+            row["metadata"] = json.loads(row["metadata"])
+        yield rows
+
+
+def read_snapshot(path, batch_size):
+    if path.endswith(".ndjson"):
+        return read_ndjson(path, batch_size)
+    if path.endswith(".parquet"):
+        return read_parquet(path, batch_size)
+    raise ValueError(f"Unsupported snapshot format: {path}")
+
+
+def load_manifest(path):
+    manifest_file = manifest_path(os.path.splitext(path)[0])
+    if not os.path.exists(manifest_file):
+        return None
+    with open(manifest_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def snapshot_digest(path, batch_size):
+    rows = 0
+    checksum = hashlib.sha256()
+    for batch in read_snapshot(path, batch_size):
+        for row in batch:
+            if row.get("embedding") is None:
+                raise ValueError(f"Row {row['id']} has no embedding")
+            update_checksum(checksum, row["id"], row["chunk_text"], row["metadata"], row["embedding"])
+        rows += len(batch)
+    return rows, checksum.hexdigest()
+
+
+def verify_snapshot(path, manifest, batch_size):
+    """Check the snapshot against its manifest without writing anything."""
+    rows, digest = snapshot_digest(path, batch_size)
+    if rows != manifest["rows"]:
+        raise SnapshotVerificationError(f"Row count mismatch: read {rows}, manifest has {manifest['rows']}")
+    if digest != manifest["sha256"]:
+        raise SnapshotVerificationError("Checksum mismatch: snapshot does not match its manifest")
+    return digest
+
+
+def load_projection(path, manifest):
+    """The projection a reduced snapshot was embedded with, or None if it was not reduced."""
+    entry = (manifest or {}).get("projection")
+    if entry is None:
+        return None
+    projection_path = projection_file(os.path.splitext(path)[0])
+    if not os.path.exists(projection_path):
+        raise SnapshotVerificationError(
+            f"Snapshot was reduced to {entry['dim']} dimensions but {projection_path} is missing; "
+            "its vectors cannot be queried without it"
+        )
+    if file_sha256(projection_path) != entry["sha256"]:
+        raise SnapshotVerificationError("Checksum mismatch: projection does not match its manifest")
+    return Projection.load(projection_path)
+
+
+def check_projection(collection, projection):
+    """Refuse a snapshot whose vectors live in another space than the collection's.
+
+    An empty collection takes the snapshot's projection (or none); one that
+    already holds vectors must have been reduced the same way.
+    """
+    current = get_projection(collection.name)
+    if collection.count() == 0 or (current is None and projection is None):
+        return
+    if current is None:
+        raise SnapshotVerificationError(
+            f"Snapshot was reduced to {projection.dim} dimensions but '{collection.name}' holds full-size vectors"
+        )
+    if projection is None:
+        raise SnapshotVerificationError(
+            f"'{collection.name}' is reduced to {current.dim} dimensions but the snapshot holds full-size vectors"
+        )
+    if not current.matches(projection):
+        raise SnapshotVerificationError(
+            f"Snapshot was reduced with a different projection ({projection.method}, {projection.dim}) "
+            f"than '{collection.name}' ({current.method}, {current.dim})"
+        )
+
+
+def import_vectors(path, collection=None, batch_size=None, verify=True):
+    if collection is None:
+        collection = get_collection()
+    batch_size = batch_size or get_settings().import_batch_size
+
+    manifest = load_manifest(path)
+    if verify and manifest is None:
+        raise SnapshotVerificationError(f"No manifest found next to {path}")
+    if manifest is not None and not manifest.get("include_embeddings"):
+        raise ValueError("Snapshot has no embeddings; re-export it with --embeddings")
+
+    # The whole file is checked before the first add, so a tampered or
+    # truncated snapshot never leaves rows in the target collection.
+    if verify:
+        print(f"Verifying {path} against its manifest...")
+        verify_snapshot(path, manifest, batch_size)
+
+    # Installed before the rows, so queries against them are projected too.
+    projection = load_projection(path, manifest)
+    check_projection(collection, projection)
+    if projection is not None:
+        save_projection(collection.name, projection)
+    elif collection.count() == 0:
+        # A projection left on an empty collection would distort queries
+        # against the full-size rows about to be stored.
+        drop_projection(collection.name)
+
+    count_before = collection.count()
+
+    print(f"Restoring {path} into '{collection.name}'...")
+
+    rows = 0
+    checksum = hashlib.sha256()
+    started = time.perf_counter()
+    for batch in read_snapshot(path, batch_size):
+        ids, documents, metadatas, embeddings = [], [], [], []
+        for row in batch:
+            if row.get("embedding") is None:
+                raise ValueError(f"Row {row['id']} has no embedding")
+            update_checksum(checksum, row["id"], row["chunk_text"], row["metadata"], row["embedding"])
+            ids.append(row["id"])
+            documents.append(row["chunk_text"])
+            metadatas.append(row["metadata"])
+            embeddings.append(row["embedding"])
+
+        # Embeddings are passed through as-is, so the embedding model is never called.
+        collection.add(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+
+        rows += len(ids)
+        elapsed = time.perf_counter() - started
+        print(f"  {rows} rows imported ({rows / elapsed:.0f} rows/s)")
+
+    elapsed = time.perf_counter() - started
+    added = collection.count() - count_before
+
+    if verify:
+        if checksum.hexdigest() != manifest["sha256"]:
+            raise SnapshotVerificationError("Snapshot changed while it was being imported")
+        if added != rows:
+            raise SnapshotVerificationError(f"Collection grew by {added} rows, expected {rows}")
+
+    print("✅ Import completed!")
+    print(f"{rows} rows in {elapsed:.2f}s ({rows / elapsed if elapsed > 0 else 0:.0f} rows/s)")
+
+    return {
+        "rows": rows,
+        "added": added,
+        "seconds": elapsed,
+        "sha256": checksum.hexdigest()
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Restore a Chroma collection from an export")
+    parser.add_argument("path", help="snapshot file (.ndjson or .parquet) exported with --embeddings")
+    parser.add_argument("--collection", help="target collection (default: the configured one)")
+    parser.add_argument("--batch-size", type=int, default=get_settings().import_batch_size)
+    parser.add_argument("--no-verify", action="store_true", help="skip count and checksum checks")
+    args = parser.parse_args()
+
+    target = create_collection_handle(args.collection) if args.collection else None
+    import_vectors(args.path, target, args.batch_size, verify=not args.no_verify)
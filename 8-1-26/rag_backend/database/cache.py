@@ -0,0 +1,117 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class CollectionCache:
+    """LRU cache of open collection handles with idle eviction."""
+
+    def __init__(self, opener, max_size, idle_seconds):
+        self.opener = opener
+        self.max_size = max_size
+        self.idle_seconds = idle_seconds
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, name, opener=None):
+        now = time.monotonic()
+        with self.lock:
+            self._evict_idle(now)
+            entry = self.entries.get(name)
+            if entry is not None:
+                self.entries.move_to_end(name)
+                entry[1] = now
+                return entry[0]
+
+        # Open outside the lock so a slow get_or_create does not block hits.
+        collection = (opener or self.opener)(name)
+
+        with self.lock:
+            self.entries[name] = [collection, now]
+            self.entries.move_to_end(name)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        return collection
+
+    def peek(self, name):
+        """The cached handle for name, if any, without opening or touching it."""
+        with self.lock:
+            entry = self.entries.get(name)
+            return entry[0] if entry is not None else None
+
+    def discard(self, name):
+        with self.lock:
+            self.entries.pop(name, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def names(self):
+        with self.lock:
+            return list(self.entries)
+
+    def _evict_idle(self, now):
+        while self.entries:
+            name, (_, last_used) = next(iter(self.entries.items()))
+            if now - last_used < self.idle_seconds:
+                break
+            del self.entries[name]
+
+
+class TTLCache:
+    """LRU cache whose entries also expire `ttl_seconds` after being stored."""
+
+    def __init__(self, max_size, ttl_seconds=None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or (self.ttl_seconds is not None and now - entry[1] >= self.ttl_seconds):
+                self.entries.pop(key, None)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic())
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class CollectionVersions:
+    """Per-collection write counters; bumping one orphans its cached results."""
+
+    def __init__(self):
+        self.versions = {}
+        self.lock = threading.Lock()
+
+    def get(self, name):
+        with self.lock:
+            return self.versions.get(name, 0)
+
+    def bump(self, name):
+        with self.lock:
+            self.versions[name] = self.versions.get(name, 0) + 1
+            return self.versions[name]
+
+
+collection_versions = CollectionVersions()
@@ -1,8 +1,321 @@
-import chromadb
-from config.settings import CHROMA_PATH, COLLECTION_NAME
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Optional
 
-chroma_client = chromadb.PersistentClient(path=CHROMA_PATH)
+from fastapi import HTTPException
 
-collection = chroma_client.get_or_create_collection(
-    name=COLLECTION_NAME
-)
\ No newline at end of file
+from config.settings import get_settings
+from database.cache import CollectionCache
+from database.sharding import ShardedCollection, get_shard_executor, shard_name
+from database.stats import vector_stats
+from database.tenants import tenant_collection_name, tenant_of
+
+VERSION_SEPARATOR = "__v"
+
+_alias_cache = {"mtime": None, "aliases": {}}
+# Held by the reindex or compaction running in this process; the lock file
+# next to the alias file extends that to the other workers.
+_maintenance_lock = threading.Lock()
+
+# Embedding dimension of each collection's stored vectors, probed once.
+_stored_dimensions = {}
+
+
+class EmbeddingDimensionMismatch(Exception):
+    """A collection's vectors were embedded with a different model or projection."""
+
+    def __init__(self, collection_name, stored, current):
+        self.collection_name = collection_name
+        self.stored = stored
+        self.current = current
+        super().__init__(
+            f"Collection '{collection_name}' stores {stored}-dimensional embeddings but the "
+            f"current embedding settings produce {current}-dimensional ones; "
+            f"run POST {self.migration_url()} to re-embed its stored documents"
+        )
+
+    def migration_url(self):
+        tenant = tenant_of(self.collection_name)
+        return "/vectors/reembed" if tenant is None else f"/vectors/reembed?tenant={tenant}"
+
+
+@lru_cache(maxsize=1)
+def get_client():
+    # chromadb is imported here so that importing the app (health checks,
+    # tests, worker cold start) does not pay for it until a route needs it.
+    import chromadb
+
+    settings = get_settings()
+    if settings.chroma_mode == "http":
+        from database.remote import connect_http_client
+
+        return connect_http_client(settings)
+    return chromadb.PersistentClient(path=settings.chroma_path)
+
+
+def versioned_name(version: int, base: Optional[str] = None):
+    base = base or get_settings().collection_name
+    return f"{base}{VERSION_SEPARATOR}{version}"
+
+
+def parse_version(name: str, base: Optional[str] = None):
+    base = base or get_settings().collection_name
+    prefix = f"{base}{VERSION_SEPARATOR}"
+    if name.startswith(prefix) and name[len(prefix):].isdigit():
+        return int(name[len(prefix):])
+    return None
+
+
+def read_aliases():
+    # Re-read only when the file changes, so every worker picks up a swap
+    # with a single stat() per request.
+    alias_path = get_settings().alias_path
+    try:
+        mtime = os.stat(alias_path).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+
+    if mtime != _alias_cache["mtime"]:
+        with open(alias_path, "r", encoding="utf-8") as f:
+            _alias_cache["aliases"] = json.load(f)
+        _alias_cache["mtime"] = mtime
+
+    return _alias_cache["aliases"]
+
+
+def write_alias(target: str, alias: Optional[str] = None):
+    alias_path = get_settings().alias_path
+    aliases = dict(read_aliases())
+    aliases[alias or get_settings().collection_name] = target
+
+    os.makedirs(os.path.dirname(alias_path) or ".", exist_ok=True)
+    tmp_path = f"{alias_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(aliases, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    # os.replace is atomic, so readers see either the old or the new alias.
+    os.replace(tmp_path, alias_path)
+
+
+def resolve_collection_name(alias: Optional[str] = None):
+    alias = alias or get_settings().collection_name
+    return read_aliases().get(alias, alias)
+
+
+@contextmanager
+def file_lock(path: str, shared: bool = False, blocking: bool = True):
+    """Advisory lock on path, held across processes; BlockingIOError if not blocking and taken.
+
+    Uses flock on POSIX. Windows (msvcrt) has no shared locks, so shared
+    holders there exclude each other as well.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as f:
+        if os.name == "nt":
+            import msvcrt
+
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:
+                    if not blocking:
+                        raise BlockingIOError(f"{path} is locked")
+                    time.sleep(0.05)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            return
+
+        import fcntl
+
+        operation = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+        fcntl.flock(f, operation if blocking else operation | fcntl.LOCK_NB)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def maintenance_lock_path():
+    return f"{get_settings().alias_path}.lock"
+
+
+def writes_lock_path():
+    return f"{get_settings().alias_path}.writes.lock"
+
+
+@contextmanager
+def maintenance_lock():
+    """Run one reindex or compaction at a time, in this process and across workers."""
+    with _maintenance_lock, file_lock(maintenance_lock_path()):
+        yield
+
+
+def maintenance_running():
+    if _maintenance_lock.locked():
+        return True
+    try:
+        with file_lock(maintenance_lock_path(), blocking=False):
+            return False
+    except BlockingIOError:
+        return True
+
+
+@contextmanager
+def writes_blocked():
+    """Hold every write_gate() writer off until the block exits."""
+    with file_lock(writes_lock_path()):
+        yield
+
+
+@contextmanager
+def write_gate(collection):
+    """Wait out a running compaction or re-embed, then yield the collection to write to.
+
+    Writers to the collection behind the default alias that waited (or
+    opened it before a reindex) get the collection the alias points to now,
+    so their writes land in the live version instead of one about to be
+    dropped. A tenant's collection is rebuilt under its own name, and its
+    writers get the handle opened since.
+    """
+    base = get_settings().collection_name
+    tenant = tenant_of(collection.name)
+    if collection.name != base and parse_version(collection.name) is None and tenant is None:
+        yield collection
+        return
+
+    with file_lock(writes_lock_path(), shared=True):
+        if tenant is not None:
+            yield get_collection_cache().peek(collection.name) or collection
+            return
+        live = resolve_collection_name()
+        yield collection if collection.name == live else open_collection(live)
+
+
+@lru_cache(maxsize=None)
+def get_shard_client(shard: int):
+    settings = get_settings()
+    if not settings.shard_urls:
+        return get_client()
+
+    from database.remote import connect_http_client
+
+    host, _, port = settings.shard_urls[shard].rpartition(":")
+    return connect_http_client(settings, host=host, port=int(port))
+
+
+def open_single_collection(name: str, client, create: bool = True):
+    settings = get_settings()
+    if settings.chroma_mode == "http" or settings.shard_urls:
+        from database.remote import TRANSIENT_ERRORS, RetryingCollection, call_with_retries
+
+        collection = call_with_retries(
+            lambda: (client.get_or_create_collection if create else client.get_collection)(name=name),
+            TRANSIENT_ERRORS,
+            settings.chroma_retries,
+            settings.chroma_retry_backoff_seconds
+        )
+        return RetryingCollection(collection, settings.chroma_retries, settings.chroma_retry_backoff_seconds)
+    if create:
+        return client.get_or_create_collection(name=name)
+    return client.get_collection(name=name)
+
+
+def create_collection_handle(name: str, client=None, create: bool = True):
+    """Open name (creating it unless create is False) as a plain or sharded collection."""
+    settings = get_settings()
+    if settings.shard_count > 1:
+        shards = [
+            open_single_collection(shard_name(name, shard), client or get_shard_client(shard), create)
+            for shard in range(settings.shard_count)
+        ]
+        return ShardedCollection(name, shards, get_shard_executor())
+    return open_single_collection(name, client or get_client(), create)
+
+
+def stored_dimension(collection):
+    dimension = _stored_dimensions.get(collection.name)
+    if dimension is None:
+        sample = collection.get(limit=1, include=["embeddings"])["embeddings"]
+        if sample is None or len(sample) == 0:
+            return None
+        dimension = _stored_dimensions[collection.name] = len(sample[0])
+    return dimension
+
+
+def check_dimension(collection, embeddings):
+    """Raise EmbeddingDimensionMismatch if embeddings cannot go into (or query) collection.
+
+    Collections filled before a change of embedding model, backend or
+    reduction keep their old vectors until they are reindexed.
+    """
+    if len(embeddings) == 0:
+        return
+    stored = stored_dimension(collection)
+    if stored is not None and stored != len(embeddings[0]):
+        raise EmbeddingDimensionMismatch(collection.name, stored, len(embeddings[0]))
+
+
+def drop_collection(name: str, client=None):
+    settings = get_settings()
+    if settings.shard_count > 1:
+        for shard in range(settings.shard_count):
+            (client or get_shard_client(shard)).delete_collection(shard_name(name, shard))
+    else:
+        (client or get_client()).delete_collection(name)
+    get_collection_cache().discard(name)
+    _stored_dimensions.pop(name, None)
+    vector_stats.reset(name)
+
+
+@lru_cache(maxsize=1)
+def get_collection_cache():
+    # Sized from the settings in effect when the first collection is opened.
+    settings = get_settings()
+    return CollectionCache(
+        create_collection_handle,
+        max_size=settings.collection_cache_size,
+        idle_seconds=settings.collection_idle_seconds
+    )
+
+
+def open_collection(name: str, create: bool = True):
+    if create:
+        return get_collection_cache().get(name)
+    return get_collection_cache().get(name, lambda name: create_collection_handle(name, create=False))
+
+
+def open_tenant_collection(tenant: str, create: bool):
+    from chromadb.errors import NotFoundError
+
+    try:
+        name = tenant_collection_name(tenant)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    try:
+        return open_collection(name, create)
+    except NotFoundError:
+        raise HTTPException(status_code=404, detail=f"Unknown tenant: {tenant}")
+
+
+def get_collection(tenant: Optional[str] = None):
+    """Collection for routes that only read: an unknown tenant is a 404, not a new collection."""
+    if tenant is None:
+        return open_collection(resolve_collection_name())
+    return open_tenant_collection(tenant, create=False)
+
+
+def get_writable_collection(tenant: Optional[str] = None):
+    """Collection for routes that store vectors; a tenant's collection is created on its first write."""
+    if tenant is None:
+        return open_collection(resolve_collection_name())
+    return open_tenant_collection(tenant, create=True)
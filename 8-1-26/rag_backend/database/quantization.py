@@ -0,0 +1,301 @@
+import threading
+import time
+
+import numpy as np
+
+from config.settings import get_settings
+
+QUANTIZATION_MODES = ("int8", "binary")
+
+# Number of set bits for every byte value, used for Hamming distance.
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+# Codes are scored this many rows at a time, so a query's scratch memory is
+# bounded by the block (about 3 MB of float32 at 768 dims), not the index.
+SCAN_BLOCK_ROWS = 1024
+
+
+def quantize_int8(vectors, low, high):
+    scale = np.where(high > low, (high - low) / 255.0, 1.0).astype(np.float32)
+    codes = np.clip(np.round((vectors - low) / scale), 0, 255) - 128
+    return codes.astype(np.int8), scale
+
+
+def dequantize_int8(codes, low, scale):
+    return (codes.astype(np.float32) + 128) * scale + low
+
+
+def quantize_binary(vectors):
+    return np.packbits(vectors > 0, axis=1)
+
+
+def hamming_distances(codes, query_code):
+    distances = np.empty(len(codes), dtype=np.int32)
+    for start in range(0, len(codes), SCAN_BLOCK_ROWS):
+        block = np.bitwise_xor(codes[start:start + SCAN_BLOCK_ROWS], query_code)
+        distances[start:start + SCAN_BLOCK_ROWS] = POPCOUNT[block].sum(axis=1, dtype=np.int32)
+    return distances
+
+
+def int8_code_norms(codes, scale):
+    # Per-row sum((scale * code)^2), the query-independent part of the
+    # int8 distance; computed once per row when codes are added.
+    norms = np.empty(len(codes), dtype=np.float32)
+    for start in range(0, len(codes), SCAN_BLOCK_ROWS):
+        block = codes[start:start + SCAN_BLOCK_ROWS].astype(np.float32) * scale
+        norms[start:start + SCAN_BLOCK_ROWS] = np.einsum("ij,ij->i", block, block)
+    return norms
+
+
+def int8_distances(codes, norms, low, scale, query):
+    """Squared L2 from query to the dequantized codes, without dequantizing.
+
+    With d(c) = scale * (c + 128) + low, |d(c) - q|^2 expands to
+    |scale * c|^2 + c . (2 * scale * v) + |v|^2 where v = 128 * scale + low - q,
+    so each block needs one matrix-vector product against the int8 codes.
+    """
+    offset = 128 * scale + low - query
+    weights = 2 * scale * offset
+    distances = norms + np.float32(np.dot(offset, offset))
+    for start in range(0, len(codes), SCAN_BLOCK_ROWS):
+        block = codes[start:start + SCAN_BLOCK_ROWS]
+        distances[start:start + SCAN_BLOCK_ROWS] += block.astype(np.float32) @ weights
+    return distances
+
+
+def squared_l2(vectors, query):
+    # Same metric as Chroma's default "l2" space, so scores stay comparable.
+    diff = vectors - query
+    return np.einsum("ij,ij->i", diff, diff)
+
+
+class QuantizedIndex:
+    """Compact int8 or sign-bit codes of a collection's vectors.
+
+    Codes are scanned to shortlist candidates; the float vectors of the
+    shortlist are then fetched and scored exactly. Rows are kept up to date
+    with upsert() and remove() as the collection is written.
+    """
+
+    def __init__(self, mode="binary", rescore_factor=4):
+        if mode not in QUANTIZATION_MODES:
+            raise ValueError(f"Unsupported quantization mode: {mode}")
+        self.mode = mode
+        self.rescore_factor = rescore_factor
+        self.ids = []
+        self.rows = {}
+        self.low = None
+        self.scale = None
+        self._codes = None
+        self._norms = None
+        self.lock = threading.Lock()
+
+    @property
+    def codes(self):
+        return None if self._codes is None else self._codes[:len(self.ids)]
+
+    @property
+    def norms(self):
+        return None if self._norms is None else self._norms[:len(self.ids)]
+
+    def build(self, ids, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self.lock:
+            self.ids = list(ids)
+            self.rows = {doc_id: row for row, doc_id in enumerate(self.ids)}
+            if self.mode == "int8":
+                self.low = vectors.min(axis=0)
+                self._codes, self.scale = quantize_int8(vectors, self.low, vectors.max(axis=0))
+                self._norms = int8_code_norms(self._codes, self.scale)
+            else:
+                self._codes = quantize_binary(vectors)
+        return self
+
+    def encode(self, vectors):
+        # The int8 range is fixed when the index is built; later vectors
+        # outside it are clipped, which only coarsens their shortlist score.
+        if self.mode == "int8":
+            codes = quantize_int8(vectors, self.low, self.low + 255 * self.scale)[0]
+            return codes, int8_code_norms(codes, self.scale)
+        return quantize_binary(vectors), None
+
+    def upsert(self, ids, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self._codes is None:
+            return self.build(ids, vectors)
+
+        codes, norms = self.encode(vectors)
+        with self.lock:
+            for i, doc_id in enumerate(ids):
+                row = self.rows.get(doc_id)
+                if row is None:
+                    row = len(self.ids)
+                    self._reserve(row + 1)
+                    self.ids.append(doc_id)
+                    self.rows[doc_id] = row
+                self._codes[row] = codes[i]
+                if norms is not None:
+                    self._norms[row] = norms[i]
+        return self
+
+    def remove(self, ids):
+        # Removed rows are filled with the last row, so the live rows stay
+        # contiguous and scans never see holes.
+        with self.lock:
+            for doc_id in ids:
+                row = self.rows.pop(doc_id, None)
+                if row is None:
+                    continue
+                last = len(self.ids) - 1
+                if row != last:
+                    moved = self.ids[last]
+                    self.ids[row] = moved
+                    self.rows[moved] = row
+                    self._codes[row] = self._codes[last]
+                    if self._norms is not None:
+                        self._norms[row] = self._norms[last]
+                self.ids.pop()
+        return self
+
+    def _reserve(self, size):
+        if size <= len(self._codes):
+            return
+        capacity = max(size, 2 * len(self._codes), 64)
+        codes = np.empty((capacity, self._codes.shape[1]), dtype=self._codes.dtype)
+        codes[:len(self.ids)] = self._codes[:len(self.ids)]
+        self._codes = codes
+        if self._norms is not None:
+            norms = np.empty(capacity, dtype=np.float32)
+            norms[:len(self.ids)] = self._norms[:len(self.ids)]
+            self._norms = norms
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def nbytes(self):
+        extra = 0 if self.scale is None else self.low.nbytes + self.scale.nbytes + self._norms.nbytes
+        return (0 if self._codes is None else self._codes.nbytes) + extra
+
+    def candidates(self, query, n):
+        query = np.asarray(query, dtype=np.float32)
+        with self.lock:
+            if self._codes is None:
+                return []
+            if self.mode == "int8":
+                distances = int8_distances(self.codes, self.norms, self.low, self.scale, query)
+            else:
+                distances = hamming_distances(self.codes, quantize_binary(query[None, :])[0])
+            ids = list(self.ids)
+
+        n = min(n, len(ids))
+        if n == 0:
+            return []
+        top = np.argpartition(distances, n - 1)[:n]
+        return [ids[i] for i in top[np.argsort(distances[top])]]
+
+    def search(self, query, k, fetch_vectors):
+        candidate_ids = self.candidates(query, k * self.rescore_factor)
+        if not candidate_ids:
+            return []
+
+        found_ids, vectors = fetch_vectors(candidate_ids)
+        distances = squared_l2(np.asarray(vectors, dtype=np.float32), np.asarray(query, dtype=np.float32))
+        order = np.argsort(distances)[:k]
+        return [(found_ids[i], float(distances[i])) for i in order]
+
+
+class QuantizedIndexRegistry:
+    """Per-collection quantized indexes, built once and then kept in step with writes.
+
+    Writes made by other workers never reach this one's update(), so an index
+    is also rebuilt once it is ttl_seconds old, or when reconcile() finds its
+    size no longer matches the collection.
+    """
+
+    def __init__(self, batch_size=1000, ttl_seconds=None):
+        self.batch_size = batch_size
+        # None follows quantized_index_ttl_seconds, read on every lookup.
+        self.ttl_seconds = ttl_seconds
+        self.indexes = {}
+        self.built = {}
+        self.changes = {}
+        self.lock = threading.Lock()
+
+    def ttl(self):
+        return get_settings().quantized_index_ttl_seconds if self.ttl_seconds is None else self.ttl_seconds
+
+    def get(self, collection, mode, rescore_factor):
+        key = (collection.name, mode)
+        ttl = self.ttl()
+        with self.lock:
+            index = self.indexes.get(key)
+            if index is not None and ttl and time.monotonic() - self.built[key] >= ttl:
+                del self.indexes[key]
+                index = None
+            changes = self.changes.get(collection.name, 0)
+        if index is None:
+            index = self._build(collection, mode, rescore_factor)
+            with self.lock:
+                # A write that landed while the collection was being paged
+                # may be missing from this index, so it serves this query only.
+                if self.changes.get(collection.name, 0) == changes and key not in self.indexes:
+                    self.indexes[key] = index
+                    self.built[key] = time.monotonic()
+                index = self.indexes.get(key, index)
+        return index
+
+    def update(self, collection_name, ids=(), vectors=None, deleted=()):
+        with self.lock:
+            self.changes[collection_name] = self.changes.get(collection_name, 0) + 1
+            for key, index in self.indexes.items():
+                if key[0] != collection_name:
+                    continue
+                if deleted:
+                    index.remove(deleted)
+                if len(ids):
+                    index.upsert(ids, vectors)
+
+    def invalidate(self, collection_name):
+        with self.lock:
+            self.changes[collection_name] = self.changes.get(collection_name, 0) + 1
+            for key in [key for key in self.indexes if key[0] == collection_name]:
+                del self.indexes[key]
+
+    def names(self):
+        with self.lock:
+            return list({key[0] for key in self.indexes})
+
+    def reconcile(self, collection):
+        """Drop the indexes of a collection whose size no longer matches Chroma's count.
+
+        Returns whether they had drifted; the next search rebuilds them.
+        """
+        actual = collection.count()
+        with self.lock:
+            drifted = any(len(index) != actual for key, index in self.indexes.items() if key[0] == collection.name)
+        if drifted:
+            self.invalidate(collection.name)
+        return drifted
+
+    def reset(self, name):
+        self.invalidate(name)
+
+    def _build(self, collection, mode, rescore_factor):
+        ids, pages = [], []
+        offset = 0
+        while True:
+            page = collection.get(limit=self.batch_size, offset=offset, include=["embeddings"])
+            if not page["ids"]:
+                break
+            ids.extend(page["ids"])
+            pages.append(np.asarray(page["embeddings"], dtype=np.float32))
+            offset += len(page["ids"])
+
+        index = QuantizedIndex(mode, rescore_factor)
+        if ids:
+            index.build(ids, np.concatenate(pages))
+        return index
+
+
+quantized_indexes = QuantizedIndexRegistry()
@@ -0,0 +1,285 @@
+import json
+import os
+import time
+
+from config.settings import get_settings
+from database.chroma import (
+    create_collection_handle,
+    drop_collection,
+    get_collection_cache,
+    get_shard_client,
+    maintenance_lock,
+    parse_version,
+    resolve_collection_name,
+    versioned_name,
+    write_alias,
+    writes_blocked,
+)
+from database.cache import collection_versions
+from database.sharding import unshard_name
+from database.stats import vector_stats
+from database.tenants import tenant_collection_name
+from services.embeddings import embed_texts
+from services.ingest import chunk_id, link_metadata
+from services.reduction import copy_projection, drop_projection, prepare_projection, reduce_embeddings
+
+
+# Staging collection of a tenant being re-embedded; "." cannot occur in a
+# tenant name.
+REEMBED_SUFFIX = ".reembed"
+
+# A self-retrieval probe may come back as an exact duplicate of itself,
+# which is at (near) zero distance.
+PROBE_TOLERANCE = 1e-6
+
+
+class ReindexValidationError(Exception):
+    pass
+
+
+def maintenance_status_path():
+    return f"{get_settings().alias_path}.maintenance.json"
+
+
+def record_maintenance(operation, status, **details):
+    # Kept next to the alias file, so every worker can report the outcome of
+    # a reindex or compaction that ran in the background on another one.
+    path = maintenance_status_path()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"operation": operation, "status": status, "finished_at": time.time(), **details}, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def last_maintenance():
+    try:
+        with open(maintenance_status_path(), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def list_versions(client=None):
+    # Every shard holds a collection per version, so shard 0 sees them all.
+    client = client or get_shard_client(0)
+    versions = set()
+    for collection in client.list_collections():
+        version = parse_version(unshard_name(collection.name))
+        if version is not None:
+            versions.add(version)
+    return sorted(versions)
+
+
+def next_version(client=None):
+    versions = list_versions(client)
+    return versions[-1] + 1 if versions else 1
+
+
+def build_version(chunks, metadatas, client=None, batch_size=None):
+    batch_size = batch_size or get_settings().reindex_batch_size
+    version = next_version(client)
+
+    # The new version is a separate collection, so live queries keep hitting
+    # the current one until the alias is swapped.
+    collection = create_collection_handle(versioned_name(version), client)
+    try:
+        prepare_projection(collection, chunks, lambda texts: embed_texts(texts, collection.name))
+        for start in range(0, len(chunks), batch_size):
+            end = start + batch_size
+            indexes = range(start, min(end, len(chunks)))
+            collection.add(
+                ids=[chunk_id("chunk", i) for i in indexes],
+                documents=chunks[start:end],
+                embeddings=reduce_embeddings(collection.name, embed_texts(chunks[start:end], collection.name)),
+                metadatas=[{**metadatas[i], **link_metadata("chunk", i, len(chunks))} for i in indexes]
+            )
+        validate_version(collection, len(chunks))
+    except Exception:
+        # A partial version would count toward keep_versions and could
+        # push a good one out in the next garbage collection.
+        drop_collection(collection.name, client)
+        drop_projection(collection.name)
+        raise
+
+    return version, collection
+
+
+def validate_version(collection, expected_count):
+    count = collection.count()
+    if count != expected_count:
+        raise ReindexValidationError(f"{collection.name} has {count} vectors, expected {expected_count}")
+
+    if expected_count:
+        # Query with a stored vector: the index must return that chunk, or an
+        # identical vector stored under another ID, first.
+        probe = collection.get(limit=1, include=["embeddings"])
+        results = collection.query(query_embeddings=probe["embeddings"], n_results=1, include=["distances"])
+        if results["ids"][0] != probe["ids"] and results["distances"][0][0] > PROBE_TOLERANCE:
+            raise ReindexValidationError(f"{collection.name} failed the self-retrieval probe")
+
+
+def garbage_collect(client=None, keep=None):
+    keep = get_settings().keep_versions if keep is None else keep
+    live = parse_version(resolve_collection_name())
+
+    removed = []
+    for version in list_versions(client)[:-keep or None]:
+        if version == live:
+            continue
+        drop_collection(versioned_name(version), client)
+        drop_projection(versioned_name(version))
+        removed.append(version)
+
+    return removed
+
+
+def reindex(chunks, metadatas, client=None):
+    # Reindex and compaction both claim next_version(), so they never overlap.
+    with maintenance_lock():
+        try:
+            version, collection = build_version(chunks, metadatas, client)
+        except Exception as exc:
+            record_maintenance("reindex", "failed", error=str(exc))
+            raise
+        write_alias(collection.name)
+        removed = garbage_collect(client)
+    result = {"version": version, "collection": collection.name, "removed_versions": removed}
+    record_maintenance("reindex", "succeeded", **result)
+    return result
+
+
+def compact(client=None, batch_size=None):
+    """Copy the live collection into a fresh version and drop the old one.
+
+    Vectors are copied as stored (nothing is re-embedded), so the new index
+    has no entries left behind by deletes and overwrites. Writes through
+    write_gate() wait while the copy runs and then go to the new version.
+    """
+    with maintenance_lock(), writes_blocked():
+        try:
+            result = _compact(client, batch_size)
+        except Exception as exc:
+            record_maintenance("compact", "failed", error=str(exc))
+            raise
+    record_maintenance("compact", "succeeded", **result)
+    return result
+
+
+def _compact(client, batch_size):
+    batch_size = batch_size or get_settings().reindex_batch_size
+    source = create_collection_handle(resolve_collection_name(), client)
+    version = next_version(client)
+    target = create_collection_handle(versioned_name(version), client)
+    copy_projection(source.name, target.name)
+
+    try:
+        copied = copy_vectors(source, target, batch_size)
+        validate_version(target, source.count())
+    except Exception:
+        # The live collection is untouched; the partial copy is not kept.
+        drop_collection(target.name, client)
+        drop_projection(target.name)
+        raise
+    write_alias(target.name)
+    drop_collection(source.name, client)
+    drop_projection(source.name)
+    vector_stats.reset(source.name)
+    return {"version": version, "collection": target.name, "replaced": source.name, "vectors": copied}
+
+
+def copy_vectors(source, target, batch_size, embed=None):
+    """Copy every row of source into target and return how many were copied.
+
+    With embed, the stored documents are embedded again instead of copying
+    the stored vectors.
+    """
+    include = ["documents", "metadatas"] if embed else ["embeddings", "documents", "metadatas"]
+    offset = 0
+    while True:
+        page = source.get(limit=batch_size, offset=offset, include=include)
+        if not page["ids"]:
+            return offset
+        if embed and any(document is None for document in page["documents"]):
+            raise ReindexValidationError(f"{source.name} has vectors without a document to re-embed")
+        target.add(
+            ids=page["ids"],
+            embeddings=embed(page["documents"]) if embed else page["embeddings"],
+            documents=page["documents"],
+            metadatas=page["metadatas"]
+        )
+        offset += len(page["ids"])
+
+
+def reembed(tenant=None, client=None, batch_size=None):
+    """Embed the stored documents of a collection again with the current embedding settings.
+
+    Unlike reindex(), which rebuilds from docs.txt, every stored row is kept
+    (updates, imports, watched files) with its ID and metadata. The default
+    collection moves to a new version behind its alias; a tenant's
+    collection is rebuilt under its own name. Writes wait until it is done.
+    """
+    with maintenance_lock(), writes_blocked():
+        try:
+            result = _reembed(tenant, client, batch_size)
+        except Exception as exc:
+            record_maintenance("reembed", "failed", tenant=tenant, error=str(exc))
+            raise
+    record_maintenance("reembed", "succeeded", tenant=tenant, **result)
+    return result
+
+
+def _reembed(tenant, client, batch_size):
+    from database.quantization import quantized_indexes
+
+    settings = get_settings()
+    batch_size = batch_size or settings.reindex_batch_size
+    if tenant is None:
+        name = resolve_collection_name()
+        version = next_version(client)
+        staging = versioned_name(version)
+    else:
+        name = tenant_collection_name(tenant)
+        version = None
+        staging = f"{name}{REEMBED_SUFFIX}"
+    source = create_collection_handle(name, client, create=False)
+    target = create_collection_handle(staging, client)
+
+    # Embedded under the name the rows will be served from, which picks the
+    # embedding backend; a fresh projection is fitted if reduction is on.
+    embed_name = staging if tenant is None else name
+    try:
+        sample = source.get(limit=settings.pca_fit_samples, include=["documents"])["documents"]
+        prepare_projection(target, sample, lambda texts: embed_texts(texts, embed_name))
+        copied = copy_vectors(
+            source, target, batch_size,
+            embed=lambda texts: reduce_embeddings(target.name, embed_texts(texts, embed_name))
+        )
+        validate_version(target, source.count())
+    except Exception:
+        drop_collection(target.name, client)
+        drop_projection(target.name)
+        raise
+
+    if tenant is None:
+        write_alias(target.name)
+        drop_collection(source.name, client)
+        drop_projection(source.name)
+        return {"version": version, "collection": target.name, "replaced": source.name, "vectors": copied}
+
+    # Chroma fixes a collection's dimension, so the tenant's collection is
+    # recreated and the re-embedded rows copied back as they are. Should
+    # that fail, the staging copy is kept for a retry.
+    drop_collection(name, client)
+    drop_projection(name)
+    live = create_collection_handle(name, client)
+    copy_projection(target.name, name)
+    copy_vectors(target, live, batch_size)
+    validate_version(live, copied)
+    # Writers waiting in write_gate() pick the new handle up from the cache.
+    get_collection_cache().get(name, lambda name: live)
+    quantized_indexes.invalidate(name)
+    collection_versions.bump(name)
+    drop_collection(target.name, client)
+    drop_projection(target.name)
+    return {"collection": name, "vectors": copied}
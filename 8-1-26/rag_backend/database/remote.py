@@ -0,0 +1,87 @@
+import time
+
+import httpx
+
+# Connection never established: safe to retry any call, including add().
+CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+# The request may have reached the server: only retry idempotent calls.
+TRANSIENT_ERRORS = CONNECT_ERRORS + (httpx.ReadTimeout, httpx.ReadError, httpx.RemoteProtocolError)
+
+MAX_BACKOFF_SECONDS = 2.0
+
+RETRY_POLICY = {
+    "get": TRANSIENT_ERRORS,
+    "query": TRANSIENT_ERRORS,
+    "count": TRANSIENT_ERRORS,
+    "peek": TRANSIENT_ERRORS,
+    "upsert": TRANSIENT_ERRORS,
+    "update": TRANSIENT_ERRORS,
+    "delete": TRANSIENT_ERRORS,
+    "add": CONNECT_ERRORS,
+}
+
+
+def call_with_retries(fn, retryable, attempts, backoff_seconds):
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except retryable:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(min(backoff_seconds * (2 ** attempt), MAX_BACKOFF_SECONDS))
+
+
+class RetryingCollection:
+    """Collection proxy that retries transient HTTP failures with backoff."""
+
+    def __init__(self, collection, attempts, backoff_seconds):
+        self._collection = collection
+        self._attempts = attempts
+        self._backoff_seconds = backoff_seconds
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        retryable = RETRY_POLICY.get(name)
+        if retryable is None:
+            return attr
+
+        def call(*args, **kwargs):
+            return call_with_retries(lambda: attr(*args, **kwargs), retryable, self._attempts, self._backoff_seconds)
+
+        return call
+
+
+def connect_http_client(settings, host=None, port=None):
+    import chromadb
+    from chromadb.config import Settings as ChromaSettings
+
+    # Chroma shares one httpx.Client per client object; these limits size its
+    # keep-alive connection pool.
+    chroma_settings = ChromaSettings(
+        anonymized_telemetry=False,
+        chroma_http_keepalive_secs=settings.chroma_keepalive_seconds,
+        chroma_http_max_connections=settings.chroma_max_connections,
+        chroma_http_max_keepalive_connections=settings.chroma_max_keepalive_connections
+    )
+
+    client = call_with_retries(
+        lambda: chromadb.HttpClient(
+            host=host or settings.chroma_host,
+            port=port or settings.chroma_port,
+            ssl=settings.chroma_ssl,
+            settings=chroma_settings
+        ),
+        (ValueError,) + TRANSIENT_ERRORS,
+        settings.chroma_retries,
+        settings.chroma_retry_backoff_seconds
+    )
+
+    # Chroma creates that httpx.Client with timeout=None; bound every request.
+    session = getattr(getattr(client, "_server", None), "_session", None)
+    if session is not None:
+        session.timeout = httpx.Timeout(
+            settings.chroma_timeout_seconds,
+            connect=settings.chroma_connect_timeout_seconds
+        )
+
+    return client
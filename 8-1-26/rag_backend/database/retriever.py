@@ -1,8 +1,125 @@
-from database.chroma import collection
+from functools import lru_cache
 
-def search_chunks(query: str, top_k: int = 5):
+from config.settings import get_settings
+from database.cache import TTLCache, collection_versions
+from database.chroma import check_dimension
+from services.embeddings import backend_name, generate_embedding
+from services.ingest import neighbor_ids
+from services.reduction import reduce_query
+from services.rerank import TOKEN_PATTERN, lexical_scores, rerank
+
+@lru_cache(maxsize=1)
+def get_result_cache():
+    # Both caches are sized from the settings in effect at the first search.
+    return TTLCache(get_settings().result_cache_size, get_settings().result_cache_ttl_seconds)
+
+
+@lru_cache(maxsize=1)
+def get_embedding_cache():
+    return TTLCache(get_settings().embedding_cache_size)
+
+
+def normalize_query(query: str):
+    return " ".join(query.casefold().split())
+
+
+def embed_query(query: str, collection_name=None):
+    key = (backend_name(collection_name), normalize_query(query))
+    embedding = get_embedding_cache().get(key)
+    if embedding is None:
+        embedding = generate_embedding(query, collection_name)
+        get_embedding_cache().set(key, embedding)
+    return embedding
+
+
+def search_chunks(collection, query: str, top_k: int = 5, quantization=None, reranker=None):
+    hits = []
+    for _, hits in search_stages(collection, query, top_k, quantization, reranker):
+        pass
+    return hits
+
+
+def search_stages(collection, query: str, top_k: int = 5, quantization=None, reranker=None, lexical=False):
+    """Yield (stage, hits) as each stage of a search finishes.
+
+    Stages are "lexical" (only if requested; needs no embedding), "dense",
+    then "reranked" if a reranker ran within its budget. A result cache hit
+    yields a single "cached" stage. The last hits yielded are the answer.
+    """
+    settings = get_settings()
+    quantization = quantization or settings.quantization
+    reranker = reranker or settings.rerank_scorer
+
+    # The collection version changes on every write, so stale entries are
+    # never hit again and simply age out of the LRU.
+    key = (
+        normalize_query(query),
+        top_k,
+        quantization,
+        reranker,
+        collection.name,
+        collection_versions.get(collection.name)
+    )
+    hits = get_result_cache().get(key)
+    if hits is not None:
+        yield "cached", hits
+        return
+
+    if lexical:
+        yield "lexical", lexical_search(collection, query, top_k)
+
+    query_embedding = reduce_query(collection.name, embed_query(query, collection.name))
+    check_dimension(collection, [query_embedding])
+    # Over-fetch so the reranker has candidates beyond the index's top_k.
+    n_candidates = max(top_k, settings.rerank_candidates) if reranker else top_k
+
+    if quantization:
+        hits = quantized_search(collection, query_embedding, n_candidates, quantization)
+    else:
+        hits = dense_search(collection, query_embedding, n_candidates)
+
+    complete = True
+    if reranker:
+        yield "dense", hits[:top_k]
+        hits, complete = rerank(query, hits, top_k, reranker)
+
+    # A fallback after a missed rerank budget is the dense order again: it is
+    # served but neither cached nor yielded a second time.
+    if complete:
+        get_result_cache().set(key, hits)
+        yield ("reranked" if reranker else "dense"), hits
+
+
+def lexical_search(collection, query, top_k):
+    terms = sorted(set(TOKEN_PATTERN.findall(query)))
+    if not terms:
+        return []
+
+    filters = [{"$contains": term} for term in terms]
+    results = collection.get(
+        where_document=filters[0] if len(filters) == 1 else {"$or": filters},
+        limit=get_settings().rerank_candidates,
+        include=["documents", "metadatas"]
+    )
+
+    # Score as a distance (lower is better) like the other stages: the share
+    # of query terms a chunk is missing.
+    scores = lexical_scores(query, results["documents"], None)
+    order = sorted(range(len(scores)), key=lambda i: -scores[i])[:top_k]
+    return [
+        {
+            "id": results["ids"][i],
+            "text": results["documents"][i],
+            "metadata": results["metadatas"][i] if results["metadatas"] else None,
+            "score": 1.0 - scores[i]
+        }
+        for i in order
+    ]
+
+
+def dense_search(collection, query_embedding, top_k):
     results = collection.query(
-        query_texts=[query],
+        query_embeddings=[query_embedding],
         n_results=top_k,
         include=["documents", "metadatas", "distances"]
     )
@@ -10,9 +127,67 @@ def search_chunks(query: str, top_k: int = 5):
     hits = []
     for i in range(len(results["documents"][0])):
         hits.append({
+            "id": results["ids"][0][i],
             "text": results["documents"][0][i],
             "metadata": results["metadatas"][0][i] if results["metadatas"] else None,
             "score": results["distances"][0][i]
         })
 
     return hits
+
+
+def quantized_search(collection, query_embedding, top_k, quantization):
+    # Imported on first use, so only processes with the quantized tier on load numpy.
+    from database.quantization import quantized_indexes
+
+    index = quantized_indexes.get(collection, quantization, get_settings().quantized_rescore_factor)
+    records = {}
+
+    def fetch_vectors(ids):
+        # One get() returns the float vectors for re-scoring and the payload
+        # for the final hits.
+        data = collection.get(ids=ids, include=["embeddings", "documents", "metadatas"])
+        for i, doc_id in enumerate(data["ids"]):
+            records[doc_id] = (data["documents"][i], data["metadatas"][i])
+        return data["ids"], data["embeddings"]
+
+    hits = []
+    for doc_id, distance in index.search(query_embedding, top_k, fetch_vectors):
+        text, metadata = records[doc_id]
+        hits.append({
+            "id": doc_id,
+            "text": text,
+            "metadata": metadata,
+            "score": distance
+        })
+
+    return hits
+
+
+def expand_hits(collection, hits, n):
+    """Attach up to n chunks on either side of each hit as its neighbors.
+
+    Neighbor IDs follow from each hit's ID and ordinal, so all of them are
+    fetched with a single get() instead of further vector queries.
+    """
+    def hit_neighbor_ids(hit):
+        ordinal = (hit.get("metadata") or {}).get("ordinal")
+        if ordinal is None or not hit.get("id"):
+            return []
+        return neighbor_ids(hit["id"], ordinal, n)
+
+    wanted = list(dict.fromkeys(doc_id for hit in hits for doc_id in hit_neighbor_ids(hit)))
+    if not wanted:
+        return hits
+
+    found = collection.get(ids=wanted, include=["documents", "metadatas"])
+    chunks = {
+        doc_id: {"id": doc_id, "text": found["documents"][i], "ordinal": (found["metadatas"][i] or {}).get("ordinal")}
+        for i, doc_id in enumerate(found["ids"])
+    }
+
+    expanded = []
+    for hit in hits:
+        neighbors = [chunks[doc_id] for doc_id in hit_neighbor_ids(hit) if doc_id in chunks]
+        expanded.append(dict(hit, neighbors=sorted(neighbors, key=lambda chunk: chunk["ordinal"])))
+    return expanded
@@ -0,0 +1,180 @@
+import hashlib
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from config.settings import get_settings
+
+SHARD_SEPARATOR = "__s"
+RESULT_FIELDS = ("embeddings", "documents", "metadatas", "distances", "uris", "data")
+
+
+def shard_name(name, shard):
+    return f"{name}{SHARD_SEPARATOR}{shard}"
+
+
+def unshard_name(name):
+    base, sep, shard = name.rpartition(SHARD_SEPARATOR)
+    if sep and shard.isdigit():
+        return base
+    return name
+
+
+def shard_for(doc_id, shard_count):
+    # A stable hash (unlike hash()) so every worker routes an ID to the same shard.
+    digest = hashlib.blake2b(doc_id.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") % shard_count
+
+
+def iter_pages(collection, page_size, **kwargs):
+    """Yield get() pages of a collection, filtered by kwargs (where, include, ...).
+
+    A sharded collection is walked shard by shard with an offset into the
+    current shard, so no page has to skip over the rows of earlier shards.
+    """
+    for part in getattr(collection, "shards", None) or [collection]:
+        offset = 0
+        while True:
+            page = part.get(limit=page_size, offset=offset, **kwargs)
+            if not page["ids"]:
+                break
+            yield page
+            offset += len(page["ids"])
+
+
+def _rows(result, include, i):
+    return {field: (result[field][i] if result.get(field) is not None else None) for field in include}
+
+
+class ShardedCollection:
+    """A logical collection hash-partitioned by ID over several Chroma collections.
+
+    Writes are routed to the owning shard; queries fan out to every shard
+    concurrently and the per-shard top-k lists are merged with a heap.
+    """
+
+    def __init__(self, name, shards, executor):
+        self.name = name
+        self.shards = shards
+        self.executor = executor
+
+    def _map(self, calls):
+        futures = [self.executor.submit(fn, *args) for fn, *args in calls]
+        return [future.result() for future in futures]
+
+    def _partition(self, ids, **columns):
+        groups = {}
+        for i, doc_id in enumerate(ids):
+            group = groups.setdefault(shard_for(doc_id, len(self.shards)), {"ids": []})
+            group["ids"].append(doc_id)
+            for field, values in columns.items():
+                if values is not None:
+                    group.setdefault(field, []).append(values[i])
+        return groups
+
+    def _write(self, method, ids, **columns):
+        groups = self._partition(ids, **columns)
+        self._map(
+            (lambda shard, kwargs: getattr(self.shards[shard], method)(**kwargs), shard, kwargs)
+            for shard, kwargs in groups.items()
+        )
+
+    def add(self, ids, embeddings=None, metadatas=None, documents=None, **kwargs):
+        self._write("add", ids, embeddings=embeddings, metadatas=metadatas, documents=documents)
+
+    def upsert(self, ids, embeddings=None, metadatas=None, documents=None, **kwargs):
+        self._write("upsert", ids, embeddings=embeddings, metadatas=metadatas, documents=documents)
+
+    def update(self, ids, embeddings=None, metadatas=None, documents=None, **kwargs):
+        self._write("update", ids, embeddings=embeddings, metadatas=metadatas, documents=documents)
+
+    def delete(self, ids=None, where=None, **kwargs):
+        if ids is not None:
+            self._write("delete", ids)
+        else:
+            self._map((shard.delete, None, where) for shard in self.shards)
+
+    def count(self):
+        return sum(self._map((shard.count,) for shard in self.shards))
+
+    def get(self, ids=None, where=None, limit=None, offset=None, where_document=None,
+            include=("metadatas", "documents"), **kwargs):
+        include = list(include)
+
+        if ids is not None:
+            groups = self._partition(ids)
+            results = self._map(
+                (lambda shard, shard_ids: self.shards[shard].get(ids=shard_ids, include=include), shard, group["ids"])
+                for shard, group in groups.items()
+            )
+            rows = {}
+            for result in results:
+                for i, doc_id in enumerate(result["ids"]):
+                    rows[doc_id] = _rows(result, include, i)
+            found = [doc_id for doc_id in ids if doc_id in rows]
+            return self._assemble(found, [rows[doc_id] for doc_id in found], include)
+
+        # Pages walk the shards in order, so offsets stay stable between calls.
+        # A filtered page has to count the matches of every shard before its
+        # offset; full scans should use iter_pages() instead.
+        offset = offset or 0
+        found, rows = [], []
+        for shard in self.shards:
+            if limit is not None and len(found) >= limit:
+                break
+            if where is None and where_document is None:
+                size = shard.count()
+            else:
+                size = len(shard.get(where=where, where_document=where_document, include=[])["ids"])
+            if offset >= size:
+                offset -= size
+                continue
+            remaining = None if limit is None else limit - len(found)
+            result = shard.get(where=where, where_document=where_document, limit=remaining, offset=offset,
+                               include=include)
+            offset = 0
+            for i, doc_id in enumerate(result["ids"]):
+                found.append(doc_id)
+                rows.append(_rows(result, include, i))
+        return self._assemble(found, rows, include)
+
+    def query(self, query_embeddings=None, n_results=10, where=None, include=("metadatas", "documents", "distances"), **kwargs):
+        include = list(include)
+        if "distances" not in include:
+            include.append("distances")
+
+        results = self._map(
+            (lambda shard: shard.query(query_embeddings=query_embeddings, n_results=n_results,
+                                       where=where, include=include), shard)
+            for shard in self.shards
+        )
+
+        merged = {"ids": []}
+        merged.update({field: ([] if field in include else None) for field in RESULT_FIELDS})
+        for q in range(len(query_embeddings)):
+            candidates = []
+            for result in results:
+                for i, doc_id in enumerate(result["ids"][q]):
+                    candidates.append((result["distances"][q][i], doc_id, result, i))
+
+            best = heapq.nsmallest(n_results, candidates, key=lambda candidate: candidate[0])
+            merged["ids"].append([doc_id for _, doc_id, _, _ in best])
+            for field in include:
+                merged[field].append([
+                    result[field][q][i] if result.get(field) is not None else None
+                    for _, _, result, i in best
+                ])
+        merged["included"] = include
+        return merged
+
+    @staticmethod
+    def _assemble(ids, rows, include):
+        result = {"ids": ids, "included": include}
+        for field in RESULT_FIELDS:
+            result[field] = [row[field] for row in rows] if field in include else None
+        return result
+
+
+@lru_cache(maxsize=1)
+def get_shard_executor():
+    return ThreadPoolExecutor(max_workers=get_settings().shard_workers, thread_name_prefix="shard")
@@ -0,0 +1,217 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections import Counter
+
+from config.settings import get_settings
+
+UNKNOWN_SOURCE = "unknown"
+
+logger = logging.getLogger(__name__)
+
+
+class CollectionStats:
+    """Per-source vector counts and churn, seeded from Chroma once and kept up to date on writes.
+
+    Removed counts every vector deleted or overwritten since the collection
+    was created or compacted; the index keeps those as dead entries. It is
+    kept in a file next to the alias file, so it adds up the writes of every
+    worker and survives restarts.
+    """
+
+    def __init__(self, page_size=1000, removed_path=None):
+        self.page_size = page_size
+        # None keeps the removed counts next to the alias file.
+        self.removed_path = removed_path
+        self.sources = {}
+        self.lock = threading.Lock()
+
+    def removed_file(self):
+        return self.removed_path or f"{get_settings().alias_path}.removed.json"
+
+    def read_removed(self):
+        try:
+            with open(self.removed_file(), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _store_removed(self, name, n=None):
+        """Add n to the removed count of name, or forget name if n is None."""
+        from database.chroma import file_lock
+
+        path = self.removed_file()
+        with file_lock(f"{path}.lock"):
+            removed = self.read_removed()
+            if n is None:
+                if removed.pop(name, None) is None:
+                    return
+            else:
+                removed[name] = removed.get(name, 0) + n
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(removed, f)
+            os.replace(tmp_path, path)
+
+    def scan(self, collection):
+        counts = Counter()
+        offset = 0
+        while True:
+            page = collection.get(limit=self.page_size, offset=offset, include=["metadatas"])
+            if not page["ids"]:
+                return counts
+            for metadata in page["metadatas"] or []:
+                counts[(metadata or {}).get("source", UNKNOWN_SOURCE)] += 1
+            offset += len(page["ids"])
+
+    def _seed(self, collection):
+        if collection.name not in self.sources:
+            counts = self.scan(collection)
+            with self.lock:
+                self.sources.setdefault(collection.name, counts)
+
+    def record(self, collection, added=(), removed=()):
+        """Apply a write: added and removed are the sources of the vectors
+        stored and dropped (an overwrite is both)."""
+        if removed:
+            self._store_removed(collection.name, len(removed))
+        with self.lock:
+            # Not seeded yet: the first snapshot's scan will include this write.
+            counts = self.sources.get(collection.name)
+            if counts is None:
+                return
+            counts.update(source or UNKNOWN_SOURCE for source in added)
+            counts.subtract(source or UNKNOWN_SOURCE for source in removed)
+
+    def total(self, collection):
+        self._seed(collection)
+        with self.lock:
+            return sum(n for n in self.sources[collection.name].values() if n > 0)
+
+    def reconcile(self, collection):
+        """Rescan a collection whose Chroma count no longer matches ours.
+
+        Catches writes made outside this worker (other workers, scripts).
+        Returns whether the counts had drifted.
+        """
+        actual = collection.count()
+        if actual == self.total(collection):
+            return False
+        counts = self.scan(collection)
+        with self.lock:
+            self.sources[collection.name] = counts
+        logger.info("Reconciled vector counts of %s (%d vectors)", collection.name, actual)
+        return True
+
+    def names(self):
+        with self.lock:
+            return list(self.sources)
+
+    def snapshot(self, collection):
+        self._seed(collection)
+        removed = self.read_removed().get(collection.name, 0)
+        with self.lock:
+            sources = {source: n for source, n in self.sources[collection.name].items() if n > 0}
+            return {"count": sum(sources.values()), "sources": sources, "removed": removed}
+
+    def reset(self, name):
+        with self.lock:
+            self.sources.pop(name, None)
+        self._store_removed(name)
+
+
+vector_stats = CollectionStats()
+
+
+class StatsReconciler:
+    """Periodically reconciles every collection tracked by any of trackers against Chroma.
+
+    A tracker has names(), reconcile(collection) and reset(name), like
+    CollectionStats and TenantUsage.
+    """
+
+    def __init__(self, trackers, open_collection, interval):
+        self.trackers = trackers
+        self.open_collection = open_collection
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def reconcile_all(self):
+        from chromadb.errors import NotFoundError
+
+        for tracker in self.trackers:
+            for name in tracker.names():
+                try:
+                    tracker.reconcile(self.open_collection(name))
+                except NotFoundError:
+                    # Dropped by another worker (GC, compaction): stop tracking
+                    # it rather than bringing it back.
+                    tracker.reset(name)
+                except Exception:
+                    logger.exception("Reconciling vector counts of %s failed", name)
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self.reconcile_all()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="stats-reconciler", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+
+
+def start_reconciler():
+    from database.chroma import open_collection
+    from database.tenants import usage
+
+    trackers = [vector_stats, usage]
+    if get_settings().quantization:
+        from database.quantization import quantized_indexes
+
+        trackers.append(quantized_indexes)
+    # Existing collections only: a tracked name may have been dropped since.
+    return StatsReconciler(
+        trackers,
+        lambda name: open_collection(name, create=False),
+        get_settings().counter_reconcile_seconds
+    ).start()
+
+
+def segment_dirs(collection):
+    """Directories holding the on-disk vector index of an embedded collection."""
+    settings = get_settings()
+    db_path = os.path.join(settings.chroma_path, "chroma.sqlite3")
+    if settings.chroma_mode != "embedded" or settings.shard_urls or not os.path.exists(db_path):
+        return None
+
+    shards = getattr(collection, "shards", [collection])
+    ids = [str(shard.id) for shard in shards]
+    db = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        rows = db.execute(
+            f"SELECT id FROM segments WHERE scope = 'VECTOR' AND collection IN ({','.join('?' * len(ids))})",
+            ids
+        ).fetchall()
+    finally:
+        db.close()
+    return [os.path.join(settings.chroma_path, row[0]) for row in rows] or None
+
+
+def disk_bytes(collection):
+    dirs = segment_dirs(collection)
+    if dirs is None:
+        return None
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for path in dirs
+        for root, _, names in os.walk(path)
+        for name in names
+    )
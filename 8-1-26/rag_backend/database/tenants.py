@@ -0,0 +1,112 @@
+import re
+import threading
+
+from config.settings import get_settings
+
+TENANT_SEPARATOR = "__t_"
+TENANT_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]{0,62}$")
+
+
+class TenantLimitExceeded(Exception):
+    pass
+
+
+def tenant_collection_name(tenant: str):
+    if not TENANT_PATTERN.match(tenant):
+        raise ValueError(f"Invalid tenant: {tenant!r}")
+    return f"{get_settings().collection_name}{TENANT_SEPARATOR}{tenant}"
+
+
+def tenant_of(collection_name: str):
+    prefix = f"{get_settings().collection_name}{TENANT_SEPARATOR}"
+    if collection_name.startswith(prefix):
+        return collection_name[len(prefix):]
+    return None
+
+
+class TenantUsage:
+    """Per-tenant vector counts, seeded from Chroma once and kept up to date on writes.
+
+    A count includes reservations for writes still in flight; pending holds
+    those, so reconciling against Chroma does not lose them.
+    """
+
+    def __init__(self, max_vectors=None):
+        # None follows max_vectors_per_tenant, read on every reservation.
+        self.max_vectors = max_vectors
+        self.counts = {}
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def limit(self):
+        return get_settings().max_vectors_per_tenant if self.max_vectors is None else self.max_vectors
+
+    def count(self, collection):
+        with self.lock:
+            if collection.name not in self.counts:
+                self.counts[collection.name] = collection.count()
+            return self.counts[collection.name]
+
+    def reserve(self, collection, n):
+        tenant = tenant_of(collection.name)
+        if tenant is None:
+            return
+        self.count(collection)
+        limit = self.limit()
+        with self.lock:
+            current = self.counts[collection.name]
+            if limit and current + n > limit:
+                raise TenantLimitExceeded(
+                    f"Tenant '{tenant}' would hold {current + n} vectors (limit {limit})"
+                )
+            self.counts[collection.name] = current + n
+            self.pending[collection.name] = self.pending.get(collection.name, 0) + n
+
+    def settle(self, collection, reserved, stored):
+        """Close a reservation of which only stored vectors were written."""
+        with self.lock:
+            if collection.name not in self.pending:
+                return
+            self.pending[collection.name] = max(0, self.pending[collection.name] - reserved)
+            if collection.name in self.counts:
+                self.counts[collection.name] = max(0, self.counts[collection.name] - (reserved - stored))
+
+    def release(self, collection, n):
+        with self.lock:
+            if collection.name in self.counts:
+                self.counts[collection.name] = max(0, self.counts[collection.name] - n)
+
+    def reconcile(self, collection):
+        """Recount a collection from Chroma, keeping in-flight reservations.
+
+        Catches writes made by other workers and reservations a crashed
+        request never settled. Returns whether the count had drifted.
+        """
+        actual = collection.count()
+        with self.lock:
+            if collection.name not in self.counts:
+                return False
+            expected = actual + self.pending.get(collection.name, 0)
+            drifted = self.counts[collection.name] != expected
+            self.counts[collection.name] = expected
+            return drifted
+
+    def names(self):
+        with self.lock:
+            return list(self.counts)
+
+    def reset(self, name):
+        with self.lock:
+            self.counts.pop(name, None)
+            self.pending.pop(name, None)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                tenant_of(name): count
+                for name, count in self.counts.items()
+                if tenant_of(name) is not None
+            }
+
+
+usage = TenantUsage()
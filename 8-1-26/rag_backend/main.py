@@ -1,13 +1,50 @@
-from fastapi import FastAPI
-from routes import vectors, search
-from database.retriever import search_chunks
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse
+from config.settings import get_settings
+from database.chroma import EmbeddingDimensionMismatch
+from routes import chat, vectors, search
 
 import sys, os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-app = FastAPI(title="RAG API with Chroma")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    background = []
+    if get_settings().watch_enabled:
+        from services.watcher import start_watcher
+
+        background.append(start_watcher())
+    if get_settings().counter_reconcile_seconds > 0:
+        from database.stats import start_reconciler
+
+        background.append(start_reconciler())
+    yield
+    for task in background:
+        task.stop()
+
+
+app = FastAPI(title="RAG API with Chroma", lifespan=lifespan)
+app.add_middleware(GZipMiddleware, minimum_size=get_settings().gzip_min_size)
 
 app.include_router(vectors.router)
 app.include_router(search.router)
+app.include_router(chat.router)
+
+
+@app.exception_handler(EmbeddingDimensionMismatch)
+def embedding_dimension_mismatch(request: Request, exc: EmbeddingDimensionMismatch):
+    # Vectors stored under an older embedding model cannot be searched or
+    # extended until the collection's documents are re-embedded.
+    return JSONResponse(status_code=409, content={
+        "detail": str(exc),
+        "stored_dimension": exc.stored,
+        "current_dimension": exc.current,
+        "reembed": exc.migration_url()
+    })
 
 
 @app.get("/")
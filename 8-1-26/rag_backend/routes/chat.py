@@ -0,0 +1,52 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+from config.settings import Settings, get_settings
+from database.chroma import get_collection
+from database.retriever import expand_hits, search_chunks
+from schemas.requests import ChatRequest
+from schemas.responses import ChatResponse
+from services.llm import generate
+from services.scheduler import GenerationCancelled, GenerationTimeout, SchedulerBusy, get_scheduler, wait_for_job
+
+router = APIRouter(prefix="/chat", tags=["Chat"])
+
+
+def hit_window(hit):
+    # The hit and its neighbors, in document order.
+    ordinal = (hit.get("metadata") or {}).get("ordinal")
+    chunks = (hit.get("neighbors") or []) + [{"text": hit["text"], "ordinal": ordinal}]
+    return " ".join(chunk["text"] for chunk in sorted(chunks, key=lambda chunk: chunk["ordinal"] or 0))
+
+
+@router.post("/", response_model=ChatResponse, response_model_exclude_none=True)
+async def chat(request: ChatRequest, http_request: Request, collection=Depends(get_collection),
+               settings: Settings = Depends(get_settings)):
+    hits = await run_in_threadpool(search_chunks, collection, request.query, request.k)
+    if request.expand:
+        hits = await run_in_threadpool(expand_hits, collection, hits, request.expand)
+    context = "\n\n".join(hit_window(hit) for hit in hits)
+
+    try:
+        job = get_scheduler().submit(
+            settings.llm_model,
+            lambda cancelled: generate(context, request.query, request.session_id, cancelled),
+            settings.llm_queue_timeout_seconds
+        )
+        result = await wait_for_job(
+            job, http_request, settings.llm_queue_timeout_seconds + settings.llm_timeout_seconds
+        )
+    except SchedulerBusy as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
+    except GenerationTimeout as exc:
+        raise HTTPException(status_code=504, detail=str(exc))
+    except GenerationCancelled:
+        # Nobody is listening any more; 499 only shows up in access logs.
+        return Response(status_code=499)
+
+    return {**result, "sources": hits}
+
+
+@router.get("/scheduler")
+def scheduler_status():
+    return {"models": get_scheduler().snapshot()}
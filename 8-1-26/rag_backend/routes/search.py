@@ -1,13 +1,53 @@
-from fastapi import APIRouter
-from database.retriever import search_chunks
+import json
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from config.settings import Settings, get_settings
+from database.chroma import EmbeddingDimensionMismatch, get_collection
+from database.retriever import expand_hits, search_chunks, search_stages
+from schemas.responses import SearchResponse, SearchStage
+from services.rerank import SCORERS
+from utils.serialization import negotiate
 
 router = APIRouter(prefix="/search", tags=["Search"])
 
-@router.get("/")
-def search(query: str, k: int = 5):
-    results = search_chunks(query, k)
-    return {
+@router.get("/", response_model=SearchResponse, response_model_exclude_none=True)
+def search(request: Request, query: str, k: int = 5, rerank: Optional[str] = None,
+           stream: Optional[Literal["ndjson", "sse"]] = None, expand: int = Query(0, ge=0, le=10),
+           collection=Depends(get_collection), settings: Settings = Depends(get_settings)):
+    rerank = rerank or settings.rerank_scorer
+    if rerank is not None and rerank not in SCORERS:
+        raise HTTPException(status_code=400, detail=f"Unknown rerank scorer: {rerank}")
+
+    if stream:
+        return StreamingResponse(
+            stream_search(collection, query, k, rerank, stream, expand),
+            media_type="text/event-stream" if stream == "sse" else "application/x-ndjson"
+        )
+
+    results = search_chunks(collection, query, k, reranker=rerank)
+    if expand:
+        results = expand_hits(collection, results, expand)
+    return negotiate(request, {
         "query": query,
         "top_k": k,
         "results": results
-    }
+    })
+
+
+def stream_search(collection, query, k, rerank, fmt, expand=0):
+    """Emit each stage's results as soon as it finishes, then a done marker."""
+    def encode(event, data):
+        return f"event: {event}\ndata: {data}\n\n" if fmt == "sse" else data + "\n"
+
+    stage = None
+    try:
+        for stage, hits in search_stages(collection, query, k, reranker=rerank, lexical=True):
+            if expand:
+                hits = expand_hits(collection, hits, expand)
+            results = SearchStage(stage=stage, query=query, top_k=k, results=hits)
+            yield encode("results", results.model_dump_json(exclude_none=True))
+    except EmbeddingDimensionMismatch as exc:
+        yield encode("error", json.dumps({"event": "error", "detail": str(exc)}))
+    yield encode("done", json.dumps({"event": "done", "final_stage": stage}))
@@ -1,77 +1,267 @@
-from fastapi import APIRouter
-import uuid
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+import json
+from typing import Optional
 
-from database.chroma import collection
+from config.settings import Settings, get_settings
+from database.chroma import (
+    EmbeddingDimensionMismatch,
+    check_dimension,
+    get_collection,
+    get_collection_cache,
+    get_writable_collection,
+    maintenance_running,
+    resolve_collection_name,
+    write_gate,
+)
+from database.reindex import compact, last_maintenance, list_versions, reembed, reindex
+from database.stats import disk_bytes, vector_stats
+from database.tenants import TenantLimitExceeded, tenant_of, usage
+from database.retriever import search_chunks
+from services.embeddings import generate_embedding
+from services.ingest import collection_changed, ingest_chunks, iter_ingest_ids, list_ingest_ids, resume_point
+from services.reduction import reduce_embeddings
 from utils.chunking import read_docs_file, split_text
 from schemas.requests import QueryRequest, UpdateRequest, DeleteRequest
+from schemas.responses import CountResponse, ReadResponse
+from utils.serialization import negotiate
 
 router = APIRouter(prefix="/vectors", tags=["Vectors"])
 
 
 @router.post("/create")
-def create_vector():
+def create_vector(stream: bool = False, collection=Depends(get_writable_collection), settings: Settings = Depends(get_settings)):
     text = read_docs_file()
-    chunks = split_text(text)
+    # MinHash dedup runs on numpy, which stays out of app startup until here.
+    from utils.dedup import dedup_chunks
 
-    stored_ids = []
+    chunks, duplicate_counts, dedup_stats = dedup_chunks(split_text(text), settings.dedup_enabled)
 
-    for chunk in chunks:
-        doc_id = str(uuid.uuid4())
+    # A previous run of this ingest that died part-way resumes after its last
+    # committed batch instead of storing everything again.
+    ingest_id, start = resume_point(collection, chunks)
 
-        collection.add(
-            documents=[chunk],
-            ids=[doc_id],
-            metadatas=[{"source": "docs.txt"}]
-        )
+    reserved = len(chunks) - start
+    try:
+        usage.reserve(collection, reserved)
+    except TenantLimitExceeded as exc:
+        raise HTTPException(status_code=413, detail=str(exc))
+
+    def charged(progress):
+        # Whatever a failed or abandoned ingest did not store goes back to
+        # the tenant; a resume reserves it again.
+        stored = start
+        try:
+            for update in progress:
+                stored = update["stored"]
+                yield update
+        finally:
+            usage.settle(collection, reserved, stored - start)
+
+    progress = charged(ingest_chunks(collection, chunks, duplicate_counts, ingest_id, start=start))
+
+    def summary(stored):
+        return {
+            "message": "Documents embedded and stored successfully",
+            "ingest_id": ingest_id,
+            "chunks_stored": stored,
+            "resumed_from": start,
+            "dedup": dedup_stats,
+            "ids_url": f"/vectors/ingests/{ingest_id}/ids"
+        }
+
+    if stream:
+        def events():
+            stored = start
+            try:
+                for update in progress:
+                    stored = update["stored"]
+                    yield json.dumps({"event": "progress", **update}) + "\n"
+            except EmbeddingDimensionMismatch as exc:
+                # The status line has gone out already, so the error is an event.
+                yield json.dumps({"event": "error", "detail": str(exc)}) + "\n"
+                return
+            yield json.dumps({"event": "done", **summary(stored)}) + "\n"
+
+        return StreamingResponse(events(), media_type="application/x-ndjson")
 
-        stored_ids.append(doc_id)
+    stored = start
+    for update in progress:
+        stored = update["stored"]
+    return summary(stored)
 
+
+@router.get("/ingests/{ingest_id}/ids")
+def ingest_ids(ingest_id: str, limit: int = Query(1000, ge=1, le=10000), offset: int = Query(0, ge=0),
+               fmt: str = Query("json", alias="format"), collection=Depends(get_collection)):
+    if fmt == "ndjson":
+        lines = (json.dumps({"id": doc_id}) + "\n" for doc_id in iter_ingest_ids(collection, ingest_id))
+        return StreamingResponse(lines, media_type="application/x-ndjson")
+
+    ids = list_ingest_ids(collection, ingest_id, limit, offset)
     return {
-        "message": "Documents embedded and stored successfully",
-        "chunks_stored": len(stored_ids),
-        "document_ids": stored_ids
+        "ingest_id": ingest_id,
+        "offset": offset,
+        "limit": limit,
+        "ids": ids,
+        "next_offset": offset + len(ids) if len(ids) == limit else None
     }
 
 
-@router.post("/read")
-def read_vectors(request: QueryRequest):
-    results = collection.query(
-        query_texts=[request.query],
-        n_results=3
-    )
+@router.post("/read", response_model=ReadResponse)
+def read_vectors(request: QueryRequest, http_request: Request, collection=Depends(get_collection)):
+    hits = search_chunks(collection, request.query, 3)
 
     response = []
 
-    for i in range(len(results["documents"][0])):
+    for hit in hits:
         response.append({
-            "document": results["documents"][0][i],
-            "metadata": results["metadatas"][0][i],
-            "distance": results["distances"][0][i]
+            "document": hit["text"],
+            "metadata": hit["metadata"],
+            "distance": hit["score"]
         })
 
-    return {
+    return negotiate(http_request, {
         "query": request.query,
         "results": response
-    }
+    })
 
 
 @router.post("/update")
-def update_vector(request: UpdateRequest):
-    collection.upsert(
-        ids=[request.id],
-        documents=[request.updated_text],
-        metadatas=[{"source": "docs.txt", "type": "updated"}]
-    )
+def update_vector(request: UpdateRequest, collection=Depends(get_writable_collection)):
+    embeddings = reduce_embeddings(collection.name, [generate_embedding(request.updated_text, collection.name)])
+
+    with write_gate(collection) as collection:
+        existing = collection.get(ids=[request.id], include=["metadatas"])
+        reserved = 0 if existing["ids"] else 1
+        if reserved:
+            try:
+                usage.reserve(collection, reserved)
+            except TenantLimitExceeded as exc:
+                raise HTTPException(status_code=413, detail=str(exc))
+
+        stored = 0
+        try:
+            check_dimension(collection, embeddings)
+            collection.upsert(
+                ids=[request.id],
+                documents=[request.updated_text],
+                embeddings=embeddings,
+                metadatas=[{"source": "docs.txt", "type": "updated", **neighbor_links(existing)}]
+            )
+            stored = reserved
+        finally:
+            usage.settle(collection, reserved, stored)
+        collection_changed(
+            collection,
+            added=["docs.txt"],
+            removed=[(metadata or {}).get("source") for metadata in existing["metadatas"] or []],
+            ids=[request.id],
+            embeddings=embeddings
+        )
 
     return {"message": "Document updated successfully"}
 
 
-@router.get("/count")
-def count_vectors():
-    return {"count": collection.count()}
+def neighbor_links(existing):
+    # An edited chunk keeps its place among its neighbors.
+    metadata = (existing["metadatas"] or [None])[0] or {}
+    return {key: metadata[key] for key in ("ordinal", "prev_id", "next_id") if key in metadata}
+
+
+@router.get("/count", response_model=CountResponse)
+def count_vectors(collection=Depends(get_collection)):
+    # Served from the in-memory counters; the reconciler keeps them honest.
+    return {"count": vector_stats.total(collection)}
+
+
+@router.get("/stats")
+def vector_store_stats(collection=Depends(get_collection)):
+    stats = vector_stats.snapshot(collection)
+    size = disk_bytes(collection)
+    # Deleted and overwritten vectors stay in the index until compaction.
+    dead = stats["removed"]
+    return {
+        "collection": collection.name,
+        "count": stats["count"],
+        "sources": stats["sources"],
+        "index_bytes": size,
+        "bytes_per_vector": size / stats["count"] if size is not None and stats["count"] else None,
+        "removed_since_compaction": dead,
+        "fragmentation": dead / (stats["count"] + dead) if stats["count"] + dead else 0.0
+    }
+
+
+@router.post("/compact")
+def compact_vectors(background_tasks: BackgroundTasks):
+    if maintenance_running():
+        raise HTTPException(status_code=409, detail="A reindex or compaction is already running")
+    background_tasks.add_task(compact)
+    return {
+        "message": "Compaction started",
+        "live_collection": resolve_collection_name()
+    }
 
 
 @router.post("/delete")
-def delete_vector(request: DeleteRequest):
-    collection.delete(ids=[request.id])
+def delete_vector(request: DeleteRequest, collection=Depends(get_collection)):
+    with write_gate(collection) as collection:
+        existing = collection.get(ids=[request.id], include=["metadatas"])
+        if existing["ids"]:
+            collection.delete(ids=[request.id])
+            usage.release(collection, 1)
+            collection_changed(
+                collection,
+                removed=[(metadata or {}).get("source") for metadata in existing["metadatas"]],
+                deleted_ids=[request.id]
+            )
     return {"message": "Document deleted successfully"}
+
+
+@router.post("/reindex")
+def reindex_vectors(background_tasks: BackgroundTasks, settings: Settings = Depends(get_settings)):
+    if maintenance_running():
+        raise HTTPException(status_code=409, detail="A reindex or compaction is already running")
+    from utils.dedup import dedup_chunks
+
+    chunks, _, dedup_stats = dedup_chunks(split_text(read_docs_file()), settings.dedup_enabled)
+    metadatas = [{"source": "docs.txt"} for _ in chunks]
+
+    background_tasks.add_task(reindex, chunks, metadatas)
+
+    return {
+        "message": "Reindex started",
+        "chunks": len(chunks),
+        "dedup": dedup_stats,
+        "live_collection": resolve_collection_name()
+    }
+
+
+@router.post("/reembed")
+def reembed_vectors(background_tasks: BackgroundTasks, tenant: Optional[str] = None, collection=Depends(get_collection)):
+    if maintenance_running():
+        raise HTTPException(status_code=409, detail="A reindex or compaction is already running")
+    # Unlike /reindex, the collection's own stored documents are re-embedded.
+    background_tasks.add_task(reembed, tenant)
+    return {
+        "message": "Re-embedding started",
+        "collection": collection.name
+    }
+
+
+@router.get("/versions")
+def collection_versions():
+    return {
+        "live_collection": resolve_collection_name(),
+        "versions": list_versions(),
+        "last_maintenance": last_maintenance()
+    }
+
+
+@router.get("/tenants")
+def tenant_usage():
+    return {
+        "limit": usage.limit(),
+        "counts": usage.snapshot(),
+        "open_tenants": [tenant_of(name) for name in get_collection_cache().names() if tenant_of(name)]
+    }
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseModel
 
 class QueryRequest(BaseModel):
@@ -12,3 +14,7 @@ class DeleteRequest(BaseModel):
 
 class ChatRequest(BaseModel):
     query: str
+    session_id: Optional[str] = None
+    k: int = 3
+    # Chunks on either side of each hit to add to the context
+    expand: int = 0
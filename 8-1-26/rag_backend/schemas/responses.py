@@ -0,0 +1,44 @@
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+class NeighborChunk(BaseModel):
+    id: str
+    text: str
+    ordinal: Optional[int] = None
+
+class SearchHit(BaseModel):
+    id: Optional[str] = None
+    text: str
+    metadata: Optional[dict[str, Any]] = None
+    score: float
+    rerank_score: Optional[float] = None
+    neighbors: Optional[list[NeighborChunk]] = None
+
+class SearchResponse(BaseModel):
+    query: str
+    top_k: int
+    results: list[SearchHit]
+
+class SearchStage(SearchResponse):
+    event: str = "results"
+    stage: str
+
+class ReadHit(BaseModel):
+    document: str
+    metadata: Optional[dict[str, Any]] = None
+    distance: float
+
+class ReadResponse(BaseModel):
+    query: str
+    results: list[ReadHit]
+
+class ChatResponse(BaseModel):
+    answer: str
+    session_id: str
+    sources: list[SearchHit]
+    prompt_eval_count: Optional[int] = None
+    prompt_eval_ms: Optional[float] = None
+
+class CountResponse(BaseModel):
+    count: int
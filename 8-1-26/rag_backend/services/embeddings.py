@@ -1,9 +1,125 @@
-import ollama
-from config.settings import EMBEDDING_MODEL
-
-def generate_embedding(text: str):
-    response = ollama.embeddings(
-        model=EMBEDDING_MODEL,
-        prompt=text
-    )
-    return response["embedding"]
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from functools import lru_cache
+
+from config.settings import get_settings
+from database.chroma import VERSION_SEPARATOR
+
+
+class OllamaBackend:
+    # Ollama serves one batched request much better than many single ones.
+    batched = True
+
+    def embed(self, texts):
+        # Imported on first use to keep ollama (and httpx) out of app startup.
+        import ollama
+
+        response = ollama.embed(
+            model=get_settings().embedding_model,
+            input=texts
+        )
+        return response["embeddings"]
+
+
+class HashingBackend:
+    batched = False
+
+    def __init__(self):
+        # Imported on first use to keep numpy out of app startup.
+        from services.hashing import HashingVectorizer
+
+        self.vectorizer = HashingVectorizer(get_settings().hashing_dim)
+
+    def embed(self, texts):
+        return self.vectorizer.transform(texts).tolist()
+
+
+EMBEDDING_BACKENDS = {
+    "ollama": OllamaBackend,
+    "hashing": HashingBackend,
+}
+
+
+def backend_name(collection_name=None):
+    settings = get_settings()
+    overrides = settings.collection_embedding_backends
+    if collection_name is not None:
+        for name in (collection_name, collection_name.split(VERSION_SEPARATOR)[0]):
+            if name in overrides:
+                return overrides[name]
+    return settings.embedding_backend
+
+
+@lru_cache(maxsize=None)
+def get_backend(name):
+    if name not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {name}")
+    return EMBEDDING_BACKENDS[name]()
+
+
+def embed_texts(texts: list[str], collection_name=None):
+    # One batched call; chunks and queries of a collection must go through
+    # the same backend so that stored and query vectors live in the same space.
+    return get_backend(backend_name(collection_name)).embed(texts)
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-text embeds into batched embed_texts calls.
+
+    The first pending text opens a window of max_wait_ms; everything queued
+    before it closes (up to batch_size texts) goes out as one request.
+    """
+
+    def __init__(self, embed, batch_size, max_wait_ms):
+        self.embed = embed
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.pending = queue.Queue()
+        self.lock = threading.Lock()
+        self.worker = None
+
+    def submit(self, text):
+        future = Future()
+        self.pending.put((text, future))
+        with self.lock:
+            if self.worker is None:
+                self.worker = threading.Thread(target=self._run, name="embed-batcher", daemon=True)
+                self.worker.start()
+        return future
+
+    def _collect(self):
+        batch = [self.pending.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self.pending.get(timeout=remaining) if remaining > 0 else self.pending.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                embeddings = self.embed([text for text, _ in batch])
+            except Exception as exc:
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+            for (_, future), embedding in zip(batch, embeddings):
+                future.set_result(embedding)
+
+
+@lru_cache(maxsize=None)
+def get_batcher(name):
+    settings = get_settings()
+    return MicroBatcher(get_backend(name).embed, settings.embedding_batch_size, settings.embedding_batch_wait_ms)
+
+def generate_embedding(text: str, collection_name=None):
+    name = backend_name(collection_name)
+    if not get_backend(name).batched:
+        return get_backend(name).embed([text])[0]
+    return get_batcher(name).submit(text).result()
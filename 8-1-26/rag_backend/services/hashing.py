@@ -0,0 +1,54 @@
+import re
+import zlib
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+class HashingVectorizer:
+    """Dense embeddings from hashed word and character n-grams, no model needed.
+
+    Each feature is hashed straight into one of `dim` buckets with a hashed
+    sign, so the sparse n-gram counts of a whole batch are projected to dense
+    vectors by one weighted bincount. Counts are sublinearly scaled
+    (1 + log tf) and rows L2-normalized, so dot products behave like TF
+    cosine similarity. Stateless: the same text always gets the same vector.
+    """
+
+    def __init__(self, dim=512, word_ngrams=2, char_ngrams=3):
+        self.dim = dim
+        self.word_ngrams = word_ngrams
+        self.char_ngrams = char_ngrams
+
+    def features(self, text):
+        words = TOKEN_PATTERN.findall(text.lower())
+        features = []
+        for n in range(1, self.word_ngrams + 1):
+            features.extend(" ".join(words[i:i + n]) for i in range(len(words) - n + 1))
+        if self.char_ngrams:
+            n = self.char_ngrams
+            for word in words:
+                padded = f"<{word}>"
+                features.extend("#" + padded[i:i + n] for i in range(max(1, len(padded) - n + 1)))
+        return features
+
+    def transform(self, texts):
+        rows, hashes = [], []
+        for row, text in enumerate(texts):
+            features = self.features(text)
+            hashes.extend(zlib.crc32(feature.encode("utf-8")) for feature in features)
+            rows.extend([row] * len(features))
+
+        hashes = np.asarray(hashes, dtype=np.uint32)
+        rows = np.asarray(rows, dtype=np.int64)
+        # Count each (row, bucket, sign) once, then scale the counts.
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0)
+        cells = (rows * self.dim + (hashes % self.dim)) * 2 + (signs > 0)
+        cells, counts = np.unique(cells, return_counts=True)
+        weights = (1.0 + np.log(counts)) * np.where(cells % 2, 1.0, -1.0)
+
+        dense = np.bincount(cells // 2, weights=weights, minlength=len(texts) * self.dim)
+        dense = dense.reshape(len(texts), self.dim).astype(np.float32)
+        norms = np.linalg.norm(dense, axis=1, keepdims=True)
+        return dense / np.where(norms > 0, norms, 1.0)
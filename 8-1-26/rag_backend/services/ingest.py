@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import uuid
+
+from config.settings import get_settings
+from database.cache import collection_versions
+from database.chroma import check_dimension, write_gate
+from database.sharding import iter_pages
+from database.stats import vector_stats
+from services.embeddings import embed_texts
+from services.reduction import prepare_projection, reduce_embeddings
+
+
+def collection_changed(collection, added=(), removed=(), ids=(), embeddings=None, deleted_ids=()):
+    # Every add, upsert or delete updates derived state for the collection;
+    # added/removed are the sources of the vectors stored and dropped, and
+    # ids/embeddings and deleted_ids are applied to any built quantized index.
+    from database.quantization import quantized_indexes
+
+    collection_versions.bump(collection.name)
+    quantized_indexes.update(collection.name, ids, embeddings, deleted_ids)
+    vector_stats.record(collection, added, removed)
+
+
+def chunks_fingerprint(chunks):
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        digest.update(chunk.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def checkpoint_path(collection_name, source):
+    return os.path.join(get_settings().checkpoint_dir, f"{collection_name}.{os.path.basename(source)}.json")
+
+
+def load_checkpoint(collection_name, source):
+    try:
+        with open(checkpoint_path(collection_name, source), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_checkpoint(collection_name, source, checkpoint):
+    path = checkpoint_path(collection_name, source)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def clear_checkpoint(collection_name, source):
+    try:
+        os.remove(checkpoint_path(collection_name, source))
+    except FileNotFoundError:
+        pass
+
+
+def resume_point(collection, chunks, source="docs.txt"):
+    """Return (ingest_id, first chunk to store) for an ingest of chunks.
+
+    An unfinished ingest of the same chunks into the same collection is picked
+    up after its last committed batch; anything else starts a new ingest.
+    """
+    checkpoint = load_checkpoint(collection.name, source)
+    if checkpoint and checkpoint["fingerprint"] == chunks_fingerprint(chunks):
+        return checkpoint["ingest_id"], checkpoint["next_chunk"]
+    return uuid.uuid4().hex, 0
+
+
+def chunk_id(run, index):
+    # Every chunk ID is "<run>-<ordinal>", so neighbors can be addressed
+    # without looking anything up.
+    return f"{run}-{index}"
+
+
+def link_metadata(run, index, total):
+    """Ordinal position and previous/next chunk IDs within a run of chunks."""
+    links = {"ordinal": index}
+    if index > 0:
+        links["prev_id"] = chunk_id(run, index - 1)
+    if index < total - 1:
+        links["next_id"] = chunk_id(run, index + 1)
+    return links
+
+
+def neighbor_ids(doc_id, ordinal, n):
+    """IDs of the up to n chunks on either side of a chunk, nearest first."""
+    suffix = f"-{ordinal}"
+    if not doc_id.endswith(suffix):
+        return []
+    run = doc_id[:-len(suffix)]
+    ids = []
+    for distance in range(1, n + 1):
+        if ordinal - distance >= 0:
+            ids.append(chunk_id(run, ordinal - distance))
+        ids.append(chunk_id(run, ordinal + distance))
+    return ids
+
+
+def ingest_chunks(collection, chunks, duplicate_counts, ingest_id, source="docs.txt", batch_size=None, start=0):
+    """Embed and store chunks batch by batch, yielding progress after each batch.
+
+    Chunk IDs are not accumulated; every chunk is tagged with ingest_id so the
+    IDs can be listed from the collection afterwards. After each batch the
+    next chunk offset is checkpointed, and IDs are derived from ingest_id and
+    the chunk offset, so re-storing a batch after a crash overwrites it.
+    """
+    batch_size = batch_size or get_settings().ingest_batch_size
+    fingerprint = chunks_fingerprint(chunks)
+    if start == 0:
+        prepare_projection(collection, chunks, lambda texts: embed_texts(texts, collection.name))
+
+    resumed = start > 0
+    stored = start
+    for start in range(start, len(chunks), batch_size):
+        batch = chunks[start:start + batch_size]
+        batch_metadatas = []
+        for i, count in enumerate(duplicate_counts[start:start + batch_size], start):
+            metadata = {"source": source, "ingest_id": ingest_id, **link_metadata(ingest_id, i, len(chunks))}
+            if count:
+                metadata["duplicates"] = count
+            batch_metadatas.append(metadata)
+
+        ids = [chunk_id(ingest_id, i) for i in range(start, start + len(batch))]
+        embeddings = reduce_embeddings(collection.name, embed_texts(batch, collection.name))
+
+        # A compaction that swaps the collection out finishes before this
+        # batch is stored, and the batch goes to its replacement.
+        with write_gate(collection) as collection:
+            # Only the first batch after a resume can already be stored.
+            replayed = len(collection.get(ids=ids, include=[])["ids"]) if resumed else 0
+            resumed = False
+
+            check_dimension(collection, embeddings)
+            collection.upsert(
+                documents=batch,
+                embeddings=embeddings,
+                ids=ids,
+                metadatas=batch_metadatas
+            )
+            collection_changed(
+                collection,
+                added=[source] * len(batch),
+                removed=[source] * replayed,
+                ids=ids,
+                embeddings=embeddings
+            )
+
+        stored += len(batch)
+        save_checkpoint(collection.name, source, {
+            "ingest_id": ingest_id,
+            "fingerprint": fingerprint,
+            "next_chunk": stored,
+            "total": len(chunks),
+            "last_batch": [chunk_id(ingest_id, start), chunk_id(ingest_id, stored - 1)]
+        })
+        yield {"stored": stored, "total": len(chunks)}
+
+    clear_checkpoint(collection.name, source)
+
+
+def list_ingest_ids(collection, ingest_id, limit, offset):
+    page = collection.get(where={"ingest_id": ingest_id}, limit=limit, offset=offset, include=[])
+    return page["ids"]
+
+
+def iter_ingest_ids(collection, ingest_id, page_size=1000):
+    for page in iter_pages(collection, page_size, where={"ingest_id": ingest_id}, include=[]):
+        yield from page["ids"]
@@ -1,22 +1,92 @@
-import ollama
-from config.settings import LLM_MODEL
+import time
+import uuid
+from functools import lru_cache
+
+from config.settings import get_settings
+from database.cache import TTLCache
+from services.scheduler import GenerationCancelled, GenerationTimeout
+
+# Kept byte-for-byte identical across calls and sent as the system prompt, so
+# the loaded model can reuse its evaluated prefix instead of re-reading it.
+SYSTEM_PROMPT = (
+    "You answer questions using the context supplied with each question. "
+    "If the context does not contain the answer, say that you do not know."
+)
+
+@lru_cache(maxsize=1)
+def get_chat_sessions():
+    settings = get_settings()
+    return TTLCache(settings.chat_session_cache_size, settings.chat_session_ttl_seconds)
+
+
+@lru_cache(maxsize=4)
+def get_llm_client(timeout: float):
+    # Imported on first use to keep ollama (and httpx) out of app startup.
+    import ollama
+
+    # The HTTP timeout bounds a stalled stream: without it a generation that
+    # stops sending tokens would never reach the deadline checks below.
+    return ollama.Client(timeout=timeout)
 
-def generate_answer(context: str, question: str):
-    prompt = f"""
-Based on the context below, answer the question.
 
-Context:
-{context}
+def build_prompt(context: str, question: str):
+    # Variable parts go last so everything before them stays a shared prefix.
+    return f"Context:\n{context}\n\nQuestion:\n{question}\n\nAnswer:"
 
-Question:
-{question}
 
-Answer:
-"""
+def generate(context: str, question: str, session_id=None, cancelled=None):
+    """Answer a question, continuing a chat session when session_id is known.
 
-    response = ollama.generate(
-        model=LLM_MODEL,
-        prompt=prompt
+    A session stores the context tokens Ollama returned for its last turn;
+    the next turn sends only the new prompt on top of them instead of the
+    whole history. The answer is streamed so generation can be stopped when
+    cancelled is set or llm_timeout_seconds runs out; the client's HTTP
+    timeout covers a model that stops streaming altogether.
+    """
+    settings = get_settings()
+    tokens = get_chat_sessions().get(session_id) if session_id else None
+    session_id = session_id or uuid.uuid4().hex
+
+    deadline = time.monotonic() + settings.llm_timeout_seconds
+    stream = get_llm_client(settings.llm_timeout_seconds).generate(
+        model=settings.llm_model,
+        prompt=build_prompt(context, question),
+        # The system prompt is already part of a session's context tokens.
+        system=None if tokens else SYSTEM_PROMPT,
+        context=tokens,
+        keep_alive=settings.llm_keep_alive,
+        options={"num_predict": settings.llm_max_tokens},
+        stream=True
     )
 
-    return response["response"]
+    # Closing the stream drops the HTTP response, which stops Ollama generating.
+    parts = []
+    try:
+        for response in stream:
+            if cancelled is not None and cancelled.is_set():
+                raise GenerationCancelled("Generation cancelled")
+            if time.monotonic() > deadline:
+                raise GenerationTimeout(f"Generation exceeded {settings.llm_timeout_seconds}s")
+            parts.append(response["response"])
+    finally:
+        stream.close()
+
+    # A session that outgrows the budget starts over on its next turn rather
+    # than overflowing the model's context window.
+    tokens = response["context"]
+    if tokens and len(tokens) <= settings.chat_session_max_tokens:
+        get_chat_sessions().set(session_id, list(tokens))
+    else:
+        get_chat_sessions().set(session_id, None)
+
+    prompt_eval_ns = response["prompt_eval_duration"]
+    return {
+        "answer": "".join(parts),
+        "session_id": session_id,
+        "prompt_eval_count": response["prompt_eval_count"],
+        "prompt_eval_ms": prompt_eval_ns / 1e6 if prompt_eval_ns is not None else None
+    }
+
+
+def generate_answer(context: str, question: str):
+    return generate(context, question)["answer"]
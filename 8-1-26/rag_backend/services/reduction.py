@@ -0,0 +1,144 @@
+import os
+import threading
+
+from config.settings import get_settings
+
+REDUCTION_METHODS = ("pca", "truncate")
+
+_projections = {}
+_lock = threading.Lock()
+
+
+class Projection:
+    """Maps full embeddings to `dim` dimensions, by PCA or by truncation."""
+
+    def __init__(self, method, dim, mean=None, components=None):
+        if method not in REDUCTION_METHODS:
+            raise ValueError(f"Unsupported reduction method: {method}")
+        self.method = method
+        self.dim = dim
+        self.mean = mean
+        self.components = components
+
+    @classmethod
+    def fit(cls, method, dim, vectors):
+        # numpy is imported by the methods that need it: most requests never
+        # touch a projection, and importing the app should not load numpy.
+        import numpy as np
+
+        vectors = np.asarray(vectors, dtype=np.float32)
+        dim = min(dim, vectors.shape[1])
+
+        # PCA needs more samples than output dimensions to be meaningful;
+        # below that, fall back to Matryoshka-style truncation.
+        if method == "pca" and len(vectors) > dim:
+            mean = vectors.mean(axis=0)
+            _, _, vt = np.linalg.svd(vectors - mean, full_matrices=False)
+            return cls("pca", dim, mean, vt[:dim].astype(np.float32))
+        return cls("truncate", dim)
+
+    def transform(self, vectors):
+        import numpy as np
+
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.method == "pca":
+            return (vectors - self.mean) @ self.components.T
+
+        reduced = vectors[..., :self.dim]
+        norms = np.linalg.norm(reduced, axis=-1, keepdims=True)
+        return reduced / np.where(norms > 0, norms, 1.0)
+
+    def matches(self, other):
+        """Whether other maps vectors into the same space."""
+        import numpy as np
+
+        if (self.method, self.dim) != (other.method, other.dim):
+            return False
+        return self.method != "pca" or (
+            np.array_equal(self.mean, other.mean) and np.array_equal(self.components, other.components)
+        )
+
+    def save(self, path):
+        import numpy as np
+
+        arrays = {"method": np.array(self.method), "dim": np.array(self.dim)}
+        if self.method == "pca":
+            arrays.update(mean=self.mean, components=self.components)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        import numpy as np
+
+        with np.load(path) as data:
+            method = str(data["method"])
+            if method == "pca":
+                return cls(method, int(data["dim"]), data["mean"], data["components"])
+            return cls(method, int(data["dim"]))
+
+
+def projection_path(collection_name):
+    return os.path.join(get_settings().chroma_path, f"{collection_name}.projection.npz")
+
+
+def get_projection(collection_name):
+    with _lock:
+        if collection_name in _projections:
+            return _projections[collection_name]
+
+    # Misses are not cached: another worker may fit the projection later.
+    path = projection_path(collection_name)
+    if not os.path.exists(path):
+        return None
+
+    projection = Projection.load(path)
+    with _lock:
+        _projections[collection_name] = projection
+    return projection
+
+
+def prepare_projection(collection, chunks, embed):
+    """Fit and persist a projection for a new, empty collection if reduction is on."""
+    settings = get_settings()
+    if settings.reduction is None or get_projection(collection.name) is not None:
+        return
+    # A collection that already holds full-size vectors keeps them.
+    if collection.count() > 0:
+        return
+
+    sample = embed(chunks[:settings.pca_fit_samples])
+    save_projection(collection.name, Projection.fit(settings.reduction, settings.reduced_dim, sample))
+
+
+def save_projection(collection_name, projection):
+    os.makedirs(get_settings().chroma_path, exist_ok=True)
+    projection.save(projection_path(collection_name))
+    with _lock:
+        _projections[collection_name] = projection
+
+
+def reduce_embeddings(collection_name, embeddings):
+    projection = get_projection(collection_name)
+    if projection is None:
+        return embeddings
+    return projection.transform(embeddings).tolist()
+
+
+def reduce_query(collection_name, embedding):
+    return reduce_embeddings(collection_name, [embedding])[0]
+
+
+def drop_projection(collection_name):
+    with _lock:
+        _projections.pop(collection_name, None)
+    path = projection_path(collection_name)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def copy_projection(source_name, target_name):
+    projection = get_projection(source_name)
+    if projection is not None:
+        save_projection(target_name, projection)
@@ -0,0 +1,99 @@
+import math
+import re
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from config.settings import get_settings
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+@lru_cache(maxsize=1)
+def get_rerank_executor():
+    return ThreadPoolExecutor(max_workers=get_settings().rerank_workers, thread_name_prefix="rerank")
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def lexical_scores(query, texts, deadline):
+    terms = set(tokenize(query))
+    if not terms:
+        return [0.0] * len(texts)
+    return [len(terms & set(tokenize(text))) / len(terms) for text in texts]
+
+
+def bm25_scores(query, texts, deadline, k1=1.5, b=0.75):
+    # IDF is taken over the candidate set, which is all the scorer sees.
+    docs = [tokenize(text) for text in texts]
+    avg_len = sum(len(doc) for doc in docs) / len(docs) if docs else 0.0
+    doc_freq = Counter(term for doc in docs for term in set(doc))
+    n = len(docs)
+
+    scores = []
+    for doc in docs:
+        tf = Counter(doc)
+        score = 0.0
+        for term in set(tokenize(query)):
+            if term not in tf:
+                continue
+            idf = math.log(1 + (n - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+            norm = tf[term] + k1 * (1 - b + b * len(doc) / (avg_len or 1.0))
+            score += idf * tf[term] * (k1 + 1) / norm
+        scores.append(score)
+    return scores
+
+
+def ollama_scores(query, texts, deadline):
+    import ollama
+
+    scores = []
+    for text in texts:
+        if time.monotonic() >= deadline:
+            raise TimeoutError("rerank budget exhausted")
+        response = ollama.generate(
+            model=get_settings().llm_model,
+            prompt=(
+                "Rate from 0 to 10 how well the passage answers the question. "
+                "Reply with the number only.\n\n"
+                f"Question: {query}\n\nPassage: {text}\n\nScore:"
+            ),
+            options={"num_predict": 4, "temperature": 0}
+        )
+        match = re.search(r"\d+(\.\d+)?", response["response"])
+        scores.append(float(match.group()) if match else 0.0)
+    return scores
+
+
+SCORERS = {
+    "lexical": lexical_scores,
+    "bm25": bm25_scores,
+    "ollama": ollama_scores,
+}
+
+
+def rerank(query, hits, top_k, scorer, budget_ms=None):
+    """Rescore over-fetched hits and keep the best top_k.
+
+    Returns (hits, reranked). If the scorer fails or misses the budget, the
+    index order is kept and reranked is False.
+    """
+    if scorer not in SCORERS:
+        raise ValueError(f"Unknown rerank scorer: {scorer}")
+    if not hits:
+        return hits, True
+
+    budget_ms = get_settings().rerank_budget_ms if budget_ms is None else budget_ms
+    deadline = time.monotonic() + budget_ms / 1000
+    future = get_rerank_executor().submit(SCORERS[scorer], query, [hit["text"] for hit in hits], deadline)
+    try:
+        scores = future.result(timeout=max(0.0, deadline - time.monotonic()))
+    except Exception:
+        future.cancel()
+        return hits[:top_k], False
+
+    # Stable sort: ties keep their index order.
+    order = sorted(range(len(hits)), key=lambda i: -scores[i])
+    return [dict(hits[i], rerank_score=scores[i]) for i in order[:top_k]], True
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from functools import lru_cache
+
+from config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class SchedulerBusy(Exception):
+    pass
+
+
+class GenerationTimeout(Exception):
+    pass
+
+
+class GenerationCancelled(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, fn, queue_deadline):
+        self.fn = fn
+        self.queue_deadline = queue_deadline
+        self.cancelled = threading.Event()
+        self.future = Future()
+
+    def cancel(self):
+        # Queued jobs are dropped; a running job sees the event and stops.
+        self.cancelled.set()
+        self.future.cancel()
+
+
+class GenerationScheduler:
+    """Runs generations through a fixed number of slots per model.
+
+    Each model has a FIFO queue drained by one worker thread per slot, so a
+    model never runs more generations at once than it has slots. Jobs that
+    wait past their queue deadline fail with GenerationTimeout instead of
+    running late; cancelled jobs are skipped or stopped mid-generation.
+    """
+
+    def __init__(self, slots_for, max_queued):
+        self.slots_for = slots_for
+        self.max_queued = max_queued
+        self.queues = {}
+        self.running = {}
+        self.lock = threading.Lock()
+
+    def _queue(self, model):
+        with self.lock:
+            if model not in self.queues:
+                self.queues[model] = queue.Queue()
+                self.running[model] = 0
+                for slot in range(self.slots_for(model)):
+                    threading.Thread(
+                        target=self._work, args=(model,), name=f"llm-{model}-{slot}", daemon=True
+                    ).start()
+            return self.queues[model]
+
+    def submit(self, model, fn, queue_timeout):
+        """Queue fn(cancelled_event) for model and return its Job."""
+        jobs = self._queue(model)
+        if jobs.qsize() >= self.max_queued:
+            raise SchedulerBusy(f"{jobs.qsize()} generations already queued for {model}")
+
+        job = Job(fn, time.monotonic() + queue_timeout)
+        jobs.put(job)
+        return job
+
+    def _work(self, model):
+        jobs = self.queues[model]
+        while True:
+            job = jobs.get()
+            if time.monotonic() > job.queue_deadline and not job.future.cancelled():
+                job.future.set_exception(GenerationTimeout(f"Waited too long for a {model} slot"))
+                continue
+            if not job.future.set_running_or_notify_cancel():
+                continue
+
+            with self.lock:
+                self.running[model] += 1
+            try:
+                job.future.set_result(job.fn(job.cancelled))
+            except BaseException as exc:
+                job.future.set_exception(exc)
+            finally:
+                with self.lock:
+                    self.running[model] -= 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                model: {"slots": self.slots_for(model), "running": self.running[model], "queued": jobs.qsize()}
+                for model, jobs in self.queues.items()
+            }
+
+
+def model_slots(model):
+    settings = get_settings()
+    return settings.llm_model_slots.get(model, settings.llm_slots)
+
+
+@lru_cache(maxsize=1)
+def get_scheduler():
+    # Slots are looked up per model when its queue starts; the queue bound
+    # is taken from the settings in effect at the first generation.
+    return GenerationScheduler(model_slots, get_settings().llm_max_queued)
+
+
+async def wait_for_job(job, request, timeout, poll_seconds=0.25):
+    """Await a job, cancelling it if the HTTP client goes away or timeout passes first.
+
+    timeout should cover the job's whole life: its queue deadline plus its
+    own run time limit.
+    """
+    result = asyncio.wrap_future(job.future)
+    deadline = time.monotonic() + timeout
+    while True:
+        done, _ = await asyncio.wait({result}, timeout=min(poll_seconds, max(deadline - time.monotonic(), 0)))
+        if done:
+            return result.result()
+        if time.monotonic() >= deadline:
+            job.cancel()
+            raise GenerationTimeout(f"No answer within {timeout:g}s")
+        if await request.is_disconnected():
+            job.cancel()
+            logger.info("Client disconnected; generation cancelled")
+            raise GenerationCancelled("Client disconnected")
@@ -0,0 +1,220 @@
+import fnmatch
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import ExitStack
+
+from config.settings import get_settings
+from database.chroma import check_dimension, file_lock, write_gate
+from services.embeddings import embed_texts
+from services.ingest import chunk_id, collection_changed, link_metadata
+from services.reduction import prepare_projection, reduce_embeddings
+from utils.chunking import split_text
+
+logger = logging.getLogger(__name__)
+
+REGION_SEPARATOR = re.compile(r"\n\s*\n")
+
+
+def region_chunks(source, text):
+    """Chunk text paragraph by paragraph into {chunk id: (chunk, links)}.
+
+    IDs hash the paragraph, so an edit only changes the IDs of the chunks of
+    the paragraphs it touched. Neighbor links stay within a paragraph for
+    the same reason.
+    """
+    chunks = {}
+    for region in REGION_SEPARATOR.split(text):
+        if not region.strip():
+            continue
+        run = f"{source}:" + hashlib.blake2b(f"{source}\0{region}".encode("utf-8"), digest_size=8).hexdigest()
+        pieces = split_text(region)
+        for i, chunk in enumerate(pieces):
+            chunks[chunk_id(run, i)] = (chunk, link_metadata(run, i, len(pieces)))
+    return chunks
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DocsWatcher:
+    """Polls a docs file or directory and applies only the chunk-level changes.
+
+    A file is synced once its mtime/size have been stable for debounce
+    seconds; files whose content hash is unchanged are skipped. With a
+    lock_path, only the watcher holding that lock (one per deployment, not
+    one per worker) polls; the others wait to take over.
+    """
+
+    def __init__(self, path, get_collection, pattern="*.txt", interval=2.0, debounce=1.0, batch_size=64, lock_path=None):
+        self.path = path
+        self.get_collection = get_collection
+        self.pattern = pattern
+        self.interval = interval
+        self.debounce = debounce
+        self.batch_size = batch_size
+        self.lock_path = lock_path
+        self.elected = lock_path is None
+        self.stats = {}      # source -> (mtime_ns, size) last seen on disk
+        self.digests = {}    # source -> content hash last indexed
+        self.pending = {}    # source -> time its last change was seen
+        self.collection_name = None  # collection the digests were indexed into
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def files(self):
+        if os.path.isdir(self.path):
+            found = {}
+            for root, _, names in os.walk(self.path):
+                for name in fnmatch.filter(names, self.pattern):
+                    full = os.path.join(root, name)
+                    found[os.path.relpath(full, self.path)] = full
+            return found
+        if os.path.exists(self.path):
+            return {os.path.basename(self.path): self.path}
+        return {}
+
+    def poll(self, now=None):
+        """Record changes since the last poll and sync files that have settled."""
+        now = time.monotonic() if now is None else now
+        files = self.files()
+
+        name = self.get_collection().name
+        if name != self.collection_name:
+            if self.collection_name is not None:
+                # The alias moved (reindex, compaction): what was indexed
+                # into the old collection says nothing about the new one.
+                self.digests.clear()
+                for source in self.stats:
+                    self.pending.setdefault(source, now)
+            self.collection_name = name
+
+        for source in set(self.stats) | set(files):
+            if source in files:
+                st = os.stat(files[source])
+                stat = (st.st_mtime_ns, st.st_size)
+            else:
+                stat = None
+            if self.stats.get(source) != stat:
+                self.stats[source] = stat
+                self.pending[source] = now
+
+        synced = {}
+        for source, changed_at in list(self.pending.items()):
+            if now - changed_at < self.debounce:
+                continue
+            del self.pending[source]
+            if self.stats[source] is None:
+                del self.stats[source]
+            synced[source] = self.sync(source, files.get(source))
+        return synced
+
+    def sync(self, source, path):
+        collection = self.get_collection()
+        if path is None:
+            text, digest = "", None
+        else:
+            digest = file_digest(path)
+            if digest == self.digests.get(source):
+                return {"upserted": 0, "deleted": 0}
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+
+        chunks = region_chunks(source, text)
+        # Region IDs are derived from the file, so a sync that waited for a
+        # compaction can diff against the replacement collection.
+        with write_gate(collection) as collection:
+            existing = set(collection.get(where={"source": source}, include=[])["ids"])
+            added = [doc_id for doc_id in chunks if doc_id not in existing]
+            removed = sorted(existing - set(chunks))
+
+            if added:
+                prepare_projection(
+                    collection,
+                    [chunks[doc_id][0] for doc_id in added],
+                    lambda texts: embed_texts(texts, collection.name)
+                )
+            embeddings = []
+            for start in range(0, len(added), self.batch_size):
+                ids = added[start:start + self.batch_size]
+                documents = [chunks[doc_id][0] for doc_id in ids]
+                batch_embeddings = reduce_embeddings(collection.name, embed_texts(documents, collection.name))
+                check_dimension(collection, batch_embeddings)
+                collection.upsert(
+                    ids=ids,
+                    documents=documents,
+                    embeddings=batch_embeddings,
+                    metadatas=[{"source": source, "ingest_id": "watch", **chunks[doc_id][1]} for doc_id in ids]
+                )
+                embeddings.extend(batch_embeddings)
+            for start in range(0, len(removed), self.batch_size):
+                collection.delete(ids=removed[start:start + self.batch_size])
+            if added or removed:
+                collection_changed(
+                    collection,
+                    added=[source] * len(added),
+                    removed=[source] * len(removed),
+                    ids=added,
+                    embeddings=embeddings,
+                    deleted_ids=removed
+                )
+
+        if digest is None:
+            self.digests.pop(source, None)
+        else:
+            self.digests[source] = digest
+        logger.info("Synced %s: %d chunks upserted, %d deleted", source, len(added), len(removed))
+        return {"upserted": len(added), "deleted": len(removed)}
+
+    def run(self):
+        with ExitStack() as lock:
+            while not self.stop_event.is_set():
+                if not self.elected:
+                    try:
+                        lock.enter_context(file_lock(self.lock_path, blocking=False))
+                        self.elected = True
+                        logger.info("Docs watcher elected (%s)", self.lock_path)
+                    except BlockingIOError:
+                        # Another worker watches; take over if it goes away.
+                        self.stop_event.wait(self.interval)
+                        continue
+                try:
+                    self.poll()
+                except Exception:
+                    logger.exception("Docs watcher poll failed")
+                self.stop_event.wait(self.interval)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="docs-watcher", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+
+
+def start_watcher():
+    from database.chroma import get_collection
+
+    settings = get_settings()
+    # Every worker starts a watcher; the lock next to the alias file lets
+    # only one of them sync.
+    return DocsWatcher(
+        settings.watch_path or settings.docs_path,
+        get_collection,
+        pattern=settings.watch_pattern,
+        interval=settings.watch_interval_seconds,
+        debounce=settings.watch_debounce_seconds,
+        batch_size=settings.ingest_batch_size,
+        lock_path=f"{settings.alias_path}.watcher.lock"
+    ).start()
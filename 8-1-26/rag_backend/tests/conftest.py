@@ -0,0 +1,15 @@
+import uuid
+
+import pytest
+
+
+@pytest.fixture
+def memory_collection():
+    """An isolated in-memory Chroma collection (embeddings supplied by the test)"""
+    import chromadb
+
+    client = chromadb.EphemeralClient()
+    name = f"test_{uuid.uuid4().hex}"
+    collection = client.create_collection(name=name)
+    yield collection
+    client.delete_collection(name)
@@ -0,0 +1,114 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+import routes.chat as chat_route
+import services.llm as llm
+from config.settings import get_settings
+from database.cache import TTLCache
+from database.chroma import get_collection
+from main import app
+from services.scheduler import GenerationCancelled, GenerationTimeout
+
+HITS = [{"text": "Chroma stores vectors.", "metadata": {"source": "docs.txt"}, "score": 0.1}]
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+
+    def fake_generate(model, prompt, system=None, context=None, keep_alive=None, options=None, stream=False):
+        calls.append({"prompt": prompt, "system": system, "context": context, "keep_alive": keep_alive,
+                      "options": options})
+        n = len(calls)
+        yield {"response": "answer ", "done": False}
+        # The last chunk carries the tokens of the whole conversation so far.
+        yield {"response": str(n), "done": True, "context": list(context or [0]) + [n] * 10,
+               "prompt_eval_count": len(prompt), "prompt_eval_duration": 2_000_000}
+
+    monkeypatch.setattr(llm, "get_llm_client", lambda timeout: SimpleNamespace(generate=fake_generate))
+    chat_sessions = TTLCache(16, 60)
+    monkeypatch.setattr(llm, "get_chat_sessions", lambda: chat_sessions)
+    return calls
+
+
+@pytest.fixture
+def client(monkeypatch, memory_collection, calls):
+    monkeypatch.setattr(chat_route, "search_chunks", lambda collection, query, k: HITS)
+    app.dependency_overrides[get_collection] = lambda: memory_collection
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_static_prefix_is_identical_across_questions(calls):
+    """Test that the system prompt and prompt layout keep the variable parts last"""
+    llm.generate("ctx one", "first?")
+    llm.generate("ctx two", "second?")
+
+    assert calls[0]["system"] == calls[1]["system"] == llm.SYSTEM_PROMPT
+    assert calls[0]["prompt"].startswith("Context:\nctx one")
+    assert calls[0]["prompt"].endswith("Question:\nfirst?\n\nAnswer:")
+    assert calls[0]["keep_alive"] == get_settings().llm_keep_alive
+
+
+def test_session_carries_context_tokens_forward(calls):
+    """Test that a follow-up turn sends the previous context tokens instead of the history"""
+    first = llm.generate("ctx", "first?")
+    second = llm.generate("ctx", "and then?", first["session_id"])
+
+    assert second["session_id"] == first["session_id"]
+    assert calls[1]["context"] == [0] + [1] * 10
+    assert calls[1]["system"] is None
+    assert "first?" not in calls[1]["prompt"]
+    assert second["prompt_eval_ms"] == 2.0
+
+
+def test_session_restarts_when_context_budget_is_exceeded(calls, monkeypatch):
+    """Test that a session over chat_session_max_tokens starts fresh on its next turn"""
+    monkeypatch.setattr(get_settings(), "chat_session_max_tokens", 15)
+    first = llm.generate("ctx", "first?")
+    llm.generate("ctx", "second?", first["session_id"])
+    llm.generate("ctx", "third?", first["session_id"])
+
+    assert calls[1]["context"] is not None
+    assert calls[2]["context"] is None
+    assert calls[2]["system"] == llm.SYSTEM_PROMPT
+
+
+def test_chat_route_answers_with_sources(client, calls):
+    """Test that /chat returns the answer, its sources and a reusable session id"""
+    first = client.post("/chat/", json={"query": "What stores vectors?"}).json()
+    second = client.post("/chat/", json={"query": "Where?", "session_id": first["session_id"]}).json()
+
+    assert first["answer"] == "answer 1"
+    assert first["sources"] == HITS
+    assert "Chroma stores vectors." in calls[0]["prompt"]
+    assert second["session_id"] == first["session_id"]
+    assert calls[1]["context"] is not None
+
+
+def test_generation_respects_token_and_time_limits(calls, monkeypatch):
+    """Test that num_predict is capped and a generation past its timeout is stopped"""
+    llm.generate("ctx", "q?")
+    assert calls[0]["options"] == {"num_predict": get_settings().llm_max_tokens}
+
+    monkeypatch.setattr(get_settings(), "llm_timeout_seconds", -1)
+    with pytest.raises(GenerationTimeout):
+        llm.generate("ctx", "q?")
+
+
+def test_cancelled_generation_stops_streaming(calls):
+    """Test that setting the cancel event aborts the answer"""
+    cancelled = threading.Event()
+    cancelled.set()
+    with pytest.raises(GenerationCancelled):
+        llm.generate("ctx", "q?", cancelled=cancelled)
+
+
+def test_llm_client_has_an_http_timeout():
+    """Test that the Ollama client is built with the generation timeout, not httpx's unbounded one"""
+    client = llm.get_llm_client(7.5)
+    assert client._client.timeout.read == 7.5
+    assert llm.get_llm_client(7.5) is client
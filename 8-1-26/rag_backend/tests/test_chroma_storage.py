@@ -1,6 +1,8 @@
-from database.chroma import collection
+from database.chroma import get_collection
 import uuid
 
+collection = get_collection()
+
 
 def test_vectors_are_stored():
     """Test that vectors exist in the ChromaDB collection"""
@@ -0,0 +1,45 @@
+import json
+
+import pyarrow.parquet as pq
+
+from data_export import export_vectors
+
+
+def _fill(collection, n=25, dim=4):
+    collection.add(
+        ids=[f"doc-{i}" for i in range(n)],
+        documents=[f"chunk {i}" for i in range(n)],
+        metadatas=[{"source": "docs.txt", "chunk_index": i} for i in range(n)],
+        embeddings=[[float(i)] * dim for i in range(n)]
+    )
+
+
+def test_export_paginates_to_ndjson(memory_collection, tmp_path):
+    """Test that every row is streamed to NDJSON across several pages"""
+    _fill(memory_collection)
+    prefix = str(tmp_path / "export")
+
+    stats = export_vectors(memory_collection, prefix, formats=("ndjson",), batch_size=7)
+
+    with open(f"{prefix}.ndjson", encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f]
+
+    assert stats["rows"] == 25
+    assert stats["rows_per_second"] > 0
+    assert sorted(row["id"] for row in rows) == sorted(f"doc-{i}" for i in range(25))
+    assert "embedding" not in rows[0]
+
+
+def test_export_parquet_with_float32_embeddings(memory_collection, tmp_path):
+    """Test that Parquet output carries embeddings as a float32 list column"""
+    _fill(memory_collection, n=10, dim=3)
+    prefix = str(tmp_path / "export")
+
+    export_vectors(memory_collection, prefix, formats=("parquet",), include_embeddings=True, batch_size=4)
+
+    table = pq.read_table(f"{prefix}.parquet")
+    assert table.num_rows == 10
+    assert str(table.schema.field("embedding").type) == "list<element: float>"
+    row = table.slice(0, 1).to_pylist()[0]
+    assert json.loads(row["metadata"])["source"] == "docs.txt"
+    assert len(row["embedding"]) == 3
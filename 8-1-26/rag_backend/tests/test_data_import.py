@@ -0,0 +1,117 @@
+import json
+import uuid
+
+import chromadb
+import pytest
+
+import services.reduction as reduction
+from config.settings import get_settings
+from data_export import export_vectors
+from data_import import SnapshotVerificationError, import_vectors
+
+
+@pytest.fixture
+def target_collection():
+    client = chromadb.EphemeralClient()
+    name = f"test_{uuid.uuid4().hex}"
+    yield client.create_collection(name=name)
+    client.delete_collection(name)
+
+
+def _fill(collection, n=12):
+    collection.add(
+        ids=[f"doc-{i}" for i in range(n)],
+        documents=[f"chunk {i}" for i in range(n)],
+        metadatas=[{"source": "docs.txt", "chunk_index": i} for i in range(n)],
+        embeddings=[[i * 0.1, 1.0, -i * 0.3] for i in range(n)]
+    )
+
+
+@pytest.mark.parametrize("fmt", ["ndjson", "parquet"])
+def test_round_trip_restore(memory_collection, target_collection, tmp_path, fmt):
+    """Test that an export with embeddings restores into an empty collection"""
+    _fill(memory_collection)
+    prefix = str(tmp_path / "snapshot")
+    export_vectors(memory_collection, prefix, formats=(fmt,), include_embeddings=True, batch_size=5)
+
+    stats = import_vectors(f"{prefix}.{fmt}", target_collection, batch_size=5)
+
+    assert stats["rows"] == stats["added"] == 12
+    restored = target_collection.get(ids=["doc-3"], include=["documents", "metadatas", "embeddings"])
+    assert restored["documents"] == ["chunk 3"]
+    assert restored["metadatas"][0]["chunk_index"] == 3
+    assert list(restored["embeddings"][0]) == pytest.approx([0.3, 1.0, -0.9])
+
+
+def test_tampered_snapshot_fails_checksum(memory_collection, target_collection, tmp_path):
+    """Test that a modified snapshot is rejected against its manifest"""
+    _fill(memory_collection)
+    prefix = str(tmp_path / "snapshot")
+    export_vectors(memory_collection, prefix, formats=("ndjson",), include_embeddings=True)
+
+    path = f"{prefix}.ndjson"
+    with open(path, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f]
+    rows[0]["chunk_text"] = "tampered"
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(row) + "\n" for row in rows)
+
+    with pytest.raises(SnapshotVerificationError):
+        import_vectors(path, target_collection)
+    assert target_collection.count() == 0
+
+
+def test_snapshot_without_embeddings_is_rejected(memory_collection, target_collection, tmp_path):
+    """Test that restoring requires an export made with embeddings"""
+    _fill(memory_collection)
+    prefix = str(tmp_path / "snapshot")
+    export_vectors(memory_collection, prefix, formats=("ndjson",))
+
+    with pytest.raises(ValueError):
+        import_vectors(f"{prefix}.ndjson", target_collection)
+
+
+def test_reduced_snapshot_carries_its_projection(memory_collection, target_collection, tmp_path, monkeypatch):
+    """Test that a reduced collection's projection is exported and restored with its vectors"""
+    monkeypatch.setattr(get_settings(), "chroma_path", str(tmp_path / "chroma"))
+    _fill(memory_collection)
+    reduction.save_projection(memory_collection.name, reduction.Projection("truncate", 3))
+    prefix = str(tmp_path / "snapshot")
+    export_vectors(memory_collection, prefix, formats=("ndjson",), include_embeddings=True)
+
+    import_vectors(f"{prefix}.ndjson", target_collection)
+    restored = reduction.get_projection(target_collection.name)
+    assert (restored.method, restored.dim) == ("truncate", 3)
+    reduction.drop_projection(target_collection.name)
+
+    (tmp_path / "snapshot.projection.npz").unlink()
+    with pytest.raises(SnapshotVerificationError):
+        import_vectors(f"{prefix}.ndjson", target_collection)
+    assert target_collection.count() == 12
+    reduction.drop_projection(memory_collection.name)
+
+
+def test_import_refuses_a_differently_reduced_target(memory_collection, target_collection, tmp_path, monkeypatch):
+    """Test that a snapshot never replaces the projection of a non-empty target it does not match"""
+    monkeypatch.setattr(get_settings(), "chroma_path", str(tmp_path / "chroma"))
+    _fill(memory_collection)
+    prefix = str(tmp_path / "snapshot")
+    export_vectors(memory_collection, prefix, formats=("ndjson",), include_embeddings=True)
+    target_collection.add(ids=["own"], documents=["own"], embeddings=[[1.0, 0.0]])
+    reduction.save_projection(target_collection.name, reduction.Projection("truncate", 2))
+    try:
+        # Full-size snapshot into a reduced target.
+        with pytest.raises(SnapshotVerificationError):
+            import_vectors(f"{prefix}.ndjson", target_collection)
+
+        # Reduced with another projection.
+        reduction.save_projection(memory_collection.name, reduction.Projection("truncate", 3))
+        export_vectors(memory_collection, prefix, formats=("ndjson",), include_embeddings=True)
+        with pytest.raises(SnapshotVerificationError):
+            import_vectors(f"{prefix}.ndjson", target_collection)
+
+        assert target_collection.count() == 1
+        assert reduction.get_projection(target_collection.name).dim == 2
+    finally:
+        reduction.drop_projection(target_collection.name)
+        reduction.drop_projection(memory_collection.name)
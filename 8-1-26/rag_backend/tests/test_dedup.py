@@ -0,0 +1,43 @@
+from utils.chunking import split_text
+from utils.dedup import dedup_chunks, find_near_duplicates
+
+FOOTER = "GlideCloud confidential internal document do not distribute outside the company without written approval from the policy team"
+
+
+def test_exact_and_near_duplicates_are_linked():
+    """Test that repeated boilerplate is linked to its first occurrence"""
+    chunks = [
+        FOOTER,
+        "Employees receive six paid leaves during the probation period of six months",
+        FOOTER,
+        FOOTER.replace("team", "group"),
+        "Sick leaves are intended strictly for health related issues",
+    ]
+
+    assert find_near_duplicates(chunks) == {2: 0, 3: 0}
+
+
+def test_distinct_chunks_are_kept():
+    """Test that unrelated chunks of the real corpus are not merged"""
+    with open("docs.txt", encoding="utf-8") as f:
+        chunks = split_text(f.read())
+
+    assert find_near_duplicates(chunks) == {}
+
+
+def test_dedup_chunks_reports_ratio_and_links():
+    """Test the unique chunks, link counts and dedup ratio"""
+    chunks = [FOOTER, "a different chunk of text entirely", FOOTER, FOOTER]
+
+    unique, duplicate_counts, stats = dedup_chunks(chunks)
+
+    assert unique == [FOOTER, "a different chunk of text entirely"]
+    assert duplicate_counts == [2, 0]
+    assert stats == {"chunks_total": 4, "duplicates_skipped": 2, "dedup_ratio": 0.5}
+
+
+def test_dedup_can_be_disabled():
+    """Test that disabling dedup keeps every chunk"""
+    unique, _, stats = dedup_chunks([FOOTER, FOOTER], enabled=False)
+    assert unique == [FOOTER, FOOTER]
+    assert stats["duplicates_skipped"] == 0
@@ -0,0 +1,140 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import ollama
+import pytest
+
+import database.retriever as retriever
+import services.embeddings as embeddings
+from config.settings import get_settings
+from database.cache import TTLCache
+from services.embeddings import MicroBatcher, embed_texts, generate_embedding
+from services.hashing import HashingVectorizer
+from services.ingest import ingest_chunks
+
+
+def _recording_embed(calls, delay=0.0):
+    def embed(texts):
+        calls.append(list(texts))
+        time.sleep(delay)
+        return [[float(len(text))] for text in texts]
+    return embed
+
+
+def test_concurrent_callers_share_one_batch():
+    """Test that texts submitted within the wait window go out as one call"""
+    calls = []
+    batcher = MicroBatcher(_recording_embed(calls), batch_size=32, max_wait_ms=50)
+
+    texts = [f"query {'x' * i}" for i in range(8)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda text: batcher.submit(text).result(), texts))
+
+    assert results == [[float(len(text))] for text in texts]
+    assert len(calls) < len(texts)
+    assert sorted(text for call in calls for text in call) == sorted(texts)
+
+
+def test_batch_size_caps_each_call():
+    """Test that no dispatched batch exceeds batch_size"""
+    calls = []
+    batcher = MicroBatcher(_recording_embed(calls, delay=0.01), batch_size=3, max_wait_ms=20)
+
+    futures = [batcher.submit(str(i)) for i in range(10)]
+    assert [future.result() for future in futures] == [[float(len(str(i)))] for i in range(10)]
+    assert max(len(call) for call in calls) <= 3
+
+
+def test_errors_reach_every_caller_in_the_batch():
+    """Test that a failed batch raises in each waiting caller and the batcher recovers"""
+    fail = threading.Event()
+    fail.set()
+
+    def embed(texts):
+        if fail.is_set():
+            fail.clear()
+            raise ConnectionError("ollama unavailable")
+        return [[1.0] for _ in texts]
+
+    batcher = MicroBatcher(embed, batch_size=8, max_wait_ms=50)
+    futures = [batcher.submit("a"), batcher.submit("b")]
+    for future in futures:
+        with pytest.raises(ConnectionError):
+            future.result()
+
+    assert batcher.submit("c").result() == [1.0]
+
+
+def test_hashing_vectors_are_deterministic_and_normalized():
+    """Test that the hashing vectorizer is stateless, batch-independent and unit length"""
+    vectorizer = HashingVectorizer(dim=256)
+    texts = ["Chroma stores embeddings", "Ollama serves models", ""]
+
+    batch = vectorizer.transform(texts)
+    single = np.vstack([vectorizer.transform([text]) for text in texts])
+
+    assert batch.shape == (3, 256)
+    assert np.allclose(batch, single)
+    assert np.allclose(np.linalg.norm(batch[:2], axis=1), 1.0)
+    assert not batch[2].any()
+
+
+def test_hashing_similarity_follows_shared_terms():
+    """Test that texts sharing words and word pieces score closer than unrelated ones"""
+    vectorizer = HashingVectorizer(dim=512)
+    query, related, unrelated = vectorizer.transform([
+        "how are vectors stored",
+        "the database stores vectors on disk",
+        "bananas are rich in potassium",
+    ])
+
+    assert query @ related > query @ unrelated
+
+
+@pytest.fixture
+def hashing_for_cheap(monkeypatch):
+    monkeypatch.setattr(get_settings(), "collection_embedding_backends", {"cheap": "hashing"})
+    def ollama_embed(**kwargs):
+        raise RuntimeError("ollama called")
+
+    monkeypatch.setattr(ollama, "embed", ollama_embed)
+
+
+def test_backend_is_selected_per_collection(hashing_for_cheap):
+    """Test that a collection mapped to the hashing backend (and its versions) never calls Ollama"""
+    dim = get_settings().hashing_dim
+
+    assert len(embed_texts(["some text"], "cheap")[0]) == dim
+    assert len(embed_texts(["some text"], "cheap__v3")[0]) == dim
+    assert len(generate_embedding("some text", "cheap")) == dim
+    with pytest.raises(RuntimeError, match="ollama called"):
+        embed_texts(["some text"], "knowledge_base")
+
+
+def test_unknown_backend_is_rejected():
+    """Test that an unregistered backend name fails loudly"""
+    with pytest.raises(ValueError):
+        embeddings.get_backend("word2vec")
+
+
+def test_hashing_backend_ingest_and_search(hashing_for_cheap, monkeypatch, tmp_path):
+    """Test a full ingest and search round trip on the offline backend"""
+    import chromadb
+
+    monkeypatch.setattr(get_settings(), "checkpoint_dir", str(tmp_path))
+    result_cache = TTLCache(16, 60)
+    monkeypatch.setattr(retriever, "get_result_cache", lambda: result_cache)
+    embedding_cache = TTLCache(16)
+    monkeypatch.setattr(retriever, "get_embedding_cache", lambda: embedding_cache)
+    client = chromadb.EphemeralClient()
+    collection = client.create_collection(name="cheap")
+    try:
+        chunks = ["Chroma persists vectors on disk", "Ollama runs language models locally", "FastAPI serves the HTTP API"]
+        list(ingest_chunks(collection, chunks, [0] * 3, "run"))
+
+        hits = retriever.search_chunks(collection, "where are vectors persisted", 1)
+        assert hits[0]["text"] == "Chroma persists vectors on disk"
+    finally:
+        client.delete_collection("cheap")
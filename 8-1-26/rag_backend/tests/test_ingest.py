@@ -0,0 +1,109 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import services.ingest as ingest
+from config.settings import get_settings
+from database.chroma import get_collection, get_writable_collection
+from main import app
+
+
+@pytest.fixture
+def client(monkeypatch, memory_collection, tmp_path):
+    monkeypatch.setattr(ingest, "embed_texts", lambda texts, collection_name=None: [[float(len(t)), 1.0] for t in texts])
+    monkeypatch.setattr(get_settings(), "ingest_batch_size", 3)
+    monkeypatch.setattr(get_settings(), "checkpoint_dir", str(tmp_path / "checkpoints"))
+    app.dependency_overrides[get_collection] = lambda: memory_collection
+    app.dependency_overrides[get_writable_collection] = lambda: memory_collection
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_create_returns_summary_without_ids(client, memory_collection):
+    """Test that /vectors/create no longer inlines every document ID"""
+    data = client.post("/vectors/create").json()
+
+    assert "document_ids" not in data
+    assert data["chunks_stored"] == memory_collection.count() > 0
+    assert data["ids_url"] == f"/vectors/ingests/{data['ingest_id']}/ids"
+
+
+def test_ingest_ids_are_paginated(client):
+    """Test that IDs of an ingest can be listed page by page"""
+    created = client.post("/vectors/create").json()
+
+    first = client.get(created["ids_url"], params={"limit": 2}).json()
+    assert len(first["ids"]) == 2
+    assert first["next_offset"] == 2
+
+    seen = list(first["ids"])
+    offset = first["next_offset"]
+    while offset is not None:
+        page = client.get(created["ids_url"], params={"limit": 2, "offset": offset}).json()
+        seen.extend(page["ids"])
+        offset = page["next_offset"]
+
+    assert len(set(seen)) == created["chunks_stored"]
+
+
+def test_ingest_ids_stream_as_ndjson(client):
+    """Test the NDJSON listing of all IDs of an ingest"""
+    created = client.post("/vectors/create").json()
+
+    response = client.get(created["ids_url"], params={"format": "ndjson"})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert len(lines) == created["chunks_stored"]
+
+
+def test_create_streams_progress(client):
+    """Test that stream=true emits one progress line per batch and a final summary"""
+    response = client.post("/vectors/create", params={"stream": "true"})
+    events = [json.loads(line) for line in response.text.splitlines()]
+
+    progress = [e for e in events if e["event"] == "progress"]
+    assert events[-1]["event"] == "done"
+    assert progress[-1]["stored"] == progress[-1]["total"] == events[-1]["chunks_stored"]
+    assert [e["stored"] for e in progress] == sorted(e["stored"] for e in progress)
+    assert len(progress) > 1
+
+
+def test_interrupted_ingest_resumes_from_checkpoint(client, memory_collection, monkeypatch):
+    """Test that a rerun after a crash stores only the uncommitted batches, without duplicates"""
+    embedded = []
+
+    def crashing_embed(texts, collection_name=None):
+        if len(embedded) == 2:
+            raise ConnectionError("ollama went away")
+        embedded.append(texts)
+        return [[float(len(t)), 1.0] for t in texts]
+
+    monkeypatch.setattr(ingest, "embed_texts", crashing_embed)
+    with pytest.raises(ConnectionError):
+        client.post("/vectors/create")
+
+    checkpoint = ingest.load_checkpoint(memory_collection.name, "docs.txt")
+    assert checkpoint["next_chunk"] == memory_collection.count() == 6
+
+    monkeypatch.setattr(ingest, "embed_texts", lambda texts, collection_name=None: embedded.append(texts) or [[1.0, 1.0] for t in texts])
+    data = client.post("/vectors/create").json()
+
+    assert data["ingest_id"] == checkpoint["ingest_id"]
+    assert data["resumed_from"] == 6
+    assert data["chunks_stored"] == memory_collection.count() == checkpoint["total"]
+    assert sum(len(texts) for texts in embedded) == checkpoint["total"]
+    assert ingest.load_checkpoint(memory_collection.name, "docs.txt") is None
+
+
+def test_changed_input_starts_a_new_ingest(client, memory_collection):
+    """Test that a checkpoint for different chunks is not resumed"""
+    ingest.save_checkpoint(memory_collection.name, "docs.txt", {
+        "ingest_id": "stale", "fingerprint": ingest.chunks_fingerprint(["other"]), "next_chunk": 3, "total": 5
+    })
+
+    data = client.post("/vectors/create").json()
+
+    assert data["ingest_id"] != "stale"
+    assert data["resumed_from"] == 0
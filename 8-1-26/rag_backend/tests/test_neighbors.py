@@ -0,0 +1,83 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import database.retriever as retriever
+import services.ingest as ingest
+from database.cache import TTLCache
+from database.chroma import get_collection
+from database.retriever import expand_hits
+from main import app
+from services.ingest import ingest_chunks, link_metadata, neighbor_ids
+
+CHUNKS = [f"chunk number {i}" for i in range(6)]
+
+
+class CountingCollection:
+    def __init__(self, collection):
+        self.collection = collection
+        self.gets = []
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    def get(self, **kwargs):
+        self.gets.append(kwargs)
+        return self.collection.get(**kwargs)
+
+
+@pytest.fixture
+def stored(monkeypatch, memory_collection, tmp_path):
+    from config.settings import get_settings
+
+    monkeypatch.setattr(get_settings(), "checkpoint_dir", str(tmp_path))
+    monkeypatch.setattr(ingest, "embed_texts", lambda texts, collection_name=None: [[float(text.split()[-1]), 1.0] for text in texts])
+    list(ingest_chunks(memory_collection, CHUNKS, [0] * len(CHUNKS), "run", batch_size=4))
+    return memory_collection
+
+
+def test_link_metadata_and_neighbor_ids():
+    """Test ordinal/prev/next links and the IDs of a chunk's neighbors"""
+    assert link_metadata("run", 0, 3) == {"ordinal": 0, "next_id": "run-1"}
+    assert link_metadata("run", 2, 3) == {"ordinal": 2, "prev_id": "run-1"}
+    assert neighbor_ids("docs.txt:ab12-3", 3, 2) == ["docs.txt:ab12-2", "docs.txt:ab12-4", "docs.txt:ab12-1", "docs.txt:ab12-5"]
+    assert neighbor_ids("run-0", 0, 1) == ["run-1"]
+    assert neighbor_ids("unrelated", 3, 1) == []
+
+
+def test_ingest_records_position_and_links(stored):
+    """Test that every ingested chunk knows its ordinal and adjacent chunk IDs"""
+    metadata = stored.get(ids=["run-4"], include=["metadatas"])["metadatas"][0]
+    assert metadata["ordinal"] == 4
+    assert metadata["prev_id"] == "run-3"
+    assert metadata["next_id"] == "run-5"
+
+
+def test_expand_fetches_all_neighbors_in_one_get(stored):
+    """Test that neighbors of every hit come from a single batched get"""
+    collection = CountingCollection(stored)
+    hits = retriever.dense_search(stored, [2.0, 1.0], 2)
+
+    expanded = expand_hits(collection, hits, 2)
+
+    assert len(collection.gets) == 1
+    assert expanded[0]["id"] == "run-2"
+    assert [chunk["ordinal"] for chunk in expanded[0]["neighbors"]] == [0, 1, 3, 4]
+    assert expanded[0]["neighbors"][0]["text"] == "chunk number 0"
+
+
+def test_search_expand_parameter(stored, monkeypatch):
+    """Test that /search?expand=n returns each hit with its neighbors"""
+    monkeypatch.setattr(retriever, "generate_embedding", lambda text, collection_name=None: [5.0, 1.0])
+    result_cache = TTLCache(16, 60)
+    monkeypatch.setattr(retriever, "get_result_cache", lambda: result_cache)
+    embedding_cache = TTLCache(16)
+    monkeypatch.setattr(retriever, "get_embedding_cache", lambda: embedding_cache)
+    app.dependency_overrides[get_collection] = lambda: stored
+    try:
+        data = TestClient(app).get("/search/", params={"query": "q", "k": 1, "expand": 1}).json()
+    finally:
+        app.dependency_overrides.clear()
+
+    hit = data["results"][0]
+    assert hit["id"] == "run-5"
+    assert hit["neighbors"] == [{"id": "run-4", "text": "chunk number 4", "ordinal": 4}]
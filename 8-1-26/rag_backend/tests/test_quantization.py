@@ -0,0 +1,128 @@
+import time
+
+import numpy as np
+import pytest
+
+import database.retriever as retriever
+from database.quantization import (
+    QuantizedIndex,
+    QuantizedIndexRegistry,
+    dequantize_int8,
+    hamming_distances,
+    int8_distances,
+    quantize_binary,
+    quantized_indexes,
+    squared_l2,
+)
+
+
+def _corpus(n=500, dim=64, seed=0):
+    rng = np.random.default_rng(seed)
+    return [f"doc-{i}" for i in range(n)], rng.normal(size=(n, dim)).astype(np.float32)
+
+
+def _fetch(ids, vectors):
+    lookup = dict(zip(ids, vectors))
+    return lambda wanted: (wanted, [lookup[i] for i in wanted])
+
+
+def test_hamming_distance_counts_differing_signs():
+    """Test that Hamming distance over packed sign bits counts flipped signs"""
+    codes = quantize_binary(np.array([[1.0] * 8 + [-1.0] * 8]))
+    query = quantize_binary(np.array([[1.0] * 6 + [-1.0] * 10]))[0]
+    assert hamming_distances(codes, query).tolist() == [2]
+
+
+def test_int8_distances_match_dequantized_l2():
+    """Test that scoring int8 codes directly equals L2 to the dequantized vectors, across scan blocks"""
+    ids, vectors = _corpus(n=2500, dim=32)
+    index = QuantizedIndex("int8").build(ids, vectors)
+    query = vectors[3] * 0.5
+
+    expected = squared_l2(dequantize_int8(index.codes, index.low, index.scale), query)
+    assert np.allclose(int8_distances(index.codes, index.norms, index.low, index.scale, query), expected, rtol=1e-4, atol=1e-3)
+
+
+@pytest.mark.parametrize("mode, max_bytes", [("int8", 64), ("binary", 8)])
+def test_quantized_search_finds_exact_neighbour(mode, max_bytes):
+    """Test that re-scored quantized search returns the exact nearest vector"""
+    ids, vectors = _corpus()
+    index = QuantizedIndex(mode, rescore_factor=8).build(ids, vectors)
+
+    query = vectors[42] + 0.01
+    results = index.search(query, 5, _fetch(ids, vectors))
+
+    assert results[0][0] == "doc-42"
+    assert [d for _, d in results] == sorted(d for _, d in results)
+    assert index.codes.nbytes / len(index) <= max_bytes
+
+
+def test_search_chunks_quantized_matches_exact(memory_collection, monkeypatch):
+    """Test that the quantized tier and Chroma agree on the top hit"""
+    ids, vectors = _corpus(n=50, dim=16)
+    memory_collection.add(
+        ids=ids,
+        documents=[f"chunk {i}" for i in range(50)],
+        metadatas=[{"source": "docs.txt"} for _ in ids],
+        embeddings=vectors.tolist()
+    )
+    monkeypatch.setattr(retriever, "generate_embedding", lambda text, collection_name=None: vectors[7].tolist())
+
+    exact = retriever.search_chunks(memory_collection, "q", 3)
+    for mode in ("int8", "binary"):
+        quantized = retriever.search_chunks(memory_collection, "q", 3, quantization=mode)
+        assert quantized[0]["text"] == exact[0]["text"] == "chunk 7"
+        assert quantized[0]["score"] == pytest.approx(exact[0]["score"], abs=1e-4)
+
+    quantized_indexes.invalidate(memory_collection.name)
+
+
+@pytest.mark.parametrize("mode", ["int8", "binary"])
+def test_index_follows_upserts_and_deletes(mode):
+    """Test that upserted rows are searchable and removed rows are gone without a rebuild"""
+    ids, vectors = _corpus(n=100)
+    index = QuantizedIndex(mode, rescore_factor=8).build(ids[:60], vectors[:60])
+
+    index.upsert(ids[60:], vectors[60:])
+    index.remove(["doc-3", "doc-99", "missing"])
+    index.upsert(["doc-5"], vectors[80:81])
+
+    assert len(index) == 98 and set(index.ids) == set(ids) - {"doc-3", "doc-99"}
+    assert index.search(vectors[70], 1, _fetch(ids, vectors))[0][0] == "doc-70"
+    assert "doc-3" not in index.candidates(vectors[3], 98)
+    assert index.codes[index.rows["doc-5"]].tolist() == index.codes[index.rows["doc-80"]].tolist()
+
+
+def test_registry_applies_writes_to_built_index(memory_collection):
+    """Test that collection writes update the cached index instead of dropping it"""
+    ids, vectors = _corpus(n=20, dim=16)
+    memory_collection.add(ids=ids, embeddings=vectors.tolist())
+    index = quantized_indexes.get(memory_collection, "binary", 4)
+
+    quantized_indexes.update(memory_collection.name, ["doc-new"], vectors[:1] * -1, deleted=["doc-0"])
+
+    assert quantized_indexes.get(memory_collection, "binary", 4) is index
+    assert "doc-new" in index.rows and "doc-0" not in index.rows
+    quantized_indexes.invalidate(memory_collection.name)
+
+
+def test_registry_rebuilds_after_outside_writes(memory_collection):
+    """Test that writes made by another worker reach the index via reconcile or the TTL"""
+    ids, vectors = _corpus(n=20, dim=16)
+    memory_collection.add(ids=ids, embeddings=vectors.tolist())
+    registry = QuantizedIndexRegistry(ttl_seconds=0)
+    registry.get(memory_collection, "binary", 4)
+
+    # Another worker adds a vector: this one's update() never runs.
+    memory_collection.add(ids=["doc-outside"], embeddings=[vectors[0].tolist()])
+    assert registry.names() == [memory_collection.name]
+    assert registry.reconcile(memory_collection) is True
+    assert "doc-outside" in registry.get(memory_collection, "binary", 4).rows
+    assert registry.reconcile(memory_collection) is False
+
+    registry.ttl_seconds = 0.01
+    index = registry.get(memory_collection, "binary", 4)
+    memory_collection.update(ids=["doc-outside"], embeddings=[(vectors[0] * -1).tolist()])
+    assert registry.get(memory_collection, "binary", 4) is index
+    time.sleep(0.02)
+    assert registry.get(memory_collection, "binary", 4) is not index
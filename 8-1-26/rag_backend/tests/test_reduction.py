@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+import services.reduction as reduction
+from config.settings import get_settings
+from services.reduction import Projection
+
+
+def _vectors(n=300, dim=64, rank=8, seed=0):
+    # Low-rank data plus noise, so a few principal components carry most of it.
+    rng = np.random.default_rng(seed)
+    return (rng.normal(size=(n, rank)) @ rng.normal(size=(rank, dim)) + 0.01 * rng.normal(size=(n, dim))).astype(np.float32)
+
+
+def test_pca_preserves_nearest_neighbour():
+    """Test that PCA-reduced vectors keep the same nearest neighbour"""
+    vectors = _vectors()
+    projection = Projection.fit("pca", 16, vectors)
+    reduced = projection.transform(vectors)
+
+    assert projection.method == "pca"
+    assert reduced.shape == (300, 16)
+    query = projection.transform(vectors[5] + 0.001)
+    assert int(np.argmin(((reduced - query) ** 2).sum(axis=1))) == 5
+
+
+def test_truncation_renormalizes():
+    """Test that Matryoshka truncation keeps the prefix at unit length"""
+    projection = Projection.fit("truncate", 8, _vectors(n=4))
+    reduced = projection.transform(_vectors(n=4))
+
+    assert reduced.shape == (4, 8)
+    assert np.linalg.norm(reduced, axis=1) == pytest.approx(np.ones(4), abs=1e-5)
+
+
+def test_pca_with_too_few_samples_falls_back_to_truncation():
+    """Test that PCA needs more samples than output dimensions"""
+    projection = Projection.fit("pca", 16, _vectors(n=10))
+    assert projection.method == "truncate"
+
+
+def test_projection_round_trips_through_disk(tmp_path):
+    """Test that a persisted projection reproduces the same transform"""
+    vectors = _vectors()
+    projection = Projection.fit("pca", 16, vectors)
+    path = str(tmp_path / "kb.projection.npz")
+    projection.save(path)
+
+    loaded = Projection.load(path)
+    assert np.allclose(loaded.transform(vectors), projection.transform(vectors))
+
+
+def test_prepare_projection_only_for_empty_collections(memory_collection, tmp_path, monkeypatch):
+    """Test that ingest and query share the persisted projection of a new collection"""
+    settings = get_settings()
+    monkeypatch.setattr(settings, "chroma_path", str(tmp_path))
+    monkeypatch.setattr(settings, "reduction", "pca")
+    monkeypatch.setattr(settings, "reduced_dim", 16)
+    vectors = _vectors()
+
+    reduction.prepare_projection(memory_collection, list(range(300)), lambda chunks: vectors[chunks])
+    stored = reduction.reduce_embeddings(memory_collection.name, vectors.tolist())
+    query = reduction.reduce_query(memory_collection.name, vectors[0].tolist())
+
+    assert len(stored[0]) == len(query) == 16
+    assert (tmp_path / f"{memory_collection.name}.projection.npz").exists()
+    reduction.drop_projection(memory_collection.name)
+    assert reduction.get_projection(memory_collection.name) is None
@@ -0,0 +1,170 @@
+import os
+
+import chromadb
+import pytest
+
+import database.chroma as chroma
+from config.settings import get_settings
+import database.reindex as reindex
+from database.reindex import ReindexValidationError, garbage_collect, list_versions, validate_version
+from database.tenants import tenant_collection_name
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings(), "alias_path", str(tmp_path / "aliases.json"))
+    monkeypatch.setattr(chroma, "_alias_cache", {"mtime": None, "aliases": {}})
+    client = chromadb.EphemeralClient()
+    yield client
+    for version in list_versions(client):
+        client.delete_collection(chroma.versioned_name(version))
+
+
+def _make_version(client, version, n=3):
+    collection = client.create_collection(name=chroma.versioned_name(version))
+    collection.add(
+        ids=[f"chunk-{i}" for i in range(n)],
+        documents=[f"chunk {i}" for i in range(n)],
+        embeddings=[[float(i), 1.0] for i in range(n)]
+    )
+    return collection
+
+
+def test_alias_defaults_to_collection_name(client):
+    """Test that without an alias file the fixed collection name is used"""
+    assert chroma.resolve_collection_name() == get_settings().collection_name
+
+
+def test_alias_swap_is_visible_to_readers(client):
+    """Test that writing the alias repoints resolution to the new version"""
+    chroma.write_alias(chroma.versioned_name(1))
+    assert chroma.resolve_collection_name() == "knowledge_base__v1"
+
+    chroma.write_alias(chroma.versioned_name(2))
+    assert chroma.resolve_collection_name() == "knowledge_base__v2"
+
+
+def test_validate_version_checks_count(client):
+    """Test that a half-built version fails validation"""
+    collection = _make_version(client, 1, n=3)
+
+    validate_version(collection, 3)
+    with pytest.raises(ReindexValidationError):
+        validate_version(collection, 4)
+
+
+def test_garbage_collect_keeps_live_and_recent_versions(client):
+    """Test that old versions are dropped but the live one is never deleted"""
+    for version in range(1, 5):
+        _make_version(client, version)
+    chroma.write_alias(chroma.versioned_name(1))
+
+    removed = garbage_collect(client, keep=2)
+
+    assert removed == [2]
+    assert list_versions(client) == [1, 3, 4]
+
+
+def test_failed_reindex_leaves_no_partial_version(client, monkeypatch):
+    """Test that a reindex dying part-way drops its version instead of keeping it for GC to count"""
+    live = _make_version(client, 1)
+    chroma.write_alias(live.name)
+    embedded = []
+
+    def crashing_embed(texts, collection_name=None):
+        if embedded:
+            raise ConnectionError("ollama went away")
+        embedded.append(texts)
+        return [[1.0, float(len(t))] for t in texts]
+
+    monkeypatch.setattr(reindex, "embed_texts", crashing_embed)
+    monkeypatch.setattr(get_settings(), "reindex_batch_size", 2)
+    with pytest.raises(ConnectionError):
+        reindex.reindex(["a", "b", "c"], [{"source": "docs.txt"}] * 3, client=client)
+
+    assert list_versions(client) == [1]
+    assert chroma.resolve_collection_name() == live.name
+    assert reindex.last_maintenance()["operation"] == "reindex"
+    assert reindex.last_maintenance()["status"] == "failed"
+
+
+def _stored(collection):
+    rows = collection.get(include=["documents", "metadatas", "embeddings"])
+    return {
+        doc_id: (document, metadata, len(embedding))
+        for doc_id, document, metadata, embedding in zip(rows["ids"], rows["documents"], rows["metadatas"], rows["embeddings"])
+    }
+
+
+def test_reembed_keeps_every_stored_row(client, monkeypatch):
+    """Test that re-embedding moves all stored rows, not just docs.txt, to a new version"""
+    monkeypatch.setattr(reindex, "embed_texts", lambda texts, collection_name=None: [[1.0, float(len(t)), 0.0] for t in texts])
+    live = _make_version(client, 1)
+    live.upsert(ids=["imported"], documents=["from a snapshot"], embeddings=[[0.5, 0.5]], metadatas=[{"source": "import.json"}])
+    chroma.write_alias(live.name)
+    before = _stored(live)
+
+    result = reindex.reembed(client=client)
+
+    assert chroma.resolve_collection_name() == result["collection"] == chroma.versioned_name(2)
+    after = _stored(client.get_collection(result["collection"]))
+    assert {doc_id: row[:2] for doc_id, row in after.items()} == {doc_id: row[:2] for doc_id, row in before.items()}
+    assert {row[2] for row in after.values()} == {3}
+    assert list_versions(client) == [2]
+    assert reindex.last_maintenance()["status"] == "succeeded"
+
+
+def test_reembed_rebuilds_a_tenant_in_place(client, monkeypatch):
+    """Test that a tenant's collection is re-embedded under its own name"""
+    monkeypatch.setattr(reindex, "embed_texts", lambda texts, collection_name=None: [[1.0, float(len(t)), 0.0] for t in texts])
+    name = tenant_collection_name("acme")
+    tenant = client.create_collection(name)
+    tenant.add(ids=["a", "b"], documents=["alpha", "beta"], embeddings=[[1.0, 0.0], [0.0, 1.0]], metadatas=[{"source": "docs.txt"}] * 2)
+    try:
+        result = reindex.reembed("acme", client=client)
+
+        assert result == {"collection": name, "vectors": 2}
+        assert {row[2] for row in _stored(client.get_collection(name)).values()} == {3}
+        assert [c.name for c in client.list_collections()] == [name]
+    finally:
+        chroma.get_collection_cache().discard(name)
+        client.delete_collection(name)
+
+
+def test_file_lock_shared_and_exclusive(tmp_path):
+    """Test that shared holders coexist and an exclusive lock is refused while they hold it"""
+    path = str(tmp_path / "aliases.json.lock")
+    with chroma.file_lock(path, shared=True), chroma.file_lock(path, shared=True):
+        with pytest.raises(BlockingIOError):
+            with chroma.file_lock(path, blocking=False):
+                pass
+    with chroma.file_lock(path, blocking=False):
+        pass
+
+
+def test_file_lock_falls_back_to_msvcrt(tmp_path, monkeypatch):
+    """Test that on Windows the lock uses msvcrt instead of the POSIX-only fcntl"""
+    import sys
+    import types
+
+    held = set()
+
+    def locking(fd, mode, nbytes):
+        key = os.fstat(fd).st_ino
+        if mode == fake.LK_UNLCK:
+            held.discard(key)
+        elif key in held:
+            raise OSError("locked")
+        else:
+            held.add(key)
+
+    fake = types.SimpleNamespace(LK_NBLCK=2, LK_UNLCK=0, locking=locking)
+    monkeypatch.setitem(sys.modules, "msvcrt", fake)
+    monkeypatch.setattr(os, "name", "nt")
+    path = str(tmp_path / "aliases.json.lock")
+
+    with chroma.file_lock(path, shared=True):
+        with pytest.raises(BlockingIOError):
+            with chroma.file_lock(path, shared=True, blocking=False):
+                pass
+    assert held == set()
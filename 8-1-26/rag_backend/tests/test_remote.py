@@ -0,0 +1,104 @@
+import shutil
+import socket
+import subprocess
+import uuid
+
+import httpx
+import pytest
+
+import database.chroma as chroma
+from config.settings import get_settings
+from database.remote import RetryingCollection
+
+
+class FlakyCollection:
+    name = "flaky"
+
+    def __init__(self, failures, error):
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+
+    def _maybe_fail(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error
+
+    def query(self, **kwargs):
+        self._maybe_fail()
+        return {"ids": [["a"]]}
+
+    def add(self, **kwargs):
+        self._maybe_fail()
+
+
+def test_reads_retry_transient_errors():
+    """Test that a query is retried after a read timeout"""
+    flaky = FlakyCollection(2, httpx.ReadTimeout("slow"))
+    collection = RetryingCollection(flaky, attempts=3, backoff_seconds=0)
+
+    assert collection.query(query_embeddings=[[1.0]])["ids"] == [["a"]]
+    assert flaky.calls == 3
+    assert collection.name == "flaky"
+
+
+def test_add_is_not_retried_after_request_was_sent():
+    """Test that add() only retries when the connection was never made"""
+    flaky = FlakyCollection(1, httpx.ReadTimeout("slow"))
+    with pytest.raises(httpx.ReadTimeout):
+        RetryingCollection(flaky, attempts=3, backoff_seconds=0).add(ids=["a"])
+
+    flaky = FlakyCollection(1, httpx.ConnectError("refused"))
+    RetryingCollection(flaky, attempts=3, backoff_seconds=0).add(ids=["a"])
+    assert flaky.calls == 2
+
+
+def test_retries_give_up_after_attempts():
+    """Test that persistent failures surface after the configured attempts"""
+    flaky = FlakyCollection(5, httpx.ConnectError("refused"))
+    with pytest.raises(httpx.ConnectError):
+        RetryingCollection(flaky, attempts=2, backoff_seconds=0).query()
+    assert flaky.calls == 2
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def chroma_server(tmp_path, monkeypatch):
+    if shutil.which("chroma") is None:
+        pytest.skip("chroma CLI not installed")
+
+    port = _free_port()
+    server = subprocess.Popen(
+        ["chroma", "run", "--path", str(tmp_path), "--port", str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    settings = get_settings()
+    monkeypatch.setattr(settings, "chroma_mode", "http")
+    monkeypatch.setattr(settings, "chroma_port", port)
+    monkeypatch.setattr(settings, "chroma_retries", 10)
+    monkeypatch.setattr(settings, "chroma_retry_backoff_seconds", 0.05)
+    chroma.get_client.cache_clear()
+    try:
+        yield
+    finally:
+        chroma.get_client.cache_clear()
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def test_http_mode_against_local_server(chroma_server):
+    """Test add and query through a shared Chroma server with the pooled client"""
+    collection = chroma.create_collection_handle(f"test_{uuid.uuid4().hex}")
+    collection.add(ids=["a", "b"], documents=["alpha", "beta"], embeddings=[[1.0, 0.0], [0.0, 1.0]])
+
+    results = collection.query(query_embeddings=[[0.9, 0.1]], n_results=1)
+
+    assert isinstance(collection, RetryingCollection)
+    assert results["ids"] == [["a"]]
+    assert chroma.get_client()._server._session.timeout.connect == get_settings().chroma_connect_timeout_seconds
@@ -0,0 +1,51 @@
+import time
+
+from fastapi.testclient import TestClient
+
+import services.rerank as rerank_module
+from main import app
+from services.rerank import bm25_scores, rerank
+
+HITS = [
+    {"text": "Employees are expected to plan leaves in advance", "score": 0.1},
+    {"text": "The sandwich policy counts the weekend as leave", "score": 0.2},
+    {"text": "Sick leaves are for health related issues", "score": 0.3},
+]
+
+
+def test_lexical_rerank_promotes_term_overlap():
+    """Test that the lexical scorer reorders hits by query term overlap"""
+    hits, reranked = rerank("sandwich weekend policy", HITS, 2, "lexical")
+
+    assert reranked
+    assert [hit["text"] for hit in hits][0] == HITS[1]["text"]
+    assert len(hits) == 2
+    assert hits[0]["rerank_score"] == 1.0
+
+
+def test_bm25_prefers_rare_terms():
+    """Test that BM25 weights a term found in one document above a common one"""
+    scores = bm25_scores("sick leaves", [hit["text"] for hit in HITS], deadline=None)
+    assert scores.index(max(scores)) == 2
+
+
+def test_rerank_falls_back_when_budget_missed(monkeypatch):
+    """Test that a slow scorer falls back to the index order within budget"""
+    def slow_scores(query, texts, deadline):
+        time.sleep(0.5)
+        return [1.0] * len(texts)
+
+    monkeypatch.setitem(rerank_module.SCORERS, "slow", slow_scores)
+
+    started = time.monotonic()
+    hits, reranked = rerank("anything", HITS, 2, "slow", budget_ms=50)
+
+    assert time.monotonic() - started < 0.4
+    assert not reranked
+    assert hits == HITS[:2]
+
+
+def test_search_rejects_unknown_scorer():
+    """Test that /search validates the rerank parameter"""
+    response = TestClient(app).get("/search/", params={"query": "leave", "rerank": "nope"})
+    assert response.status_code == 400
@@ -0,0 +1,48 @@
+import database.retriever as retriever
+from database.cache import TTLCache, collection_versions
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    """Test that the cache keeps only the most recently used entries"""
+    cache = TTLCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_ttl_cache_expires_entries():
+    """Test that entries older than the TTL are treated as misses"""
+    cache = TTLCache(max_size=2, ttl_seconds=0)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+
+def test_hot_query_served_from_cache_until_write(memory_collection, monkeypatch):
+    """Test that repeated queries skip embedding and Chroma until the collection changes"""
+    memory_collection.add(ids=["a", "b"], documents=["alpha", "beta"], embeddings=[[1.0, 0.0], [0.0, 1.0]])
+    calls = []
+    monkeypatch.setattr(retriever, "generate_embedding", lambda text, collection_name=None: calls.append(text) or [1.0, 0.0])
+    result_cache = TTLCache(16, 60)
+    monkeypatch.setattr(retriever, "get_result_cache", lambda: result_cache)
+    embedding_cache = TTLCache(16)
+    monkeypatch.setattr(retriever, "get_embedding_cache", lambda: embedding_cache)
+
+    first = retriever.search_chunks(memory_collection, "Alpha ", 1)
+    second = retriever.search_chunks(memory_collection, "  alpha", 1)
+    assert first == second
+    assert first[0]["text"] == "alpha"
+    assert calls == ["Alpha "]
+    assert retriever.get_result_cache().hits == 1
+
+    memory_collection.upsert(ids=["a"], documents=["alpha v2"], embeddings=[[1.0, 0.0]])
+    collection_versions.bump(memory_collection.name)
+
+    third = retriever.search_chunks(memory_collection, "alpha", 1)
+    assert third[0]["text"] == "alpha v2"
+    # The query embedding itself is still reused after the write.
+    assert calls == ["Alpha "]
@@ -0,0 +1,113 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from services.scheduler import GenerationCancelled, GenerationScheduler, GenerationTimeout, SchedulerBusy, wait_for_job
+
+
+def _scheduler(slots=1, max_queued=64):
+    return GenerationScheduler(lambda model: slots, max_queued)
+
+
+def test_slots_cap_concurrency_and_jobs_start_in_order():
+    """Test that a model never runs more jobs than its slots, started FIFO"""
+    scheduler = _scheduler(slots=2)
+    lock = threading.Lock()
+    state = {"running": 0, "peak": 0}
+    started = []
+
+    def job(i):
+        def run(cancelled):
+            with lock:
+                started.append(i)
+                state["running"] += 1
+                state["peak"] = max(state["peak"], state["running"])
+            time.sleep(0.02)
+            with lock:
+                state["running"] -= 1
+            return i
+        return run
+
+    jobs = [scheduler.submit("tinyllama", job(i), queue_timeout=10) for i in range(6)]
+
+    assert [j.future.result(timeout=5) for j in jobs] == list(range(6))
+    assert state["peak"] == 2
+    assert started[:2] in ([0, 1], [1, 0])
+    assert sorted(started[2:4]) == [2, 3]
+
+
+def test_jobs_past_their_queue_deadline_time_out():
+    """Test that a job still queued at its deadline fails instead of running late"""
+    scheduler = _scheduler()
+    release = threading.Event()
+    ran = []
+
+    blocker = scheduler.submit("tinyllama", lambda cancelled: release.wait(5), queue_timeout=10)
+    late = scheduler.submit("tinyllama", lambda cancelled: ran.append(1), queue_timeout=0.01)
+    time.sleep(0.05)
+    release.set()
+
+    assert blocker.future.result(timeout=5)
+    with pytest.raises(GenerationTimeout):
+        late.future.result(timeout=5)
+    assert ran == []
+
+
+def test_cancel_skips_queued_and_stops_running_jobs():
+    """Test that cancelling drops a queued job and signals a running one"""
+    scheduler = _scheduler()
+    started = threading.Event()
+    ran = []
+
+    def long_generation(cancelled):
+        started.set()
+        while not cancelled.wait(0.01):
+            pass
+        raise GenerationCancelled("stopped")
+
+    running = scheduler.submit("tinyllama", long_generation, queue_timeout=10)
+    queued = scheduler.submit("tinyllama", lambda cancelled: ran.append(1), queue_timeout=10)
+    assert started.wait(5)
+
+    queued.cancel()
+    running.cancel()
+    after = scheduler.submit("tinyllama", lambda cancelled: "next", queue_timeout=10)
+
+    assert after.future.result(timeout=5) == "next"
+    assert queued.future.cancelled()
+    assert ran == []
+
+
+def test_full_queue_rejects_new_jobs():
+    """Test that submissions beyond max_queued fail fast with SchedulerBusy"""
+    scheduler = _scheduler(max_queued=1)
+    release = threading.Event()
+    scheduler.submit("tinyllama", lambda cancelled: release.wait(5), queue_timeout=10)
+    time.sleep(0.05)
+    scheduler.submit("tinyllama", lambda cancelled: None, queue_timeout=10)
+
+    with pytest.raises(SchedulerBusy):
+        scheduler.submit("tinyllama", lambda cancelled: None, queue_timeout=10)
+    # Other models have their own queue and slots.
+    assert scheduler.submit("llama3", lambda cancelled: "ok", queue_timeout=10).future.result(timeout=5) == "ok"
+    release.set()
+    assert scheduler.snapshot()["tinyllama"]["slots"] == 1
+
+
+class _ConnectedRequest:
+    async def is_disconnected(self):
+        return False
+
+
+def test_wait_for_job_gives_up_at_its_deadline():
+    """Test that waiting on a job that never finishes times out and cancels it"""
+    scheduler = _scheduler()
+    job = scheduler.submit("tinyllama", lambda cancelled: cancelled.wait(5), queue_timeout=10)
+
+    started = time.monotonic()
+    with pytest.raises(GenerationTimeout):
+        asyncio.run(wait_for_job(job, _ConnectedRequest(), timeout=0.1, poll_seconds=0.05))
+    assert time.monotonic() - started < 1
+    assert job.cancelled.is_set()
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import database.retriever as retriever
+from database.cache import TTLCache
+from database.chroma import get_collection
+from main import app
+
+DOCS = {
+    "a": ("apple pie recipe with cinnamon", [1.0, 0.0]),
+    "b": ("banana bread", [0.9, 0.1]),
+    "c": ("apple cider vinegar", [0.0, 1.0]),
+}
+
+
+@pytest.fixture
+def client(monkeypatch, memory_collection):
+    memory_collection.add(
+        ids=list(DOCS),
+        documents=[text for text, _ in DOCS.values()],
+        embeddings=[vector for _, vector in DOCS.values()]
+    )
+    monkeypatch.setattr(retriever, "generate_embedding", lambda text, collection_name=None: [1.0, 0.0])
+    result_cache = TTLCache(16, 60)
+    monkeypatch.setattr(retriever, "get_result_cache", lambda: result_cache)
+    embedding_cache = TTLCache(16)
+    monkeypatch.setattr(retriever, "get_embedding_cache", lambda: embedding_cache)
+    app.dependency_overrides[get_collection] = lambda: memory_collection
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_ndjson_stream_emits_each_stage_then_done(client):
+    """Test that lexical, dense and reranked results arrive as separate lines"""
+    response = client.get("/search/", params={"query": "apple cinnamon", "k": 2, "rerank": "lexical", "stream": "ndjson"})
+    events = [json.loads(line) for line in response.text.splitlines()]
+
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [e.get("stage") for e in events[:-1]] == ["lexical", "dense", "reranked"]
+    assert events[-1] == {"event": "done", "final_stage": "reranked"}
+
+    lexical, dense, reranked = (e["results"] for e in events[:-1])
+    assert lexical[0]["text"] == "apple pie recipe with cinnamon"
+    assert {hit["text"] for hit in lexical} == {"apple pie recipe with cinnamon", "apple cider vinegar"}
+    assert [hit["text"] for hit in dense] == ["apple pie recipe with cinnamon", "banana bread"]
+    assert reranked[0]["text"] == "apple pie recipe with cinnamon"
+
+
+def test_sse_stream_uses_event_frames(client):
+    """Test that stream=sse frames each stage as a server-sent event"""
+    response = client.get("/search/", params={"query": "apple", "stream": "sse"})
+    frames = [frame for frame in response.text.split("\n\n") if frame]
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert frames[0].startswith("event: results\ndata: ")
+    assert frames[-1] == 'event: done\ndata: {"event": "done", "final_stage": "dense"}'
+
+
+def test_stream_and_plain_search_agree(client):
+    """Test that the last streamed stage is exactly the non-streaming answer"""
+    params = {"query": "apple", "k": 2, "rerank": "bm25"}
+    plain = client.get("/search/", params=params).json()["results"]
+    streamed = [json.loads(line) for line in client.get("/search/", params={**params, "stream": "ndjson"}).text.splitlines()]
+
+    # The second request is served from the result cache in one stage.
+    assert [e.get("stage") for e in streamed] == ["cached", None]
+    assert streamed[0]["results"] == plain
+
+
+def test_dimension_mismatch_asks_for_reembed(client, monkeypatch):
+    """Test that a collection embedded at another dimension is refused with a re-embed hint"""
+    monkeypatch.setattr(retriever, "generate_embedding", lambda text, collection_name=None: [1.0, 0.0, 0.0])
+
+    response = client.get("/search/", params={"query": "apple"})
+    assert response.status_code == 409
+    assert response.json()["stored_dimension"] == 2 and response.json()["current_dimension"] == 3
+    assert response.json()["reembed"] == "/vectors/reembed"
+    assert "/vectors/reembed" in response.json()["detail"]
+
+    events = [json.loads(line) for line in client.get("/search/", params={"query": "apple", "stream": "ndjson"}).text.splitlines()]
+    assert events[-2]["event"] == "error" and "/vectors/reembed" in events[-2]["detail"]
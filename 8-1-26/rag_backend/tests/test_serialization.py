@@ -0,0 +1,45 @@
+import msgpack
+import pytest
+from fastapi.testclient import TestClient
+
+import routes.search as search_route
+from database.chroma import get_collection
+from main import app
+
+HITS = [
+    {"text": "chunk " * 300, "metadata": {"source": "docs.txt"}, "score": 0.25},
+    {"text": "another chunk", "metadata": None, "score": 0.5, "rerank_score": 3.0},
+]
+
+
+@pytest.fixture
+def client(monkeypatch, memory_collection):
+    monkeypatch.setattr(search_route, "search_chunks", lambda collection, query, k, reranker=None: HITS)
+    app.dependency_overrides[get_collection] = lambda: memory_collection
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_search_json_matches_response_model(client):
+    """Test that search results are serialized through the typed response model"""
+    response = client.get("/search/", params={"query": "q", "k": 2})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["top_k"] == 2
+    assert data["results"][0] == {"text": HITS[0]["text"], "metadata": {"source": "docs.txt"}, "score": 0.25}
+    assert data["results"][1]["rerank_score"] == 3.0
+
+
+def test_large_results_are_gzipped(client):
+    """Test that large result sets are compressed when the client accepts gzip"""
+    response = client.get("/search/", params={"query": "q"}, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+
+
+def test_msgpack_for_internal_clients(client):
+    """Test that clients asking for MessagePack get a binary body"""
+    response = client.get("/search/", params={"query": "q"}, headers={"Accept": "application/msgpack"})
+
+    assert response.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(response.content)["results"][1]["score"] == 0.5
@@ -0,0 +1,85 @@
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+import routes.search as search_route
+from config.settings import Settings, get_settings
+from database.chroma import get_collection
+from main import app
+
+
+def test_defaults_match_previous_constants():
+    """Test that the defaults keep the paths and models used so far"""
+    settings = Settings(_env_file=None)
+    assert settings.chroma_path == "./chroma_db"
+    assert settings.collection_name == "knowledge_base"
+    assert settings.alias_path.endswith("aliases.json")
+    assert settings.embedding_model == "nomic-embed-text"
+
+
+def test_settings_read_from_environment(monkeypatch):
+    """Test that performance knobs can be tuned per node through RAG_* variables"""
+    monkeypatch.setenv("RAG_INGEST_BATCH_SIZE", "256")
+    monkeypatch.setenv("RAG_RERANK_SCORER", "bm25")
+    monkeypatch.setenv("RAG_CHROMA_PATH", "/data/chroma")
+
+    settings = Settings(_env_file=None)
+
+    assert settings.ingest_batch_size == 256
+    assert settings.rerank_scorer == "bm25"
+    assert settings.alias_path == "/data/chroma/aliases.json"
+
+
+def test_settings_read_from_env_file(tmp_path):
+    """Test that a .env style file is honoured"""
+    env_file = tmp_path / "node.env"
+    env_file.write_text("RAG_RESULT_CACHE_SIZE=32\nRAG_QUANTIZATION=int8\n")
+
+    settings = Settings(_env_file=str(env_file))
+
+    assert settings.result_cache_size == 32
+    assert settings.quantization == "int8"
+
+
+def test_routes_use_injected_settings(monkeypatch, memory_collection):
+    """Test that routes take their defaults from the injected settings object"""
+    seen = {}
+
+    def fake_search(collection, query, k, reranker=None):
+        seen["reranker"] = reranker
+        return []
+
+    monkeypatch.setattr(search_route, "search_chunks", fake_search)
+    app.dependency_overrides[get_collection] = lambda: memory_collection
+    app.dependency_overrides[get_settings] = lambda: Settings(_env_file=None, rerank_scorer="lexical")
+    try:
+        response = TestClient(app).get("/search/", params={"query": "q"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert seen["reranker"] == "lexical"
+
+
+def test_caches_are_sized_when_first_used(monkeypatch):
+    """Test that settings changed before first use size the caches, and limits are read per call"""
+    import database.retriever as retriever
+    from database.tenants import usage
+
+    monkeypatch.setattr(get_settings(), "result_cache_size", 7)
+    retriever.get_result_cache.cache_clear()
+    try:
+        assert retriever.get_result_cache().max_size == 7
+    finally:
+        retriever.get_result_cache.cache_clear()
+
+    monkeypatch.setattr(get_settings(), "max_vectors_per_tenant", 3)
+    assert usage.limit() == 3
+
+
+def test_shard_urls_must_match_shard_count():
+    """Test that shard_urls lists either no server or one per shard"""
+    assert Settings(_env_file=None, shard_count=2, shard_urls=["a:8000", "b:8000"]).shard_urls == ["a:8000", "b:8000"]
+    for count, urls in ((3, ["a:8000", "b:8000"]), (1, ["a:8000"])):
+        with pytest.raises(ValidationError):
+            Settings(_env_file=None, shard_count=count, shard_urls=urls)
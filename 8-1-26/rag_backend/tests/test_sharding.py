@@ -0,0 +1,141 @@
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import database.chroma as chroma
+from config.settings import get_settings
+from database.reindex import garbage_collect, list_versions
+from database.sharding import ShardedCollection, iter_pages, shard_for, shard_name, unshard_name
+
+
+@pytest.fixture
+def client():
+    import chromadb
+
+    return chromadb.EphemeralClient()
+
+
+@pytest.fixture
+def sharded(client):
+    name = f"test_{uuid.uuid4().hex}"
+    shards = [client.create_collection(name=shard_name(name, i), metadata={"hnsw:space": "l2"}) for i in range(3)]
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        yield ShardedCollection(name, shards, executor)
+    for i in range(3):
+        client.delete_collection(shard_name(name, i))
+
+
+def _vectors(n, dim=8, seed=0):
+    return np.random.default_rng(seed).normal(size=(n, dim)).tolist()
+
+
+def test_shard_routing_is_stable_and_spread():
+    """Test that an ID always maps to the same shard and IDs spread over all shards"""
+    ids = [f"doc-{i}" for i in range(300)]
+    assert [shard_for(doc_id, 4) for doc_id in ids] == [shard_for(doc_id, 4) for doc_id in ids]
+    assert set(shard_for(doc_id, 4) for doc_id in ids) == {0, 1, 2, 3}
+
+
+def test_shard_names_round_trip():
+    """Test that shard suffixes are stripped back to the logical collection name"""
+    assert unshard_name(shard_name("knowledge_base__v2", 5)) == "knowledge_base__v2"
+    assert unshard_name("knowledge_base") == "knowledge_base"
+
+
+def test_writes_land_on_owning_shard(sharded):
+    """Test that add routes each ID to its hash shard and count sums the shards"""
+    ids = [f"doc-{i}" for i in range(30)]
+    sharded.add(ids=ids, embeddings=_vectors(30), documents=ids)
+
+    assert sharded.count() == 30
+    for i, shard in enumerate(sharded.shards):
+        assert sorted(shard.get(include=[])["ids"]) == sorted(d for d in ids if shard_for(d, 3) == i)
+
+
+def test_query_matches_unsharded_top_k(sharded, memory_collection):
+    """Test that merging per-shard results gives the same top-k as one collection"""
+    ids = [f"doc-{i}" for i in range(60)]
+    vectors = _vectors(60)
+    sharded.add(ids=ids, embeddings=vectors, documents=ids)
+    memory_collection.add(ids=ids, embeddings=vectors, documents=ids)
+
+    queries = _vectors(3, seed=1)
+    merged = sharded.query(query_embeddings=queries, n_results=5)
+    expected = memory_collection.query(query_embeddings=queries, n_results=5)
+
+    assert merged["ids"] == expected["ids"]
+    assert merged["documents"] == expected["documents"]
+    assert np.allclose(merged["distances"], expected["distances"], atol=1e-4)
+
+
+def test_get_by_ids_keeps_request_order(sharded):
+    """Test that get with ids returns found rows in the requested order"""
+    ids = [f"doc-{i}" for i in range(10)]
+    sharded.add(ids=ids, embeddings=_vectors(10), documents=ids, metadatas=[{"n": i} for i in range(10)])
+
+    result = sharded.get(ids=["doc-7", "missing", "doc-2"], include=["documents", "metadatas"])
+    assert result["ids"] == ["doc-7", "doc-2"]
+    assert result["documents"] == ["doc-7", "doc-2"]
+    assert result["metadatas"] == [{"n": 7}, {"n": 2}]
+
+
+def test_paginated_get_covers_every_row_once(sharded):
+    """Test that limit/offset pages walk across shard boundaries without gaps"""
+    ids = [f"doc-{i}" for i in range(25)]
+    sharded.add(ids=ids, embeddings=_vectors(25), documents=ids)
+
+    seen = []
+    for offset in range(0, 25, 4):
+        seen.extend(sharded.get(limit=4, offset=offset, include=[])["ids"])
+    assert sorted(seen) == sorted(ids)
+
+
+def test_filtered_pages_use_a_per_shard_cursor(sharded, memory_collection):
+    """Test that iter_pages yields each match once and never re-reads earlier shards"""
+    ids = [f"doc-{i}" for i in range(40)]
+    metadatas = [{"even": i % 2 == 0} for i in range(40)]
+    sharded.add(ids=ids, embeddings=_vectors(40), documents=ids, metadatas=metadatas)
+    memory_collection.add(ids=ids, embeddings=_vectors(40), documents=ids, metadatas=metadatas)
+
+    calls = []
+    for shard in sharded.shards:
+        def spy(get=shard.get, **kwargs):
+            calls.append(kwargs)
+            return get(**kwargs)
+        shard.get = spy
+
+    seen = [doc_id for page in iter_pages(sharded, 3, where={"even": True}, include=[]) for doc_id in page["ids"]]
+    assert sorted(seen) == sorted(ids[::2])
+    assert calls and all(call["limit"] == 3 for call in calls)
+
+    plain = [doc_id for page in iter_pages(memory_collection, 3, where={"even": True}, include=[]) for doc_id in page["ids"]]
+    assert sorted(plain) == sorted(ids[::2])
+
+
+def test_delete_by_id_and_where(sharded):
+    """Test that deletes reach the owning shard and where-deletes reach all shards"""
+    ids = [f"doc-{i}" for i in range(12)]
+    sharded.add(ids=ids, embeddings=_vectors(12), documents=ids, metadatas=[{"even": i % 2 == 0} for i in range(12)])
+
+    sharded.delete(ids=["doc-1", "doc-3"])
+    assert sharded.count() == 10
+
+    sharded.delete(where={"even": True})
+    assert sorted(sharded.get(include=[])["ids"]) == sorted(f"doc-{i}" for i in range(5, 12, 2))
+
+
+def test_versions_are_listed_once_across_shards(client, tmp_path, monkeypatch):
+    """Test that reindex bookkeeping treats a version's shards as one collection"""
+    monkeypatch.setattr(get_settings(), "alias_path", str(tmp_path / "aliases.json"))
+    monkeypatch.setattr(chroma, "_alias_cache", {"mtime": None, "aliases": {}})
+    monkeypatch.setattr(get_settings(), "shard_count", 2)
+
+    for version in (1, 2, 3):
+        chroma.create_collection_handle(chroma.versioned_name(version), client)
+    assert list_versions(client) == [1, 2, 3]
+
+    assert garbage_collect(client, keep=1) == [1, 2]
+    assert list_versions(client) == [3]
+    chroma.drop_collection(chroma.versioned_name(3), client)
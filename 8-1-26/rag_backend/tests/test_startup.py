@@ -0,0 +1,43 @@
+import os
+import subprocess
+import sys
+
+# Cumulative import time allowed for `import main`, in milliseconds.
+IMPORT_BUDGET_MS = 1500
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _profile_app_import():
+    """Run `python -X importtime -c "import main"` and parse its profile"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=APP_DIR,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
+
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative_us, module = line[len("import time:"):].split("|")
+        if cumulative_us.strip().isdigit():
+            cumulative[module.strip()] = int(cumulative_us)
+    return cumulative
+
+
+def test_app_import_does_not_load_chromadb():
+    """Test that importing the app defers the Chroma client until first use"""
+    modules = _profile_app_import()
+    assert "chromadb" not in modules
+    assert "ollama" not in modules
+    assert "numpy" not in modules
+
+
+def test_app_import_within_budget():
+    """Test that `import main` stays under the cold-start import budget"""
+    modules = _profile_app_import()
+    assert "main" in modules
+    assert modules["main"] / 1000 < IMPORT_BUDGET_MS
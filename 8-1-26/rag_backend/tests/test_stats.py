@@ -0,0 +1,261 @@
+import threading
+import time
+import uuid
+
+import chromadb
+import pytest
+from fastapi.testclient import TestClient
+
+import database.chroma as chroma
+import routes.vectors as vectors_route
+from config.settings import get_settings
+import database.reindex as reindex
+from database.reindex import compact
+from database.stats import CollectionStats, StatsReconciler, disk_bytes, vector_stats
+from main import app
+
+
+def _add(collection, n, source="docs.txt", start=0):
+    collection.add(
+        ids=[f"doc-{i}" for i in range(start, start + n)],
+        documents=[f"chunk {i}" for i in range(start, start + n)],
+        embeddings=[[float(i), 1.0] for i in range(start, start + n)],
+        metadatas=[{"source": source} for _ in range(n)]
+    )
+
+
+def test_counts_are_seeded_once_then_updated_incrementally(memory_collection, monkeypatch, tmp_path):
+    """Test that per-source counts are scanned once and then follow recorded writes"""
+    stats = CollectionStats(page_size=2, removed_path=str(tmp_path / "removed.json"))
+    _add(memory_collection, 5)
+    _add(memory_collection, 2, source="notes.txt", start=5)
+    assert stats.snapshot(memory_collection)["sources"] == {"docs.txt": 5, "notes.txt": 2}
+
+    monkeypatch.setattr(stats, "scan", lambda collection: pytest.fail("rescanned"))
+    stats.record(memory_collection, added=["notes.txt"] * 3, removed=["docs.txt"])
+    snapshot = stats.snapshot(memory_collection)
+
+    assert snapshot == {"count": 9, "sources": {"docs.txt": 4, "notes.txt": 5}, "removed": 1}
+
+
+def test_removed_counts_are_shared_and_survive_restarts(memory_collection, tmp_path):
+    """Test that dead entries recorded by one worker are reported by another and after a restart"""
+    path = str(tmp_path / "removed.json")
+    _add(memory_collection, 3)
+    CollectionStats(removed_path=path).record(memory_collection, removed=["docs.txt"] * 2)
+    other_worker = CollectionStats(removed_path=path)
+    other_worker.record(memory_collection, added=["docs.txt"], removed=["docs.txt"])
+
+    assert CollectionStats(removed_path=path).snapshot(memory_collection)["removed"] == 3
+    other_worker.reset(memory_collection.name)
+    assert CollectionStats(removed_path=path).snapshot(memory_collection)["removed"] == 0
+
+
+def test_writes_before_first_read_are_not_double_counted(memory_collection):
+    """Test that a write recorded before seeding is picked up by the seeding scan only"""
+    stats = CollectionStats()
+    _add(memory_collection, 3)
+    stats.record(memory_collection, added=["docs.txt"] * 3)
+
+    assert stats.snapshot(memory_collection)["count"] == 3
+
+
+def test_stats_route_tracks_update_and_delete(memory_collection, monkeypatch):
+    """Test that /vectors/stats reflects overwrites and deletes as churn"""
+    monkeypatch.setattr(vectors_route, "generate_embedding", lambda text, collection_name=None: [0.5, 1.0])
+    app.dependency_overrides[chroma.get_collection] = lambda: memory_collection
+    app.dependency_overrides[chroma.get_writable_collection] = lambda: memory_collection
+    client = TestClient(app)
+    try:
+        _add(memory_collection, 4)
+        assert client.get("/vectors/stats").json()["count"] == 4
+
+        client.post("/vectors/update", json={"id": "doc-1", "updated_text": "new text"})
+        client.post("/vectors/delete", json={"id": "doc-2"})
+        stats = client.get("/vectors/stats").json()
+    finally:
+        app.dependency_overrides.clear()
+        vector_stats.reset(memory_collection.name)
+
+    assert stats["count"] == 3
+    assert stats["sources"] == {"docs.txt": 3}
+    assert stats["removed_since_compaction"] == 2
+    assert stats["fragmentation"] == pytest.approx(0.4)
+
+
+def test_count_is_served_from_memory_until_reconciled(memory_collection):
+    """Test that /vectors/count does not hit Chroma and reconcile picks up outside writes"""
+    app.dependency_overrides[chroma.get_collection] = lambda: memory_collection
+    app.dependency_overrides[chroma.get_writable_collection] = lambda: memory_collection
+    client = TestClient(app)
+    try:
+        _add(memory_collection, 3)
+        assert client.get("/vectors/count").json() == {"count": 3}
+
+        # Written behind the app's back, e.g. by another worker.
+        _add(memory_collection, 2, start=3)
+        assert client.get("/vectors/count").json() == {"count": 3}
+
+        assert vector_stats.reconcile(memory_collection) is True
+        assert vector_stats.reconcile(memory_collection) is False
+        assert client.get("/vectors/count").json() == {"count": 5}
+    finally:
+        app.dependency_overrides.clear()
+        vector_stats.reset(memory_collection.name)
+
+
+def test_reconciler_runs_periodically(memory_collection):
+    """Test that the background reconciler corrects drifted counts on its own"""
+    stats = CollectionStats()
+    stats.total(memory_collection)
+    _add(memory_collection, 4)
+
+    reconciler = StatsReconciler([stats], lambda name: memory_collection, interval=0.01).start()
+    try:
+        deadline = time.monotonic() + 5
+        while stats.total(memory_collection) != 4 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        reconciler.stop()
+
+    assert stats.total(memory_collection) == 4
+
+
+def test_reconciler_forgets_dropped_collections(live, monkeypatch):
+    """Test that reconciling a collection dropped since it was tracked does not recreate it"""
+    client, source = live
+    _add(source, 3)
+    stats = CollectionStats()
+    stats.total(source)
+    client.delete_collection(source.name)
+
+    reconciler = StatsReconciler([stats], lambda name: chroma.create_collection_handle(name, client, create=False), 1)
+    reconciler.reconcile_all()
+
+    assert stats.names() == []
+    assert source.name not in [c.name for c in client.list_collections()]
+
+
+def test_dropping_a_collection_resets_its_stats(live):
+    """Test that drop_collection stops the shared counters tracking the dropped name"""
+    client, source = live
+    _add(source, 3)
+    vector_stats.total(source)
+
+    chroma.drop_collection(source.name, client)
+    assert source.name not in vector_stats.names()
+
+
+def test_index_bytes_of_an_embedded_collection(tmp_path, monkeypatch):
+    """Test that the on-disk size of a persisted collection is reported"""
+    monkeypatch.setattr(get_settings(), "chroma_path", str(tmp_path))
+    collection = chromadb.PersistentClient(path=str(tmp_path)).create_collection(name="sized")
+    _add(collection, 50)
+
+    assert disk_bytes(collection) > 0
+
+
+@pytest.fixture
+def live(tmp_path, monkeypatch):
+    name = f"kb_{uuid.uuid4().hex[:8]}"
+    monkeypatch.setattr(get_settings(), "collection_name", name)
+    monkeypatch.setattr(get_settings(), "alias_path", str(tmp_path / "aliases.json"))
+    monkeypatch.setattr(chroma, "_alias_cache", {"mtime": None, "aliases": {}})
+    client = chromadb.EphemeralClient()
+    yield client, client.create_collection(name=name)
+    for collection in client.list_collections():
+        if collection.name.startswith(name):
+            client.delete_collection(collection.name)
+
+
+def test_compaction_rebuilds_live_collection(live):
+    """Test that compaction copies every live vector into a fresh version and swaps the alias"""
+    client, source = live
+    _add(source, 30)
+    source.delete(ids=[f"doc-{i}" for i in range(0, 30, 3)])
+    before = source.get(include=["embeddings", "documents", "metadatas"])
+
+    result = compact(client, batch_size=7)
+
+    assert result["vectors"] == 20
+    assert chroma.resolve_collection_name() == result["collection"] == chroma.versioned_name(1)
+    assert source.name not in [c.name for c in client.list_collections()]
+
+    after = client.get_collection(result["collection"]).get(ids=before["ids"], include=["embeddings", "documents", "metadatas"])
+    assert after["ids"] == before["ids"]
+    assert after["documents"] == before["documents"]
+    assert after["metadatas"] == before["metadatas"]
+    assert (after["embeddings"] == before["embeddings"]).all()
+
+
+def test_writes_during_compaction_wait_and_land_in_the_new_version(live, monkeypatch):
+    """Test that a write racing a compaction is held off and then applied to the replacement"""
+    client, source = live
+    _add(source, 10)
+    monkeypatch.setattr(chroma, "open_collection", lambda name: client.get_collection(name))
+
+    copied, release = threading.Event(), threading.Event()
+    validate = reindex.validate_version
+
+    def slow_validate(collection, expected_count):
+        copied.set()
+        release.wait(5)
+        validate(collection, expected_count)
+
+    monkeypatch.setattr(reindex, "validate_version", slow_validate)
+    compaction = threading.Thread(target=compact, args=(client,))
+    compaction.start()
+    assert copied.wait(5)
+    assert chroma.maintenance_running()
+
+    def write():
+        with chroma.write_gate(source) as target:
+            target.upsert(ids=["doc-3"], documents=["edited"], embeddings=[[3.0, 2.0]])
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    writer.join(0.2)
+    assert writer.is_alive()
+
+    release.set()
+    compaction.join(5)
+    writer.join(5)
+
+    live_collection = client.get_collection(chroma.resolve_collection_name())
+    assert live_collection.name == chroma.versioned_name(1)
+    assert live_collection.get(ids=["doc-3"])["documents"] == ["edited"]
+    assert not chroma.maintenance_running()
+
+
+def test_compaction_accepts_duplicate_vectors(live):
+    """Test that the self-retrieval probe accepts an identical twin of the probe vector"""
+    client, source = live
+    for run in range(3):
+        source.add(
+            ids=[f"run{run}-{i}" for i in range(5)],
+            documents=[f"chunk {i}" for i in range(5)],
+            embeddings=[[float(i), 1.0] for i in range(5)]
+        )
+
+    result = compact(client)
+
+    assert result["vectors"] == 15
+    assert reindex.last_maintenance()["status"] == "succeeded"
+
+
+def test_failed_compaction_drops_its_copy_and_reports(live, monkeypatch):
+    """Test that a compaction failing validation keeps the live collection and leaves no partial version"""
+    client, source = live
+    _add(source, 5)
+
+    def fail(collection, expected_count):
+        raise reindex.ReindexValidationError("probe failed")
+
+    monkeypatch.setattr(reindex, "validate_version", fail)
+    with pytest.raises(reindex.ReindexValidationError):
+        compact(client)
+
+    assert chroma.resolve_collection_name() == source.name
+    assert [c.name for c in client.list_collections() if c.name.startswith(source.name)] == [source.name]
+    status = reindex.last_maintenance()
+    assert (status["operation"], status["status"], status["error"]) == ("compact", "failed", "probe failed")
@@ -0,0 +1,165 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import database.chroma as chroma
+from database.cache import CollectionCache
+from database.tenants import TenantLimitExceeded, TenantUsage, tenant_collection_name, tenant_of
+from main import app
+
+
+class FakeCollection:
+    def __init__(self, name, count=0):
+        self.name = name
+        self._count = count
+
+    def count(self):
+        return self._count
+
+
+def test_cache_reuses_handles_and_evicts_lru():
+    """Test that handles are reused and the least recently used is dropped"""
+    opened = []
+
+    def opener(name):
+        opened.append(name)
+        return FakeCollection(name)
+
+    cache = CollectionCache(opener, max_size=2, idle_seconds=60)
+    cache.get("a")
+    cache.get("b")
+    cache.get("a")
+    cache.get("c")
+
+    assert opened == ["a", "b", "c"]
+    assert cache.names() == ["a", "c"]
+
+
+def test_cache_evicts_idle_handles():
+    """Test that handles unused for longer than the idle window are reopened"""
+    opened = []
+    cache = CollectionCache(lambda name: opened.append(name) or FakeCollection(name), max_size=8, idle_seconds=0)
+
+    cache.get("a")
+    cache.get("a")
+
+    assert opened == ["a", "a"]
+
+
+def test_tenant_collection_names():
+    """Test tenant to collection name mapping and validation"""
+    name = tenant_collection_name("acme")
+    assert name == "knowledge_base__t_acme"
+    assert tenant_of(name) == "acme"
+    assert tenant_of("knowledge_base") is None
+
+    with pytest.raises(ValueError):
+        tenant_collection_name("../etc")
+
+
+def test_tenant_usage_enforces_limit():
+    """Test that reservations beyond the per-tenant limit are rejected"""
+    usage = TenantUsage(max_vectors=10)
+    collection = FakeCollection(tenant_collection_name("acme"), count=8)
+
+    usage.reserve(collection, 2)
+    with pytest.raises(TenantLimitExceeded):
+        usage.reserve(collection, 1)
+
+    usage.release(collection, 3)
+    usage.reserve(collection, 1)
+    assert usage.snapshot() == {"acme": 8}
+
+
+def test_tenant_usage_ignores_shared_collection():
+    """Test that the shared collection is not subject to tenant limits"""
+    usage = TenantUsage(max_vectors=1)
+    usage.reserve(FakeCollection("knowledge_base", count=5), 10)
+    assert usage.snapshot() == {}
+
+
+def test_invalid_tenant_rejected_by_routes():
+    """Test that routes reject malformed tenant parameters"""
+    client = TestClient(app)
+    response = client.get("/vectors/count", params={"tenant": "no/slashes"})
+    assert response.status_code == 400
+
+
+def test_reads_do_not_create_tenant_collections(monkeypatch):
+    """Test that reading an unknown tenant is a 404 and only a write creates its collection"""
+    import chromadb
+
+    client = chromadb.EphemeralClient()
+    cache = CollectionCache(chroma.create_collection_handle, max_size=8, idle_seconds=60)
+    monkeypatch.setattr(chroma, "get_client", lambda: client)
+    monkeypatch.setattr(chroma, "get_collection_cache", lambda: cache)
+    name = tenant_collection_name("ghost")
+
+    response = TestClient(app).get("/vectors/count", params={"tenant": "ghost"})
+    assert response.status_code == 404
+    assert name not in [c.name for c in client.list_collections()]
+
+    chroma.get_writable_collection("ghost")
+    assert TestClient(app).get("/vectors/count", params={"tenant": "ghost"}).json() == {"count": 0}
+    client.delete_collection(name)
+
+
+def test_failed_ingest_gives_back_its_reservation(monkeypatch, tmp_path):
+    """Test that a crashed and resumed tenant ingest is charged only for what it stored"""
+    import chromadb
+
+    import routes.vectors as vectors
+    import services.ingest as ingest
+    from config.settings import get_settings
+
+    tenant_usage = TenantUsage(max_vectors=1000)
+    client = chromadb.EphemeralClient()
+    collection = client.get_or_create_collection(tenant_collection_name("acme"))
+    monkeypatch.setattr(vectors, "usage", tenant_usage)
+    monkeypatch.setattr(get_settings(), "ingest_batch_size", 3)
+    monkeypatch.setattr(get_settings(), "checkpoint_dir", str(tmp_path / "checkpoints"))
+    embedded = []
+
+    def crashing_embed(texts, collection_name=None):
+        if len(embedded) == 2:
+            raise ConnectionError("ollama went away")
+        embedded.append(texts)
+        return [[float(len(t)), 1.0] for t in texts]
+
+    monkeypatch.setattr(ingest, "embed_texts", crashing_embed)
+    app.dependency_overrides[chroma.get_writable_collection] = lambda: collection
+    try:
+        with pytest.raises(ConnectionError):
+            TestClient(app).post("/vectors/create")
+        assert tenant_usage.snapshot() == {"acme": collection.count()}
+
+        monkeypatch.setattr(ingest, "embed_texts", lambda texts, collection_name=None: [[1.0, 1.0] for t in texts])
+        TestClient(app).post("/vectors/create")
+        assert tenant_usage.snapshot() == {"acme": collection.count()}
+    finally:
+        app.dependency_overrides.clear()
+        client.delete_collection(collection.name)
+
+
+def test_tenant_usage_reconciles_with_chroma():
+    """Test that reconciling recounts from Chroma but keeps reservations in flight"""
+    usage = TenantUsage(max_vectors=10)
+    collection = FakeCollection(tenant_collection_name("acme"), count=4)
+    usage.reserve(collection, 2)
+    usage.reserve(collection, 3)
+    usage.settle(collection, 2, 2)
+
+    collection._count = 7
+    assert usage.reconcile(collection) is True
+    assert usage.snapshot() == {"acme": 10}
+
+    usage.settle(collection, 3, 0)
+    assert usage.snapshot() == {"acme": 7}
+    assert usage.reconcile(collection) is False
+    assert usage.reconcile(FakeCollection(tenant_collection_name("other"), count=1)) is False
+
+
+def test_dimension_mismatch_points_tenants_at_their_own_migration():
+    """Test that a tenant's 409 names the re-embed of that tenant"""
+    exc = chroma.EmbeddingDimensionMismatch(tenant_collection_name("acme"), 2, 3)
+    assert exc.migration_url() == "/vectors/reembed?tenant=acme"
+    assert "/vectors/reembed?tenant=acme" in str(exc)
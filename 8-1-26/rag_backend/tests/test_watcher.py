@@ -0,0 +1,142 @@
+import os
+import time
+
+import pytest
+
+import services.watcher as watcher
+from services.watcher import DocsWatcher, region_chunks
+
+
+@pytest.fixture
+def embedded(monkeypatch):
+    texts = []
+    monkeypatch.setattr(watcher, "embed_texts", lambda batch, collection_name=None: texts.extend(batch) or [[float(len(t)), 1.0] for t in batch])
+    return texts
+
+
+def _paragraph(word, n=50):
+    return " ".join(f"{word}{i}" for i in range(n))
+
+
+def _write(path, *paragraphs):
+    path.write_text("\n\n".join(paragraphs), encoding="utf-8")
+    # Make every rewrite visible to the poller even within one mtime tick.
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_edit_only_changes_chunks_of_touched_paragraph():
+    """Test that region chunk IDs of untouched paragraphs survive an edit elsewhere"""
+    before = region_chunks("docs.txt", "\n\n".join([_paragraph("a"), _paragraph("b")]))
+    after = region_chunks("docs.txt", "\n\n".join([_paragraph("a"), _paragraph("c")]))
+
+    assert len(set(before) & set(after)) == len(region_chunks("docs.txt", _paragraph("a")))
+
+
+def test_changes_are_debounced(tmp_path, memory_collection, embedded):
+    """Test that a file is only synced once it has been stable for the debounce window"""
+    docs = tmp_path / "docs.txt"
+    _write(docs, _paragraph("a"))
+    docs_watcher = DocsWatcher(str(docs), lambda: memory_collection, debounce=5)
+
+    assert docs_watcher.poll(now=0) == {}
+    assert docs_watcher.poll(now=3) == {}
+    synced = docs_watcher.poll(now=6)
+
+    assert synced["docs.txt"]["upserted"] == memory_collection.count() == 2
+
+
+def test_sync_applies_minimal_upserts_and_deletes(tmp_path, memory_collection, embedded):
+    """Test that only new chunks are embedded and stale ones deleted"""
+    docs = tmp_path / "docs.txt"
+    _write(docs, _paragraph("a"), _paragraph("b"))
+    docs_watcher = DocsWatcher(str(docs), lambda: memory_collection, debounce=0)
+    docs_watcher.poll(now=0)
+    embedded.clear()
+
+    _write(docs, _paragraph("a"), _paragraph("c"), _paragraph("d"))
+    synced = docs_watcher.poll(now=1)
+
+    assert synced["docs.txt"] == {"upserted": 4, "deleted": 2}
+    assert len(embedded) == 4
+    stored = memory_collection.get(include=["documents"])["documents"]
+    assert not any(doc.startswith("b0") for doc in stored)
+    assert memory_collection.count() == 6
+
+
+def test_touch_without_content_change_is_skipped(tmp_path, memory_collection, embedded):
+    """Test that an mtime-only change does not re-embed anything"""
+    docs = tmp_path / "docs.txt"
+    _write(docs, _paragraph("a"))
+    docs_watcher = DocsWatcher(str(docs), lambda: memory_collection, debounce=0)
+    docs_watcher.poll(now=0)
+    embedded.clear()
+
+    _write(docs, _paragraph("a"))
+    assert docs_watcher.poll(now=1) == {"docs.txt": {"upserted": 0, "deleted": 0}}
+    assert embedded == []
+
+
+def test_directory_watch_handles_new_and_removed_files(tmp_path, memory_collection, embedded):
+    """Test that files appearing in or vanishing from a docs directory are indexed or purged"""
+    (tmp_path / "ignored.md").write_text(_paragraph("x"), encoding="utf-8")
+    _write(tmp_path / "one.txt", _paragraph("a"))
+    docs_watcher = DocsWatcher(str(tmp_path), lambda: memory_collection, debounce=0)
+    docs_watcher.poll(now=0)
+
+    _write(tmp_path / "two.txt", _paragraph("b"))
+    os.remove(tmp_path / "one.txt")
+    synced = docs_watcher.poll(now=1)
+
+    assert synced == {"one.txt": {"upserted": 0, "deleted": 2}, "two.txt": {"upserted": 2, "deleted": 0}}
+    sources = {m["source"] for m in memory_collection.get(include=["metadatas"])["metadatas"]}
+    assert sources == {"two.txt"}
+
+
+def test_alias_swap_resyncs_unchanged_files(tmp_path, embedded):
+    """Test that files already indexed are synced again into a collection swapped in by a reindex"""
+    import chromadb
+
+    client = chromadb.EphemeralClient()
+    old, new = client.create_collection("watch_old"), client.create_collection("watch_new")
+    live = [old]
+    _write(tmp_path / "one.txt", _paragraph("a"))
+    _write(tmp_path / "two.txt", _paragraph("b"))
+    docs_watcher = DocsWatcher(str(tmp_path), lambda: live[0], debounce=1)
+    try:
+        docs_watcher.poll(now=0)
+        docs_watcher.poll(now=1)
+        assert old.count() == 4
+
+        live[0] = new
+        assert docs_watcher.poll(now=2) == {}
+        synced = docs_watcher.poll(now=3)
+
+        assert synced == {"one.txt": {"upserted": 2, "deleted": 0}, "two.txt": {"upserted": 2, "deleted": 0}}
+        assert new.count() == 4
+    finally:
+        client.delete_collection("watch_old")
+        client.delete_collection("watch_new")
+
+
+def test_only_one_watcher_syncs(tmp_path, memory_collection, embedded):
+    """Test that watchers sharing a lock file elect one poller and hand over when it stops"""
+    _write(tmp_path / "docs.txt", _paragraph("a"))
+    lock_path = str(tmp_path / "aliases.json.watcher.lock")
+    first = DocsWatcher(str(tmp_path), lambda: memory_collection, interval=0.01, debounce=0, lock_path=lock_path).start()
+    second = DocsWatcher(str(tmp_path), lambda: memory_collection, interval=0.01, debounce=0, lock_path=lock_path).start()
+    try:
+        deadline = time.monotonic() + 5
+        while not (first.elected or second.elected) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        leader, follower = (first, second) if first.elected else (second, first)
+        time.sleep(0.1)
+        assert not follower.elected
+
+        leader.stop()
+        while not follower.elected and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert follower.elected
+    finally:
+        first.stop()
+        second.stop()
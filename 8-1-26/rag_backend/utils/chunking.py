@@ -1,11 +1,12 @@
 import os
-from config.settings import DOCS_PATH
+from config.settings import get_settings
 
 def read_docs_file():
-    if not os.path.exists(DOCS_PATH):
+    docs_path = get_settings().docs_path
+    if not os.path.exists(docs_path):
         raise Exception("docs.txt file not found")
 
-    with open(DOCS_PATH, "r", encoding="utf-8") as f:
+    with open(docs_path, "r", encoding="utf-8") as f:
         return f.read()
 
 def split_text(text, chunk_size=40):
@@ -0,0 +1,104 @@
+import hashlib
+
+import numpy as np
+
+from config.settings import get_settings
+
+SHINGLE_SIZE = 3
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    words = text.lower().split()
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def mix64(z):
+    # splitmix64 finalizer; uint64 arithmetic wraps, which is intended here.
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+class MinHasher:
+    def __init__(self, num_perm=128, seed=1):
+        rng = np.random.default_rng(seed)
+        self.seeds = rng.integers(0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text):
+        hashes = np.array(
+            [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+             for s in shingles(text)],
+            dtype=np.uint64
+        )
+        # One independent hash per permutation: mix(shingle ^ seed).
+        with np.errstate(over="ignore"):
+            return mix64(hashes[:, None] ^ self.seeds[None, :]).min(axis=0)
+
+
+def find_near_duplicates(chunks, threshold=None, num_perm=None, bands=None):
+    """Return {duplicate_index: canonical_index} for chunks that repeat an earlier one.
+
+    LSH banding only shortlists candidate pairs; each candidate is then
+    confirmed by the MinHash estimate of its Jaccard similarity.
+    """
+    settings = get_settings()
+    threshold = settings.dedup_threshold if threshold is None else threshold
+    num_perm = num_perm or settings.dedup_num_perm
+    bands = bands or settings.dedup_bands
+
+    hasher = MinHasher(num_perm)
+    rows = num_perm // bands
+    buckets = [{} for _ in range(bands)]
+    signatures = []
+    duplicates = {}
+
+    for i, chunk in enumerate(chunks):
+        signature = hasher.signature(chunk)
+        signatures.append(signature)
+
+        canonical = None
+        for band in range(bands):
+            key = signature[band * rows:(band + 1) * rows].tobytes()
+            candidate = buckets[band].get(key)
+            if candidate is None:
+                continue
+            if np.mean(signatures[candidate] == signature) >= threshold:
+                canonical = candidate
+                break
+
+        if canonical is not None:
+            duplicates[i] = canonical
+            continue
+
+        for band in range(bands):
+            buckets[band].setdefault(signature[band * rows:(band + 1) * rows].tobytes(), i)
+
+    return duplicates
+
+
+def dedup_chunks(chunks, enabled=True):
+    """Drop near-duplicate chunks; returns (unique_chunks, duplicate_counts, stats).
+
+    duplicate_counts[i] is how many dropped chunks were linked to unique_chunks[i].
+    """
+    duplicates = find_near_duplicates(chunks) if enabled and chunks else {}
+
+    positions = {}
+    unique_chunks = []
+    for i, chunk in enumerate(chunks):
+        if i not in duplicates:
+            positions[i] = len(unique_chunks)
+            unique_chunks.append(chunk)
+
+    duplicate_counts = [0] * len(unique_chunks)
+    for canonical in duplicates.values():
+        duplicate_counts[positions[canonical]] += 1
+
+    stats = {
+        "chunks_total": len(chunks),
+        "duplicates_skipped": len(duplicates),
+        "dedup_ratio": len(duplicates) / len(chunks) if chunks else 0.0
+    }
+    return unique_chunks, duplicate_counts, stats
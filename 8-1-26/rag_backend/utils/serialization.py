@@ -0,0 +1,26 @@
+from fastapi import Request
+from fastapi.responses import Response
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+
+class MsgPackResponse(Response):
+    media_type = "application/msgpack"
+
+    def render(self, content) -> bytes:
+        import msgpack
+
+        return msgpack.packb(content, use_bin_type=True)
+
+
+def wants_msgpack(request: Request):
+    accept = request.headers.get("accept", "")
+    return any(media_type in accept for media_type in MSGPACK_MEDIA_TYPES)
+
+
+def negotiate(request: Request, payload: dict):
+    """Return MessagePack for internal clients that ask for it, else the payload
+    itself so FastAPI serializes it straight to JSON bytes via the response model."""
+    if wants_msgpack(request):
+        return MsgPackResponse(payload)
+    return payload